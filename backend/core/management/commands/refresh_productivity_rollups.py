@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from tasks.models import ProductivityLog
+from tasks.productivity import compute_rollups, bulk_upsert_productivity_logs, ROLLUP_PERIOD_TYPES
+
+# Rows per conditional UPDATE when clearing dirty flags
+CLEAR_BATCH_SIZE = 500
+
+class Command(BaseCommand):
+    help = 'Recompute weekly/monthly productivity logs that were marked dirty by task or daily log changes'
+
+    def handle(self, *args, **options):
+        dirty_logs = (
+            ProductivityLog.objects
+            .filter(period_type__in=ROLLUP_PERIOD_TYPES, is_dirty=True)
+            .select_related('user')
+            .order_by('user_id', 'period_start')
+        )
+
+        # Group by user so each user costs one grouped aggregation query
+        logs_by_user = {}
+        for log in dirty_logs:
+            logs_by_user.setdefault(log.user_id, []).append(log)
+
+        fresh_logs = []
+        for logs in logs_by_user.values():
+            user = logs[0].user
+            rollups = compute_rollups(user, [(log.period_start, log.period_end) for log in logs])
+            fresh_logs.extend(
+                ProductivityLog(
+                    user=user,
+                    period_type=log.period_type,
+                    period_start=log.period_start,
+                    period_end=log.period_end,
+                    **rollups[(log.period_start, log.period_end)],
+                )
+                for log in logs
+            )
+
+        # One upsert and one batched Supabase sync for every refreshed row. The
+        # dirty flags are left alone here: a task change may have dirtied a row
+        # again after it was read above.
+        bulk_upsert_productivity_logs(fresh_logs, clear_dirty=False)
+
+        # Clear only rows whose dirty_version is still the one that was read
+        read_logs = [log for logs in logs_by_user.values() for log in logs]
+        cleared = 0
+        for i in range(0, len(read_logs), CLEAR_BATCH_SIZE):
+            unchanged = Q()
+            for log in read_logs[i:i + CLEAR_BATCH_SIZE]:
+                unchanged |= Q(id=log.id, dirty_version=log.dirty_version)
+            cleared += ProductivityLog.objects.filter(unchanged, is_dirty=True).update(is_dirty=False)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Refreshed {len(fresh_logs)} productivity rollups for {len(logs_by_user)} users "
+            f"({len(fresh_logs) - cleared} changed again and stay dirty)"
+        ))
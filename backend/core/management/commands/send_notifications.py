@@ -14,13 +14,26 @@ class Command(BaseCommand):
         soon = now + timedelta(hours=24)
         notifications_created = 0
 
+        # Every user's pending tasks in the notification window (overdue or due
+        # within 24h), fetched once with only the columns the messages need
+        tasks_by_user = {}
+        pending_tasks = (
+            Task.objects.filter(completed=False, due_date__lte=soon.date())
+            .exclude(due_date=now.date())
+            .only('id', 'user_id', 'title', 'due_date')
+            .order_by('due_date', 'id')
+        )
+        for task in pending_tasks:
+            tasks_by_user.setdefault(task.user_id, []).append(task)
+
         for user in User.objects.all():
             # Skip users without email addresses
             if not user.email:
                 continue
+            user_tasks = tasks_by_user.get(user.id, [])
             
             # Tasks due soon (within 24h, not completed, not overdue)
-            due_soon_tasks = Task.objects.filter(user=user, completed=False, due_date__gt=now.date(), due_date__lte=soon.date())
+            due_soon_tasks = [task for task in user_tasks if task.due_date > now.date()]
             for task in due_soon_tasks:
                 title = f'Task Due Soon: {task.title}'
                 message = f'Task "{task.title}" is due on {task.due_date.strftime("%B %d, %Y")}. Don\'t forget to complete it!'
@@ -47,7 +60,7 @@ class Command(BaseCommand):
                         self.stdout.write(f'Created notification for task: {task.title}')
 
             # Tasks overdue (not completed)
-            overdue_tasks = Task.objects.filter(user=user, completed=False, due_date__lt=now.date())
+            overdue_tasks = [task for task in user_tasks if task.due_date < now.date()]
             for task in overdue_tasks:
                 title = f'Overdue Task: {task.title}'
                 message = f'Task "{task.title}" was due on {task.due_date.strftime("%B %d, %Y")} and is now overdue. Please complete it soon!'
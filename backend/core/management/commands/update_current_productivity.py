@@ -1,142 +1,86 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from tasks.models import Task, ProductivityLog
+from tasks.models import ProductivityLog
+from tasks.productivity import (
+    compute_rollups, get_work_date_counts, get_productivity_status, bulk_upsert_productivity_logs,
+)
 from django.utils import timezone
-from datetime import timedelta, date
+from datetime import timedelta
+from calendar import monthrange
 
 class Command(BaseCommand):
-    help = 'Update productivity logs for current periods (current week/month)'
+    help = 'Update productivity logs for current periods (today, current week/month)'
 
     def handle(self, *args, **options):
         self.stdout.write('Updating current period productivity logs...')
-        
+
         today = timezone.localdate()
         users = User.objects.all()
-        
+
+        current_week_start = today - timedelta(days=today.weekday())
+        current_week_end = current_week_start + timedelta(days=6)
+        current_month_start = today.replace(day=1)
+        current_month_end = today.replace(day=monthrange(today.year, today.month)[1])
+        periods = [
+            ('weekly', current_week_start, current_week_end),
+            ('monthly', current_month_start, current_month_end),
+        ]
+
+        # Stored values for these periods, so unchanged rows aren't rewritten
+        stored = {
+            (log['user_id'], log['period_type'], log['period_start'], log['period_end']): log
+            for log in ProductivityLog.objects.filter(
+                period_start__in=[today, current_week_start, current_month_start],
+                period_type__in=['daily', 'weekly', 'monthly'],
+            ).values('user_id', 'period_type', 'period_start', 'period_end',
+                     'completion_rate', 'total_tasks', 'completed_tasks', 'status', 'is_dirty')
+        }
+
+        logs = []
+        unchanged = 0
         for user in users:
             self.stdout.write(f'\nProcessing user: {user.username}')
-            
-            # Update current week
-            current_week_start = today - timedelta(days=today.weekday())
-            current_week_end = current_week_start + timedelta(days=6)
-            
-            self.stdout.write(f'Current week: {current_week_start} to {current_week_end}')
-            
-            # Calculate productivity for current week by aggregating daily data
-            total_tasks = 0
-            completed_tasks = 0
-            current_date = current_week_start
-            while current_date <= current_week_end:
-                daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                
-                daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-                daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                
-                total_tasks += daily_total
-                completed_tasks += daily_completed
-                current_date += timedelta(days=1)
-            
-            if total_tasks == 0:
-                completion_rate = 0
-                status = 'No Tasks'
-            else:
-                completion_rate = completed_tasks / total_tasks * 100
-                if completion_rate >= 90:
-                    status = 'Highly Productive'
-                elif completion_rate >= 70:
-                    status = 'Productive'
-                elif completion_rate >= 40:
-                    status = 'Moderately Productive'
-                else:
-                    status = 'Low Productive'
-            
-            # Update or create weekly log
-            log, created = ProductivityLog.objects.get_or_create(
-                user=user,
-                period_type='weekly',
-                period_start=current_week_start,
-                period_end=current_week_end,
-                defaults={
-                    'completion_rate': completion_rate,
-                    'total_tasks': total_tasks,
-                    'completed_tasks': completed_tasks,
-                    'status': status
-                }
-            )
-            
-            if not created:
-                log.completion_rate = completion_rate
-                log.total_tasks = total_tasks
-                log.completed_tasks = completed_tasks
-                log.status = status
-                log.save()
-                self.stdout.write(f'  Updated weekly log: {total_tasks} tasks, {completion_rate:.1f}%, {status}')
-            else:
-                self.stdout.write(f'  Created weekly log: {total_tasks} tasks, {completion_rate:.1f}%, {status}')
-            
-            # Update current month
-            current_month_start = today.replace(day=1)
-            if today.month == 12:
-                current_month_end = today.replace(year=today.year+1, month=1, day=1) - timedelta(days=1)
-            else:
-                current_month_end = today.replace(month=today.month+1, day=1) - timedelta(days=1)
-            
-            self.stdout.write(f'Current month: {current_month_start} to {current_month_end}')
-            
-            # Calculate productivity for current month by aggregating daily data
-            total_tasks = 0
-            completed_tasks = 0
-            current_date = current_month_start
-            while current_date <= current_month_end:
-                daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                
-                daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-                daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                
-                total_tasks += daily_total
-                completed_tasks += daily_completed
-                current_date += timedelta(days=1)
-            
-            if total_tasks == 0:
-                completion_rate = 0
-                status = 'No Tasks'
-            else:
-                completion_rate = completed_tasks / total_tasks * 100
-                if completion_rate >= 90:
-                    status = 'Highly Productive'
-                elif completion_rate >= 70:
-                    status = 'Productive'
-                elif completion_rate >= 40:
-                    status = 'Moderately Productive'
-                else:
-                    status = 'Low Productive'
-            
-            # Update or create monthly log
-            log, created = ProductivityLog.objects.get_or_create(
-                user=user,
-                period_type='monthly',
-                period_start=current_month_start,
-                period_end=current_month_end,
-                defaults={
-                    'completion_rate': completion_rate,
-                    'total_tasks': total_tasks,
-                    'completed_tasks': completed_tasks,
-                    'status': status
-                }
+
+            # One grouped query per user covers both the current week and month.
+            # Week and month rates are the average of daily percentages (days
+            # without tasks count as 0%), the figure the weekly/monthly progress
+            # views show; this command used to store completed/total instead
+            rollups = compute_rollups(user, [(start, end) for _, start, end in periods])
+
+            # Today's log counts tasks by when the work was done, like the daily view
+            day_counts = get_work_date_counts(user, today, today)[today]
+            completion_rate = (
+                day_counts['completed'] / day_counts['total'] * 100 if day_counts['total'] > 0 else 0
             )
-            
-            if not created:
-                log.completion_rate = completion_rate
-                log.total_tasks = total_tasks
-                log.completed_tasks = completed_tasks
-                log.status = status
-                log.save()
-                self.stdout.write(f'  Updated monthly log: {total_tasks} tasks, {completion_rate:.1f}%, {status}')
-            else:
-                self.stdout.write(f'  Created monthly log: {total_tasks} tasks, {completion_rate:.1f}%, {status}')
-        
-        self.stdout.write(self.style.SUCCESS('\nSuccessfully updated current period productivity logs!'))
\ No newline at end of file
+            rollups[(today, today)] = {
+                'completion_rate': round(completion_rate, 2),
+                'total_tasks': day_counts['total'],
+                'completed_tasks': day_counts['completed'],
+                'status': get_productivity_status(completion_rate, day_counts['total']),
+            }
+
+            for period_type, period_start, period_end in [('daily', today, today)] + periods:
+                values = rollups[(period_start, period_end)]
+                current = stored.get((user.id, period_type, period_start, period_end))
+                if current and not current['is_dirty'] \
+                        and all(current[field] == value for field, value in values.items()):
+                    unchanged += 1
+                    continue
+                logs.append(ProductivityLog(
+                    user=user,
+                    period_type=period_type,
+                    period_start=period_start,
+                    period_end=period_end,
+                    **values
+                ))
+                self.stdout.write(
+                    f"  {period_type} {period_start} to {period_end}: {values['total_tasks']} tasks, "
+                    f"{values['completion_rate']:.1f}%, {values['status']}"
+                )
+
+        # Write every user's logs in batched upserts instead of one save per row
+        written = bulk_upsert_productivity_logs(logs)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nSuccessfully updated {len(written)} current period productivity logs ({unchanged} unchanged)!'
+        ))
@@ -32,6 +32,12 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Duplicate checks in send_notifications
+            models.Index(fields=['user', 'notification_type', 'title', 'created_at'], name='notif_dedupe_idx'),
+            # A user's notification list, newest first
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -24,6 +24,33 @@ def send_notifications_job():
     except Exception as e:
         logger.error(f"❌ Error during scheduled notifications check: {e}")
 
+def reconcile_streaks_job():
+    """Job to recompute persisted streaks and fix any drift"""
+    try:
+        logger.info("🔥 Running scheduled streak reconcile...")
+        call_command('reconcile_streaks')
+        logger.info("✅ Scheduled streak reconcile completed")
+    except Exception as e:
+        logger.error(f"❌ Error during scheduled streak reconcile: {e}")
+
+def refresh_productivity_rollups_job():
+    """Job to recompute weekly/monthly productivity logs marked dirty"""
+    try:
+        logger.info("📊 Running scheduled productivity rollup refresh...")
+        call_command('refresh_productivity_rollups')
+        logger.info("✅ Scheduled productivity rollup refresh completed")
+    except Exception as e:
+        logger.error(f"❌ Error during scheduled productivity rollup refresh: {e}")
+
+def update_current_productivity_job():
+    """Job to persist productivity logs for today and the current week/month"""
+    try:
+        logger.info("📈 Running scheduled current productivity update...")
+        call_command('update_current_productivity')
+        logger.info("✅ Scheduled current productivity update completed")
+    except Exception as e:
+        logger.error(f"❌ Error during scheduled current productivity update: {e}")
+
 def start_scheduler():
     """Start the background scheduler for automated tasks"""
     global scheduler
@@ -55,10 +82,42 @@ def start_scheduler():
             replace_existing=True
         )
         
+        # Reconcile streaks nightly, just after the day rolls over
+        scheduler.add_job(
+            reconcile_streaks_job,
+            'cron',
+            hour=0,
+            minute=5,
+            id='reconcile_streaks_nightly',
+            replace_existing=True
+        )
+        
+        # Refresh dirty productivity rollups every 15 minutes
+        scheduler.add_job(
+            refresh_productivity_rollups_job,
+            'cron',
+            minute='*/15',
+            id='refresh_productivity_rollups',
+            replace_existing=True
+        )
+        
+        # Persist current-period productivity logs every 30 minutes
+        # (the productivity endpoint itself is read-only)
+        scheduler.add_job(
+            update_current_productivity_job,
+            'cron',
+            minute='*/30',
+            id='update_current_productivity',
+            replace_existing=True
+        )
+        
         scheduler.start()
         logger.info("✅ Scheduler started:")
         logger.info("   - Trash auto-purge: Daily at 3:00 AM")
         logger.info("   - Email notifications: Every 6 hours (6 AM, 12 PM, 6 PM, 12 AM)")
+        logger.info("   - Streak reconcile: Daily at 12:05 AM")
+        logger.info("   - Productivity rollup refresh: Every 15 minutes")
+        logger.info("   - Current productivity update: Every 30 minutes")
         
     except Exception as e:
         logger.error(f"❌ Failed to start scheduler: {e}")
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'whitenoise.runserver_nostatic',  # WhiteNoise for static files in production
     'rest_framework',
     'rest_framework_simplejwt',
@@ -295,15 +296,30 @@ except ValueError:
 # Site settings for email links
 SITE_NAME = os.getenv('SITE_NAME', 'Prodactivity')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
-
-# Simple cache for password reset tokens
+# Public origin of this API; note images are linked from note content under it
+BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:8000')
+
+# Cache for password reset tokens and per-user progress summaries.
+# It must be shared by every process: summaries are invalidated by version
+# bumps from web workers, scheduler jobs and management commands alike, so a
+# per-process cache (LocMemCache) would serve stale summaries and wrong 304s.
+# Defaults to a database table (created by the core migrations or
+# createcachetable); set CACHE_BACKEND/CACHE_LOCATION for e.g.
+# django.core.cache.backends.redis.RedisCache with redis://host:6379/1.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'prodactivity-cache',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'prodactivity_cache'),
     }
 }
 
+# Seconds a cached progress summary is kept (it is also invalidated on writes)
+try:
+    PROGRESS_CACHE_TIMEOUT = int(os.getenv('PROGRESS_CACHE_TIMEOUT', '600'))
+except ValueError:
+    print("Warning: Invalid PROGRESS_CACHE_TIMEOUT value, using default 600")
+    PROGRESS_CACHE_TIMEOUT = 600
+
 # CORS settings - allow from environment variable or use defaults
 CORS_ALLOWED_ORIGINS_ENV = os.getenv('CORS_ALLOWED_ORIGINS', '')
 if CORS_ALLOWED_ORIGINS_ENV:
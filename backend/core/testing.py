@@ -0,0 +1,88 @@
+"""
+Test case bases shared by the app test suites.
+"""
+
+import re
+from unittest import mock
+
+import requests
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+
+class OfflineTestCase(TestCase):
+    """
+    Gives each test an authenticated API client for its own user and keeps the
+    Supabase sync signals from reaching the network.
+    """
+
+    def setUp(self):
+        patcher = mock.patch('requests.sessions.Session.request', side_effect=requests.ConnectionError('offline'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username=f'{self.__class__.__name__.lower()}-user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    EXPLAIN the queries a hot read path actually runs and fail if any of them
+    falls back to a sequential scan of its table.
+
+    Subclasses build realistic data volumes in setUpTestData (bulk_create
+    skips the Supabase sync signals), call analyze() at the end, and should be
+    skipped unless the database is PostgreSQL.
+    """
+    USERS = 40
+
+    @classmethod
+    def create_users(cls):
+        User.objects.bulk_create([User(username=f'plan-user-{i}') for i in range(cls.USERS)])
+        users = list(User.objects.filter(username__startswith='plan-user-').order_by('id'))
+        cls.user = users[0]
+        return users
+
+    @classmethod
+    def analyze(cls):
+        # Give the planner real statistics
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_ok(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertNoSequentialScan(self, query, table):
+        """
+        query is a queryset, or a callable (a helper or API request) whose
+        SELECTs on the table are captured and explained as they were run.
+        """
+        if isinstance(query, QuerySet):
+            plans = [query.explain()]
+        else:
+            with CaptureQueriesContext(connection) as captured:
+                query()
+            statements = [
+                q['sql'] for q in captured.captured_queries
+                if q['sql'].startswith('SELECT') and f'"{table}"' in q['sql']
+            ]
+            self.assertTrue(statements, f'No query on {table} was run')
+            plans = []
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(f'EXPLAIN {sql}')
+                    plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+        for plan in plans:
+            self.assertIsNone(re.search(rf'Seq Scan on {table}\b', plan), f'Sequential scan on {table}:\n{plan}')
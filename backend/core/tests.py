@@ -0,0 +1,38 @@
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.utils import timezone
+
+from core.models import Notification
+from core.testing import QueryPlanTestCase
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked against PostgreSQL')
+class NotificationQueryPlanTests(QueryPlanTestCase):
+    NOTIFICATIONS_PER_USER = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        users = cls.create_users()
+        Notification.objects.bulk_create([
+            Notification(
+                user=user,
+                title=f'Task Due Soon: Task {i}',
+                message='Reminder',
+                notification_type=('task_due', 'general', 'social_follow')[i % 3],
+            )
+            for user in users for i in range(cls.NOTIFICATIONS_PER_USER)
+        ], batch_size=2000)
+        cls.analyze()
+
+    def test_notification_duplicate_check(self):
+        # Same shape as the lookup in send_notifications
+        queryset = Notification.objects.filter(
+            user=self.user,
+            notification_type='task_due',
+            title='Task Due Soon: Task 3',
+            created_at__gte=timezone.now() - timedelta(hours=1),
+        )[:1]
+        self.assertNoSequentialScan(queryset, 'core_notification')
+
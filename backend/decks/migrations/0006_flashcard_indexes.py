@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decks', '0005_deck_archiving'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'deck', '-created_at'], name='flashcard_user_deck_idx'),
+        ),
+    ]
@@ -40,6 +40,10 @@ class Flashcard(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A user's flashcards, optionally per deck, newest first
+            models.Index(fields=['user', 'deck', '-created_at'], name='flashcard_user_deck_idx'),
+        ]
 
     def __str__(self):
         return f"{self.front[:30]}... ({self.deck.title})"
@@ -1,3 +1,30 @@
-from django.test import TestCase
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+
+from core.testing import QueryPlanTestCase
+from decks.models import Deck, Flashcard
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked against PostgreSQL')
+class FlashcardQueryPlanTests(QueryPlanTestCase):
+    FLASHCARDS_PER_USER = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        users = cls.create_users()
+        Deck.objects.bulk_create([Deck(user=user, title=f'Deck {j}') for user in users for j in range(4)])
+        decks = {}
+        for deck in Deck.objects.filter(user__in=users):
+            decks.setdefault(deck.user_id, []).append(deck)
+        cls.deck = decks[cls.user.id][0]
+        Flashcard.objects.bulk_create([
+            Flashcard(user=user, deck=decks[user.id][i % 4], front=f'Q{i}', back=f'A{i}')
+            for user in users for i in range(cls.FLASHCARDS_PER_USER)
+        ], batch_size=2000)
+        cls.analyze()
+
+    def test_flashcards_in_deck(self):
+        self.assertNoSequentialScan(
+            lambda: self.get_ok(f'/api/decks/flashcards/?deck={self.deck.id}'), 'decks_flashcard'
+        )
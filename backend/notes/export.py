@@ -0,0 +1,256 @@
+"""
+Note export to PDF and DOCX.
+
+An export job covers one note, a list of notes or a whole notebook. Notes are
+loaded one at a time, and each image is copied once into a per-job temp
+directory (from the image store, or decoded from a legacy data URI) and
+handed to ReportLab / python-docx as the original encoded file rather than
+being decoded and re-encoded through PIL. The document is written to a
+spooled temporary file that spills to disk once it grows, and is streamed
+back to the client from there.
+"""
+
+import logging
+import os
+import re
+import tempfile
+from xml.sax.saxutils import escape
+
+from bs4 import BeautifulSoup
+from docx import Document
+from docx.shared import Inches
+from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image as ReportLabImage
+
+from .images import STORED_IMAGE_URL_RE, decode_inline_image
+from .models import Note, NoteImage
+
+logger = logging.getLogger(__name__)
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    'pdf': ('application/pdf', 'pdf'),
+    'doc': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
+}
+
+# Most notes a single export job may contain
+MAX_EXPORT_NOTES = 200
+
+# Exports larger than this are spooled to disk instead of memory
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Images are scaled down to fit this width; pixels are taken as 1/96 inch
+IMAGE_MAX_WIDTH_INCHES = 5
+IMAGE_DPI = 96
+
+# Marks an image's position in the extracted text; can't occur in note text
+IMAGE_MARKER = '\x00IMAGE_{}\x00'
+IMAGE_MARKER_RE = re.compile('^\x00IMAGE_(\\d+)\x00$')
+
+
+def html_to_export_blocks(html_content):
+    """
+    Lines of text and images of note content, in document order.
+
+    Returns:
+        list: ('text', line), ('blank', None) or ('image', src) tuples
+    """
+    if not html_content:
+        return []
+    soup = BeautifulSoup(html_content, 'html.parser')
+    text_parts = []
+    srcs = []
+
+    def process_element(element):
+        if element.name == 'img':
+            text_parts.append('\n' + IMAGE_MARKER.format(len(srcs)) + '\n')
+            srcs.append(element.get('src', ''))
+        elif hasattr(element, 'children'):
+            for child in element.children:
+                if isinstance(child, str):
+                    if child.strip():
+                        text_parts.append(child.strip())
+                else:
+                    process_element(child)
+        elif hasattr(element, 'string') and element.string:
+            text = element.string.strip()
+            if text:
+                text_parts.append(text)
+
+    for element in soup.children:
+        if isinstance(element, str):
+            if element.strip():
+                text_parts.append(element.strip())
+        else:
+            process_element(element)
+
+    clean_text = '\n'.join(text_parts).replace('\xa0', ' ')
+    # Normalize whitespace but preserve line breaks
+    clean_text = re.sub(r'[ \t]+', ' ', clean_text)
+    clean_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', clean_text)
+
+    blocks = []
+    for line in clean_text.split('\n'):
+        line = line.strip(' \t\r\n')
+        marker = IMAGE_MARKER_RE.match(line)
+        if marker:
+            blocks.append(('image', srcs[int(marker.group(1))]))
+        elif line:
+            blocks.append(('text', line))
+        else:
+            blocks.append(('blank', None))
+    return blocks
+
+
+class ExportImages:
+    """
+    Image files for one export job, written to a temp directory on first use.
+
+    Each distinct image is fetched and written once, so only one image's
+    bytes are in memory at a time and repeated images are reused.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+
+    def get(self, src):
+        """
+        Returns:
+            tuple: (path, width_px, height_px) or None if the image can't be exported
+        """
+        stored = STORED_IMAGE_URL_RE.search(src)
+        if stored:
+            key = stored.group('sha256')
+        elif src.startswith('data:image') and ';base64,' in src[:100]:
+            key = src
+        else:
+            if src.startswith('http://') or src.startswith('https://'):
+                logger.info("Skipping external image URL: %s", src)
+            return None
+        if key not in self.files:
+            self.files[key] = self._write(stored.group('sha256') if stored else None, src)
+        return self.files[key]
+
+    def _write(self, sha256, src):
+        if sha256:
+            row = NoteImage.objects.filter(sha256=sha256).values_list('content_type', 'width', 'height', 'data').first()
+            if row is None:
+                return None
+            content_type, width, height, data = row
+        else:
+            # Legacy note still holding a data URI
+            image = decode_inline_image(src.split(',', 1)[1])
+            if image is None:
+                return None
+            content_type, width, height, data = image.content_type, image.width, image.height, image.data
+        path = os.path.join(self.directory, f'{len(self.files)}.{content_type.split("/")[1]}')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path, width, height
+
+
+def iter_export_notes(note_ids):
+    """Notes in the given order, loaded one at a time"""
+    for note_id in note_ids:
+        note = Note.objects.filter(id=note_id).only('id', 'title', 'content').first()
+        if note is not None:
+            yield note
+
+
+def write_pdf(notes, output, images):
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    content_style = ParagraphStyle(
+        'CustomContent',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=12,
+        alignment=TA_LEFT
+    )
+    max_width = IMAGE_MAX_WIDTH_INCHES * inch
+
+    story = []
+    for index, note in enumerate(notes):
+        if index:
+            story.append(PageBreak())
+        story.append(Paragraph(escape(note.title), title_style))
+        story.append(Spacer(1, 20))
+        for kind, value in html_to_export_blocks(note.content):
+            if kind == 'blank':
+                story.append(Spacer(1, 12))
+            elif kind == 'text':
+                story.append(Paragraph(escape(value), content_style))
+            else:
+                image = images.get(value)
+                if image is None:
+                    continue
+                path, width_px, height_px = image
+                # Pixels to points, scaled down to the max width
+                width = width_px * inch / IMAGE_DPI
+                height = height_px * inch / IMAGE_DPI
+                if width > max_width:
+                    width, height = max_width, height * max_width / width
+                # lazy=2 opens the file only while the image is drawn
+                story.append(ReportLabImage(path, width=width, height=height, lazy=2))
+                story.append(Spacer(1, 12))
+    doc.build(story)
+
+
+def write_docx(notes, output, images):
+    doc = Document()
+    for index, note in enumerate(notes):
+        if index:
+            doc.add_page_break()
+        doc.add_heading(note.title, 0)
+        for kind, value in html_to_export_blocks(note.content):
+            if kind == 'blank':
+                doc.add_paragraph()
+            elif kind == 'text':
+                doc.add_paragraph(value)
+            else:
+                image = images.get(value)
+                if image is None:
+                    continue
+                path, width_px, height_px = image
+                width_in = min(width_px / IMAGE_DPI, IMAGE_MAX_WIDTH_INCHES)
+                try:
+                    doc.add_paragraph().add_run().add_picture(path, width=Inches(width_in))
+                except Exception:
+                    logger.exception("Error adding image to DOCX")
+    doc.save(output)
+
+
+WRITERS = {'pdf': write_pdf, 'doc': write_docx}
+
+
+def export_notes_file(note_ids, format_type):
+    """
+    Write the notes into one document.
+
+    Args:
+        note_ids: notes to export, in document order
+        format_type: key of EXPORT_FORMATS
+
+    Returns:
+        SpooledTemporaryFile positioned at the start of the document
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        with tempfile.TemporaryDirectory(prefix='note-export-') as directory:
+            WRITERS[format_type](iter_export_notes(note_ids), output, ExportImages(directory))
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
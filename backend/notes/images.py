@@ -0,0 +1,114 @@
+"""
+Content-addressed store for images embedded in notes.
+
+Editors paste images into note content as ``data:image/...;base64`` URIs.
+When a note is saved they are lifted into NoteImage rows keyed by the
+SHA-256 of their bytes (so the same image is stored once however many notes
+use it) and the ``src`` is rewritten to the image's URL. Those URLs never
+change meaning, so the images are served with long-lived cache headers.
+"""
+
+import base64
+import binascii
+import hashlib
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image as PILImage
+
+from .models import NoteImage
+
+# Raster formats lifted out of content; anything else (SVG in particular,
+# which can carry script) is left inline
+STORED_IMAGE_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/bmp'}
+
+INLINE_IMAGE_RE = re.compile(
+    r'''(?P<prefix>\bsrc\s*=\s*(?P<quote>["']))data:image/[\w.+-]+;base64,(?P<data>[A-Za-z0-9+/=\s]+)(?P=quote)''',
+    re.IGNORECASE,
+)
+STORED_IMAGE_URL_RE = re.compile(r'/api/notes/images/(?P<sha256>[0-9a-f]{64})/')
+
+
+def note_image_url(sha256):
+    """Absolute URL the image is served from (note content is rendered on the frontend's origin)"""
+    return settings.BACKEND_URL.rstrip('/') + reverse('note-image', args=[sha256])
+
+
+def decode_inline_image(data):
+    """
+    Unsaved NoteImage for the base64 payload of a data URI.
+
+    The type is taken from the decoded image, not the URI, so the stored
+    content type always matches the bytes.
+
+    Returns:
+        NoteImage or None if the payload isn't a supported image
+    """
+    try:
+        raw = base64.b64decode(''.join(data.split()), validate=True)
+        with PILImage.open(BytesIO(raw)) as img:
+            content_type = PILImage.MIME.get(img.format)
+            width, height = img.size
+    except (binascii.Error, ValueError, OSError, PILImage.DecompressionBombError):
+        return None
+    if content_type not in STORED_IMAGE_TYPES:
+        return None
+    return NoteImage(
+        sha256=hashlib.sha256(raw).hexdigest(),
+        content_type=content_type,
+        size=len(raw),
+        width=width,
+        height=height,
+        data=raw,
+    )
+
+
+def store_images(images):
+    """Insert the images the store doesn't have yet"""
+    images = {image.sha256: image for image in images}
+    if not images:
+        return
+    existing = set(NoteImage.objects.filter(sha256__in=images).values_list('sha256', flat=True))
+    # ignore_conflicts covers the same image being lifted concurrently
+    NoteImage.objects.bulk_create(
+        [image for sha256, image in images.items() if sha256 not in existing],
+        ignore_conflicts=True,
+    )
+
+
+def lift_inline_images(content):
+    """
+    Move inline base64 images in HTML content into the image store.
+
+    Returns:
+        str: the content with each stored image's src pointing at its URL
+    """
+    if not content or 'data:image' not in content:
+        return content
+    images = []
+
+    def replace(match):
+        image = decode_inline_image(match.group('data'))
+        if image is None:
+            return match.group(0)
+        images.append(image)
+        return f"{match.group('prefix')}{note_image_url(image.sha256)}{match.group('quote')}"
+
+    content = INLINE_IMAGE_RE.sub(replace, content)
+    store_images(images)
+    return content
+
+
+def load_stored_images(srcs):
+    """
+    Stored images referenced by the given img src values, in one query.
+
+    Returns:
+        dict: {sha256: NoteImage}
+    """
+    hashes = {match.group('sha256') for match in map(STORED_IMAGE_URL_RE.search, srcs) if match}
+    if not hashes:
+        return {}
+    return NoteImage.objects.in_bulk(hashes)
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from notes.images import lift_inline_images
+from notes.models import Note, NoteImage
+
+class Command(BaseCommand):
+    help = ('Move base64 images embedded in existing notes into the note image store and '
+            'point their src at the stored image. Run export_to_supabase afterwards to slim the Supabase copies.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Specific username to process'
+        )
+
+    def handle(self, *args, **options):
+        notes = Note.objects.filter(content__contains='data:image')
+        if options.get('user'):
+            notes = notes.filter(user__username=options['user'])
+
+        images_before = NoteImage.objects.count()
+        updated = 0
+        bytes_saved = 0
+        # One note in memory at a time; embedded images make single notes large
+        for note_id in list(notes.values_list('id', flat=True)):
+            content = Note.objects.filter(id=note_id).values_list('content', flat=True).first()
+            lifted = lift_inline_images(content)
+            if lifted == content:
+                continue
+            # Plain update: the text and updated_at are unchanged, only image sources move
+            Note.objects.filter(id=note_id).update(content=lifted)
+            updated += 1
+            bytes_saved += len(content) - len(lifted)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Lifted images out of {updated} notes "
+            f"({NoteImage.objects.count() - images_before} new images stored, "
+            f"{bytes_saved / (1024 * 1024):.1f} MB removed from note content)"
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_remove_notebook_name_unique_constraint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_archived', False), ('is_deleted', False)), fields=['user', 'notebook', '-updated_at'], name='note_active_nb_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_archived', False), ('is_deleted', False)), fields=['user', '-updated_at'], name='note_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['user', 'is_deleted', 'is_archived', '-updated_at'], name='note_user_state_idx'),
+        ),
+    ]
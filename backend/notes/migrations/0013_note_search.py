@@ -0,0 +1,59 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:47
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+
+def html_to_search_text(content):
+    # Frozen copy of notes.search.html_to_search_text as of this migration
+    from bs4 import BeautifulSoup
+
+    if not content:
+        return ''
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup(['script', 'style']):
+        element.decompose()
+    return ' '.join(soup.get_text(separator=' ').split())
+
+
+def backfill_search_text(apps, schema_editor):
+    Note = apps.get_model('notes', 'Note')
+    batch = []
+    for note in Note.objects.only('id', 'content').iterator(chunk_size=500):
+        note.search_text = html_to_search_text(note.content)
+        batch.append(note)
+        if len(batch) >= 500:
+            Note.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        Note.objects.bulk_update(batch, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0012_note_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        # Fill the text before the generated column exists so the vectors are
+        # computed once, when the column is added
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='note',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('search_text', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='note_search_vector_idx'),
+        ),
+    ]
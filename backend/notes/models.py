@@ -1,11 +1,21 @@
 # notes/models.py
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils import timezone
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .supabase_sync import sync_notebook_to_supabase, update_notebook_in_supabase, sync_note_to_supabase, update_note_in_supabase
 
+class NotebookQuerySet(models.QuerySet):
+    def with_notes_count(self):
+        """Annotate active_notes_count (same rules as notes_count) in the same query"""
+        return self.annotate(active_notes_count=models.Count(
+            'notes',
+            filter=models.Q(notes__is_deleted=False) & (models.Q(is_archived=True) | models.Q(notes__is_archived=False)),
+        ))
+
 class Notebook(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notebooks')
@@ -17,6 +27,8 @@ class Notebook(models.Model):
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
     
+    objects = NotebookQuerySet.as_manager()
+    
     class Meta:
         verbose_name_plural = "Notebooks"
         ordering = ['name']
@@ -26,6 +38,9 @@ class Notebook(models.Model):
     
     @property
     def notes_count(self):
+        # Querysets annotated with with_notes_count() carry the count already
+        if hasattr(self, 'active_notes_count'):
+            return self.active_notes_count
         # If notebook is archived, count all non-deleted notes (including archived ones)
         # If notebook is not archived, count only non-archived, non-deleted notes
         if self.is_archived:
@@ -33,6 +48,11 @@ class Notebook(models.Model):
         else:
             return self.notes.filter(is_deleted=False, is_archived=False).count()
 
+class NoteManager(models.Manager):
+    def get_queryset(self):
+        # The search copies are only used by search queries; don't load them with every row
+        return super().get_queryset().defer('search_text', 'search_vector')
+
 class Note(models.Model):
     NOTE_TYPE_CHOICES = [
         ('lecture', 'Lecture Notes'),
@@ -70,11 +90,65 @@ class Note(models.Model):
     archived_at = models.DateTimeField(null=True, blank=True)
     last_visited = models.DateTimeField(null=True, blank=True)
     
+    # Plain text of content for full-text search, kept current in save()
+    search_text = models.TextField(blank=True, default='', editable=False)
+    # Full-text search document, maintained by Postgres (title weighted above content)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('title', weight='A', config='english')
+        + SearchVector('search_text', weight='B', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    
+    objects = NoteManager()
+    
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Active notes, optionally per notebook, newest first
+            models.Index(fields=['user', 'notebook', '-updated_at'], name='note_active_nb_updated_idx',
+                         condition=models.Q(is_deleted=False, is_archived=False)),
+            models.Index(fields=['user', '-updated_at'], name='note_active_updated_idx',
+                         condition=models.Q(is_deleted=False, is_archived=False)),
+            # Trash and archive listings
+            models.Index(fields=['user', 'is_deleted', 'is_archived', '-updated_at'], name='note_user_state_idx'),
+            GinIndex(fields=['search_vector'], name='note_search_vector_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.user.username})"
+    
+    def save(self, *args, **kwargs):
+        # Re-derive the search text whenever content is written. Assigning it
+        # also un-defers the field, so saves of deferred instances write it too.
+        update_fields = kwargs.get('update_fields')
+        if 'content' in self.__dict__ and (update_fields is None or 'content' in update_fields):
+            from .images import lift_inline_images
+            from .search import html_to_search_text
+            # Pasted images move to the image store; content keeps only their URLs
+            self.content = lift_inline_images(self.content)
+            self.search_text = html_to_search_text(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
+
+
+class NoteImage(models.Model):
+    """Image lifted out of note content, stored once per distinct image.
+
+    Keyed by the SHA-256 of the image bytes, so an image pasted into many
+    notes is stored once and its URL always serves the same bytes.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=50)
+    size = models.PositiveIntegerField()
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.content_type}, {self.size} bytes)"
 
 
 # =============================================
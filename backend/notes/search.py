@@ -0,0 +1,128 @@
+"""
+Full-text search over notes.
+
+Note.search_text holds the note content with the HTML stripped (kept current
+in Note.save), and Note.search_vector is a generated tsvector over the title
+and that text with a GIN index. Global search is an indexed ``@@`` match
+ranked with ts_rank, so its cost follows the number of matches rather than
+the size of every note the user has written.
+"""
+
+import base64
+import html
+import json
+import re
+
+from bs4 import BeautifulSoup
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'english'
+
+# Page size for global search results
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+HEADLINE_START = '<mark>'
+HEADLINE_STOP = '</mark>'
+
+
+def html_to_search_text(content):
+    """Plain text of a note's HTML content, whitespace collapsed"""
+    if not content:
+        return ''
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup(['script', 'style']):
+        element.decompose()
+    return ' '.join(soup.get_text(separator=' ').split())
+
+
+def note_search_query(text):
+    """
+    tsquery matching notes that contain every word of the search text.
+
+    The last word is treated as a prefix so results keep up while the user is
+    still typing it; punctuation is dropped so user input can't produce
+    invalid tsquery syntax.
+
+    Returns:
+        SearchQuery or None when the text has no searchable words
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    terms[-1] += ':*'
+    return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def encode_search_cursor(rank, note_id):
+    """Opaque cursor pointing just past the given result"""
+    return base64.urlsafe_b64encode(json.dumps([rank, note_id]).encode()).decode()
+
+
+def decode_search_cursor(cursor):
+    """
+    Returns:
+        tuple: (rank, note_id)
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        rank, note_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(note_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def safe_headline(headline):
+    """
+    Escape a ts_headline snippet, keeping only the match markers as markup.
+
+    The snippet is cut from plain text, so any markup in it came from
+    entities in the note (``&lt;`` and friends) and must not be rendered.
+    """
+    pattern = f'({re.escape(HEADLINE_START)}|{re.escape(HEADLINE_STOP)})'
+    return ''.join(
+        part if part in (HEADLINE_START, HEADLINE_STOP) else html.escape(part, quote=False)
+        for part in re.split(pattern, headline or '')
+    )
+
+
+def search_notes(queryset, query, limit=DEFAULT_SEARCH_LIMIT, cursor=None):
+    """
+    One page of notes matching the query, best match first.
+
+    Each note is annotated with ``rank`` and a ``headline`` snippet of the
+    matching text. Results are ordered by (rank, id) descending and paged by
+    keyset, so later pages cost the same as the first. The headline isn't part
+    of the ordering, so Postgres only builds it for the rows on the page.
+
+    Args:
+        queryset: notes to search (already scoped to the user)
+        query: SearchQuery from note_search_query
+        cursor: (rank, note_id) of the last result on the previous page
+
+    Returns:
+        tuple: (notes, next_cursor) where next_cursor is None on the last page
+    """
+    # Ranks are float4 in Postgres; compare them as float8 so the value
+    # round-tripped through the cursor is exactly the one in the database
+    notes = queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        headline=SearchHeadline(
+            'search_text', query, config=SEARCH_CONFIG,
+            start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP,
+            max_words=35, min_words=15, max_fragments=2,
+        ),
+    )
+    if cursor is not None:
+        rank, note_id = cursor
+        notes = notes.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=note_id))
+    notes = list(notes.order_by('-rank', '-id')[:limit + 1])
+    next_cursor = None
+    if len(notes) > limit:
+        notes = notes[:limit]
+        next_cursor = encode_search_cursor(notes[-1].rank, notes[-1].id)
+    return notes, next_cursor
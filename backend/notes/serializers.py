@@ -24,4 +24,15 @@ class NoteSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class NoteSummarySerializer(serializers.ModelSerializer):
+    """Note list entry without content: a plain-text preview and the content length instead"""
+    notebook_name = serializers.CharField(source='notebook.name', read_only=True)
+    preview = serializers.CharField(read_only=True)
+    content_length = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Note
+        fields = ['id', 'title', 'preview', 'content_length', 'notebook', 'notebook_name', 'note_type', 'priority', 'is_urgent', 'tags', 'created_at', 'updated_at', 'is_deleted', 'deleted_at', 'is_archived', 'archived_at', 'last_visited']
+        read_only_fields = fields
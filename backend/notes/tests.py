@@ -1,3 +1,358 @@
-from django.test import TestCase
+import base64
+import hashlib
+import re
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from docx import Document
+from PIL import Image as PILImage
+
+from core.testing import OfflineTestCase, QueryPlanTestCase
+from notes.images import note_image_url
+from notes.models import Notebook, Note, NoteImage
+from notes.search import (
+    decode_search_cursor, encode_search_cursor, html_to_search_text, note_search_query, safe_headline, search_notes,
+)
+
+
+def png(color):
+    output = BytesIO()
+    PILImage.new('RGB', (4, 3), color).save(output, format='PNG')
+    return output.getvalue()
+
+
+def data_uri(data):
+    return f'data:image/png;base64,{base64.b64encode(data).decode()}'
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked against PostgreSQL')
+class NoteQueryPlanTests(QueryPlanTestCase):
+    NOTES_PER_USER = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        users = cls.create_users()
+        Notebook.objects.bulk_create([Notebook(user=user, name=f'Notebook {j}') for user in users for j in range(4)])
+        notebooks = {}
+        for notebook in Notebook.objects.filter(user__in=users):
+            notebooks.setdefault(notebook.user_id, []).append(notebook)
+        cls.notebook = notebooks[cls.user.id][0]
+        Note.objects.bulk_create([
+            Note(
+                user=user,
+                notebook=notebooks[user.id][i % 4],
+                title=f'Note {i}',
+                content='Lorem ipsum ' * 20,
+                search_text='Lorem ipsum ' * 20,
+                is_deleted=i % 15 == 0,
+                is_archived=i % 20 == 0,
+            )
+            for user in users for i in range(cls.NOTES_PER_USER)
+        ], batch_size=2000)
+        cls.analyze()
+
+    def test_active_notes_in_notebook(self):
+        self.assertNoSequentialScan(
+            lambda: self.get_ok(f'/api/notes/?notebook={self.notebook.id}&summary=true'), 'notes_note'
+        )
+
+    def test_trashed_notes(self):
+        self.assertNoSequentialScan(lambda: self.get_ok('/api/trash/notes/'), 'notes_note')
+
+    def test_note_full_text_search(self):
+        self.assertNoSequentialScan(
+            lambda: search_notes(Note.objects.filter(user=self.user, is_deleted=False), note_search_query('Note 4')),
+            'notes_note',
+        )
+
+
+class NoteSearchTests(OfflineTestCase):
+    url = '/api/notes/global-search/'
+
+    def setUp(self):
+        super().setUp()
+        self.notebook = Notebook.objects.create(user=self.user, name='Biology')
+
+    def note(self, title, content, **kwargs):
+        return Note.objects.create(user=self.user, notebook=self.notebook, title=title, content=content, **kwargs)
+
+    def test_search_text_follows_content(self):
+        self.assertEqual(
+            html_to_search_text('<h1>Cells</h1><script>alert(1)</script><p>Mito&shy;chondria <b>make</b>\n ATP</p>'),
+            'Cells Mito\xadchondria make ATP',
+        )
+        note = self.note('Cells', '<p>Ribosomes</p>')
+        note.content = '<p>Golgi apparatus</p>'
+        note.save(update_fields=['content'])
+        self.assertEqual(Note.objects.get(id=note.id).search_text, 'Golgi apparatus')
+
+    def test_headlines_and_cursors_are_safe(self):
+        self.assertEqual(
+            safe_headline('<mark>x</mark> &lt;b&gt; <script>'), '<mark>x</mark> &amp;lt;b&amp;gt; &lt;script&gt;'
+        )
+        self.assertEqual(decode_search_cursor(encode_search_cursor(0.25, 7)), (0.25, 7))
+        self.assertIsNone(note_search_query(' ?! '))
+
+        self.assertEqual(self.client.get(self.url, {'q': 'cell', 'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'cell', 'limit': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': '***'}).data, {'results': [], 'next_cursor': None})
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_ranking_prefix_match_and_cursor_pages(self):
+        in_title = self.note('Mitochondria', '<p>The powerhouse</p>')
+        in_body = [self.note(f'Chapter {i}', '<p>Energy comes from the mitochondria</p>') for i in range(4)]
+        self.note('Archived mitochondria', '<p>mitochondria</p>', is_archived=True)
+        self.note('Deleted mitochondria', '<p>mitochondria</p>', is_deleted=True)
+        self.note('Plants', '<p>Chloroplasts</p>')
+
+        results, cursor, pages = [], None, 0
+        while True:
+            params = {'q': 'mitochond', 'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            results += [result for result in response.data['results'] if result['type'] == 'note']
+            pages += 1
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        # Title matches outrank body matches; ties come newest id first
+        self.assertEqual(
+            [result['id'] for result in results], [in_title.id] + [note.id for note in reversed(in_body)]
+        )
+        self.assertIn('<mark>mitochondria</mark>', results[1]['content'])
+
+        # Every word must match; stemming lets plural and singular meet
+        self.assertEqual(
+            [r['id'] for r in self.client.get(self.url, {'q': 'energies mitochondria'}).data['results']],
+            [note.id for note in reversed(in_body)],
+        )
+
+
+class NotebookCountTests(OfflineTestCase):
+
+    def add_notebook(self, name, is_archived=False):
+        notebook = Notebook.objects.create(user=self.user, name=name, is_archived=is_archived)
+        Note.objects.bulk_create([
+            Note(user=self.user, notebook=notebook, title='Active'),
+            Note(user=self.user, notebook=notebook, title='Archived', is_archived=True),
+            Note(user=self.user, notebook=notebook, title='Deleted', is_deleted=True),
+        ])
+        return notebook
+
+    def listed_counts(self, archived):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/notes/notebooks/', {'archived': archived})
+        self.assertEqual(response.status_code, 200)
+        return {notebook['name']: notebook['notes_count'] for notebook in response.data}, len(captured)
+
+    def test_list_counts_match_the_per_notebook_rules(self):
+        for i in range(3):
+            self.add_notebook(f'Active {i}')
+        archived = self.add_notebook('Archived', is_archived=True)
+
+        counts, queries = self.listed_counts('false')
+        self.assertEqual(counts, {'Active 0': 1, 'Active 1': 1, 'Active 2': 1})
+        # Archived notebooks count their archived notes too
+        self.assertEqual(self.listed_counts('true')[0], {'Archived': 2})
+        self.assertEqual(Notebook.objects.get(id=archived.id).notes_count, 2)
+
+        # The count rides along in the list query
+        for i in range(3, 8):
+            self.add_notebook(f'Active {i}')
+        self.assertEqual(self.listed_counts('false')[1], queries)
+
+
+class NoteListTests(OfflineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.notebook = Notebook.objects.create(user=self.user, name='Notebook')
+
+    def test_summary_listing_carries_a_preview_instead_of_content(self):
+        content = '<p>' + 'Photosynthesis ' * 30 + '</p>'
+        note = Note.objects.create(user=self.user, notebook=self.notebook, title='Plants', content=content)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/notes/', {'summary': 'true', 'notebook': self.notebook.id})
+        self.assertEqual(response.status_code, 200)
+        [entry] = response.data
+        self.assertNotIn('content', entry)
+        self.assertEqual(entry['id'], note.id)
+        self.assertEqual(entry['notebook_name'], 'Notebook')
+        self.assertEqual(entry['preview'], note.search_text[:200])
+        self.assertEqual(entry['content_length'], len(content))
+        # Content is measured in the database, never selected
+        note_selects = [q['sql'] for q in captured.captured_queries if 'FROM "notes_note"' in q['sql']]
+        self.assertTrue(note_selects)
+        self.assertFalse(any('"notes_note"."content",' in sql for sql in note_selects))
+
+        # The full listing is unchanged
+        [entry] = self.client.get('/api/notes/').data
+        self.assertEqual(entry['content'], content)
+        self.assertNotIn('preview', entry)
+
+    def test_note_detail_revalidates_until_note_changes(self):
+        note = Note.objects.create(user=self.user, notebook=self.notebook, title='Note', content='<p>Hello</p>')
+        url = f'/api/notes/{note.id}/'
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        note.title = 'Renamed'
+        note.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Renamed')
+
+        # Archiving the notebook flips the note without touching updated_at
+        etag = response['ETag']
+        self.client.patch(f'/api/notes/notebooks/{self.notebook.id}/', {'is_archived': True}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class NoteImageTests(OfflineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.notebook = Notebook.objects.create(user=self.user, name='Notebook')
+
+    def test_inline_images_are_lifted_once_and_served(self):
+        red, blue = png('red'), png('blue')
+        red_uri, blue_uri = data_uri(red), data_uri(blue)
+        note = Note.objects.create(
+            user=self.user, notebook=self.notebook, title='Images',
+            content=f'<p>Pic</p><img src="{red_uri}"><img src="{red_uri}"><img src="{blue_uri}">',
+        )
+        Note.objects.create(
+            user=self.user, notebook=self.notebook, title='Same image', content=f'<img src="{red_uri}">'
+        )
+
+        # Stored once per distinct image, however many notes embed it
+        self.assertEqual(NoteImage.objects.count(), 2)
+        image = NoteImage.objects.get(sha256=hashlib.sha256(red).hexdigest())
+        self.assertEqual((image.content_type, image.width, image.height), ('image/png', 4, 3))
+        self.assertNotIn('data:image', note.content)
+        self.assertEqual(note.content.count(f'src="{note_image_url(image.sha256)}"'), 2)
+
+        url = reverse('note-image', args=[image.sha256])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.content, red)
+
+        # The bytes behind a URL never change, so revalidation skips the store
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(reverse('note-image', args=['0' * 64])).status_code, 404)
+
+    def test_unsupported_payloads_stay_inline(self):
+        content = '<img src="data:image/png;base64,bm90IGFuIGltYWdl"><img src="data:image/svg+xml;base64,PHN2Zy8+">'
+        note = Note.objects.create(user=self.user, notebook=self.notebook, title='Broken', content=content)
+        self.assertEqual(note.content, content)
+        self.assertFalse(NoteImage.objects.exists())
+
+    def test_command_lifts_images_out_of_existing_notes(self):
+        red = png('red')
+        content = f'<p>Old</p><img src="{data_uri(red)}">'
+        # Notes saved before the pipeline existed
+        Note.objects.bulk_create([
+            Note(user=self.user, notebook=self.notebook, title=f'Old {i}', content=content) for i in range(2)
+        ])
+        untouched = Note.objects.create(user=self.user, notebook=self.notebook, title='Text', content='<p>Text</p>')
+        updated_at = dict(Note.objects.values_list('id', 'updated_at'))
+
+        output = StringIO()
+        call_command('lift_note_images', stdout=output)
+        self.assertIn('Lifted images out of 2 notes (1 new images stored', output.getvalue())
+
+        image = NoteImage.objects.get()
+        self.assertEqual(image.sha256, hashlib.sha256(red).hexdigest())
+        for note in Note.objects.all():
+            self.assertNotIn('data:image', note.content)
+            self.assertEqual(note.updated_at, updated_at[note.id])
+        self.assertEqual(Note.objects.get(id=untouched.id).content, '<p>Text</p>')
+        self.assertEqual(
+            Note.objects.filter(content=f'<p>Old</p><img src="{note_image_url(image.sha256)}">').count(), 2
+        )
+
+
+class NoteExportTests(OfflineTestCase):
+    url = '/api/notes/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.notebook = Notebook.objects.create(user=self.user, name='Biology')
+        self.red = png('red')
+
+    def note(self, title, content='', **kwargs):
+        return Note.objects.create(user=self.user, notebook=self.notebook, title=title, content=content, **kwargs)
+
+    def export(self, **body):
+        response = self.client.post(self.url, body, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_docx_of_note_ids_keeps_their_order_and_image_bytes(self):
+        stored = self.note('Stored', f'<p>Cells</p><img src="{data_uri(self.red)}">')
+        text = self.note('Text', '<p>Mitochondria</p><p>&amp; ribosomes</p>')
+        # A note saved before images were lifted still exports its data URI
+        Note.objects.bulk_create([
+            Note(user=self.user, notebook=self.notebook, title='Legacy', content=f'<img src="{data_uri(png("blue"))}">')
+        ])
+        legacy = Note.objects.get(title='Legacy')
+
+        response, content = self.export(format='doc', note_ids=[text.id, legacy.id, stored.id, text.id])
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        )
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="notes_export.docx"')
+
+        document = Document(BytesIO(content))
+        self.assertEqual(
+            [p.text for p in document.paragraphs if p.style.name == 'Title'], ['Text', 'Legacy', 'Stored']
+        )
+        self.assertIn('& ribosomes', [p.text for p in document.paragraphs])
+        # Images are embedded as stored, not re-encoded
+        blobs = [part.blob for part in document.part.package.image_parts]
+        self.assertCountEqual(blobs, [self.red, png('blue')])
+
+    def test_pdf_of_a_notebook_has_a_page_per_listed_note(self):
+        for i in range(3):
+            self.note(f'Chapter {i}', f'<p>Page {i}</p><img src="{data_uri(self.red)}">')
+        self.note('Archived', '<p>Hidden</p>', is_archived=True)
+        self.note('Deleted', '<p>Hidden</p>', is_deleted=True)
+
+        response, content = self.export(format='pdf', notebook_id=self.notebook.id)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Biology_export.pdf"')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b(?!s)', content)), 3)
+
+    def test_invalid_jobs_are_rejected(self):
+        note = self.note('Note')
+        other = User.objects.create_user(username='export-other')
+        foreign = Note.objects.create(user=other, notebook=Notebook.objects.create(user=other, name='Other'), title='X')
+
+        def status_of(**body):
+            return self.client.post(self.url, body, format='json').status_code
+
+        self.assertEqual(status_of(format='txt', note_id=note.id), 400)
+        self.assertEqual(status_of(format='pdf'), 400)
+        self.assertEqual(status_of(format='pdf', note_ids=str(note.id)), 400)
+        self.assertEqual(status_of(format='pdf', note_ids=['a']), 400)
+        self.assertEqual(status_of(format='pdf', note_ids=[foreign.id]), 404)
+        self.assertEqual(status_of(format='pdf', notebook_id=foreign.notebook_id), 404)
+        with mock.patch('notes.views.MAX_EXPORT_NOTES', 1):
+            self.assertEqual(status_of(format='pdf', note_ids=[note.id, self.note('Second').id]), 400)
@@ -1,5 +1,5 @@
 # notes/urls.py
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 from .ai_views import SummarizeView, chat, ReviewView, AIAutomaticReviewerView, ConvertToFlashcardsView, NotebookSummaryView, UrgencyDetectionView, SmartChunkingView
 
@@ -11,6 +11,9 @@ urlpatterns = [
     # Global search endpoint
     path('global-search/', views.global_search_notes, name='global-search-notes'),
     
+    # Images lifted out of note content, addressed by their SHA-256
+    re_path(r'^images/(?P<sha256>[0-9a-f]{64})/$', views.note_image, name='note-image'),
+    
     # Notebook endpoints
     path('notebooks/', views.NotebookListCreateView.as_view(), name='notebook-list-create'),
     path('notebooks/<int:pk>/', views.NotebookRetrieveUpdateDestroyView.as_view(), name='notebook-detail'),
@@ -3,30 +3,26 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
-from .models import Notebook, Note
-from .serializers import NotebookSerializer, NoteSerializer
+from django.db.models.functions import Length, Substr
+from django.utils.http import parse_etags
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_safe
+import hashlib
+from .models import Notebook, Note, NoteImage
+from .serializers import NotebookSerializer, NoteSerializer, NoteSummarySerializer
+from .export import export_notes_file, EXPORT_FORMATS, MAX_EXPORT_NOTES
+from .search import (
+    note_search_query, search_notes, safe_headline, decode_search_cursor,
+    DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT,
+)
 import os
 from django.conf import settings
 from rest_framework.decorators import api_view, permission_classes
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import docx
-import tempfile
 from django.utils import timezone
-import io
 import re
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as ReportLabImage
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from docx import Document
-from docx.shared import Inches
-from bs4 import BeautifulSoup
-import base64
-from PIL import Image as PILImage
-from io import BytesIO
 
 class NotebookListCreateView(generics.ListCreateAPIView):
     serializer_class = NotebookSerializer
@@ -36,7 +32,7 @@ class NotebookListCreateView(generics.ListCreateAPIView):
         # Filter by archive status and delete status
         is_archived = self.request.query_params.get('archived', 'false').lower() == 'true'
         is_deleted = self.request.query_params.get('is_deleted', 'false').lower() == 'true'
-        return Notebook.objects.filter(user=self.request.user, is_archived=is_archived, is_deleted=is_deleted)
+        return Notebook.objects.filter(user=self.request.user, is_archived=is_archived, is_deleted=is_deleted).with_notes_count()
 
 class NotebookRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = NotebookSerializer
@@ -88,13 +84,37 @@ class NotebookRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.data)
 
 class NoteListCreateView(generics.ListCreateAPIView):
+    """
+    Notes list. With ?summary=true each note carries a plain-text preview and
+    its content length instead of the full content, which is then fetched
+    from the note detail endpoint when the note is opened.
+    """
     serializer_class = NoteSerializer
     permission_classes = [IsAuthenticated]
     
+    # Length of the plain-text preview in summary listings
+    PREVIEW_CHARS = 200
+    
+    def summary_requested(self):
+        return self.request.method == 'GET' and self.request.query_params.get('summary', 'false').lower() == 'true'
+    
+    def get_serializer_class(self):
+        if self.summary_requested():
+            return NoteSummarySerializer
+        return super().get_serializer_class()
+    
     def get_queryset(self):
         # Filter by archive status
         is_archived_param = self.request.query_params.get('archived', None)
-        queryset = Note.objects.filter(user=self.request.user, is_deleted=False)
+        queryset = Note.objects.filter(user=self.request.user, is_deleted=False).select_related('notebook')
+        if self.summary_requested():
+            # Build the preview from the stored plain text and measure content
+            # in the database, so content (often with embedded images) never
+            # leaves it
+            queryset = queryset.defer('content').annotate(
+                preview=Substr('search_text', 1, self.PREVIEW_CHARS),
+                content_length=Length('content'),
+            )
         
         # Filter by notebook if provided (unless global search is requested)
         notebook_id = self.request.query_params.get('notebook', None)
@@ -133,12 +153,38 @@ class NoteListCreateView(generics.ListCreateAPIView):
         
         return queryset
 
+# Columns that determine a note's detail payload. Archiving or trashing a
+# notebook flips its notes' flags with a queryset update that leaves
+# updated_at alone, and notebook_name comes from the notebook row.
+NOTE_ETAG_FIELDS = ('id', 'updated_at', 'is_deleted', 'deleted_at', 'is_archived', 'archived_at',
+                    'notebook_id', 'notebook__updated_at')
+
+def note_etag(values):
+    """Strong ETag for a note detail payload from its NOTE_ETAG_FIELDS values"""
+    return '"%s"' % hashlib.md5(repr(tuple(values)).encode()).hexdigest()
+
 class NoteRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = NoteSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Note.objects.filter(user=self.request.user)
+        return Note.objects.filter(user=self.request.user).select_related('notebook')
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Full note, with an ETag so an unchanged note is revalidated with a 304
+        before its content is loaded.
+        """
+        state = self.get_queryset().filter(pk=kwargs['pk']).values_list(*NOTE_ETAG_FIELDS).first()
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        headers = {'ETag': note_etag(state), 'Cache-Control': 'private, no-cache'}
+        if headers['ETag'] in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response = super().retrieve(request, *args, **kwargs)
+        for header, value in headers.items():
+            response[header] = value
+        return response
     
     def destroy(self, request, *args, **kwargs):
         note = self.get_object()
@@ -353,19 +399,66 @@ def archived_notes(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def archived_notebooks(request):
-    notebooks = Notebook.objects.filter(user=request.user, is_archived=True)
+    notebooks = Notebook.objects.filter(user=request.user, is_archived=True).with_notes_count()
     serializer = NotebookSerializer(notebooks, many=True)
     return Response(serializer.data) 
 
+@require_safe
+def note_image(request, sha256):
+    """
+    Serve an image from the note image store.
+
+    This is a plain view without authentication because it is loaded by <img>
+    tags, which can't send the API token; the URL is the SHA-256 of the image
+    itself. The bytes behind a URL never change, so browsers and CDNs may
+    cache them for a year without revalidating.
+    """
+    headers = {
+        'ETag': f'"{sha256}"',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    if headers['ETag'] in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        image = NoteImage.objects.filter(sha256=sha256).only('content_type', 'data').first()
+        if image is None:
+            raise Http404('Image not found')
+        response = HttpResponse(bytes(image.data), content_type=image.content_type)
+        response['X-Content-Type-Options'] = 'nosniff'
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def global_search_notes(request):
     """
     Global search endpoint to search across all notes and notebooks
+
+    Notes are matched with the full-text index and ranked, best match first,
+    with a highlighted snippet of the matching text as content. Results come
+    in pages of ?limit= notes (default 20, max 50); pass the returned
+    next_cursor as ?cursor= for the next page. Matching notebooks are
+    included on the first page only.
     """
     search_query = request.query_params.get('q', '')
-    if not search_query.strip():
-        return Response({'results': []})
+    query = note_search_query(search_query)
+    if query is None:
+        return Response({'results': [], 'next_cursor': None})
+    
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), MAX_SEARCH_LIMIT)
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        try:
+            cursor = decode_search_cursor(cursor)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        cursor = None
     
     results = []
     
@@ -374,10 +467,10 @@ def global_search_notes(request):
         user=request.user,
         is_deleted=False,
         is_archived=False
-    ).filter(
-        Q(title__icontains=search_query) | 
-        Q(content__icontains=search_query)
-    ).select_related('notebook').order_by('-updated_at')
+    ).select_related('notebook').only(
+        'id', 'title', 'created_at', 'updated_at', 'notebook__id', 'notebook__name'
+    )
+    notes, next_cursor = search_notes(notes, query, limit=limit, cursor=cursor)
     
     # Add notes to results
     for note in notes:
@@ -385,7 +478,7 @@ def global_search_notes(request):
             'id': note.id,
             'type': 'note',
             'title': note.title,
-            'content': note.content[:200] + '...' if len(note.content) > 200 else note.content,
+            'content': safe_headline(note.headline),
             'notebook_id': note.notebook.id,
             'notebook_name': note.notebook.name,
             'created_at': note.created_at,
@@ -393,17 +486,17 @@ def global_search_notes(request):
             'url': f'/notes/{note.id}'
         })
     
-    # Search across all notebooks (not archived)
-    notebooks = Notebook.objects.filter(
-        user=request.user,
-        is_archived=False
-    ).filter(
-        Q(name__icontains=search_query)
-    ).order_by('-updated_at')
-    
-    # Add notebooks to results
-    for notebook in notebooks:
-        results.append({
+    if cursor is None:
+        # Search across all notebooks (not archived), counting notes in the same query
+        notebooks = Notebook.objects.filter(
+            user=request.user,
+            is_archived=False
+        ).filter(
+            Q(name__icontains=search_query.strip())
+        ).with_notes_count().order_by('-updated_at')
+        
+        # Add notebooks to results, ahead of the ranked notes
+        results[:0] = [{
             'id': notebook.id,
             'type': 'notebook',
             'title': notebook.name,
@@ -413,12 +506,9 @@ def global_search_notes(request):
             'created_at': notebook.created_at,
             'updated_at': notebook.updated_at,
             'url': f'/notes?notebook={notebook.id}'
-        })
-    
-    # Sort all results by updated_at (most recent first)
-    results.sort(key=lambda x: x['updated_at'], reverse=True)
+        } for notebook in notebooks]
     
-    return Response({'results': results})
+    return Response({'results': results, 'next_cursor': next_cursor})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -499,7 +589,7 @@ def notebooks_by_type(request):
         notebooks = Notebook.objects.filter(
             user=request.user,
             is_archived=False
-        ).order_by('-updated_at')
+        ).with_notes_count().order_by('-updated_at')
         
         serializer = NotebookSerializer(notebooks, many=True)
         return Response({
@@ -537,277 +627,71 @@ def clean_html_content(html_content):
     
     return content
 
-def extract_images_from_html(html_content):
-    """Extract images from HTML content and return list of image data"""
-    if not html_content:
-        return []
-    
-    images = []
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    for img_tag in soup.find_all('img'):
-        src = img_tag.get('src', '')
-        if not src:
-            continue
-        
-        try:
-            # Handle base64 data URLs
-            if src.startswith('data:image'):
-                # Extract base64 data
-                header, data = src.split(',', 1)
-                image_format = header.split('/')[1].split(';')[0]  # e.g., 'png', 'jpeg'
-                
-                # Decode base64
-                image_data = base64.b64decode(data)
-                
-                # Open image with PIL to validate and get dimensions
-                img = PILImage.open(BytesIO(image_data))
-                
-                images.append({
-                    'data': image_data,
-                    'format': image_format,
-                    'width': img.width,
-                    'height': img.height
-                })
-            # Handle regular URLs (could be extended to download images)
-            elif src.startswith('http://') or src.startswith('https://'):
-                # For now, skip external URLs (could be extended to download)
-                print(f"Skipping external image URL: {src}")
-                continue
-        except Exception as e:
-            print(f"Error processing image: {str(e)}")
-            continue
-    
-    return images
-
-def process_html_content_with_images(html_content):
-    """Process HTML content and extract text and images separately"""
-    if not html_content:
-        return {'text': '', 'images': []}
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Extract images
-    images = extract_images_from_html(html_content)
-    
-    # Replace img tags with placeholders and extract text
-    text_parts = []
-    img_index = 0
-    
-    def process_element(element):
-        nonlocal img_index
-        if element.name == 'img':
-            # Replace image with placeholder
-            text_parts.append(f'\n[IMAGE_{img_index}]\n')
-            img_index += 1
-        elif hasattr(element, 'children'):
-            # Process children recursively
-            for child in element.children:
-                if isinstance(child, str):
-                    if child.strip():
-                        text_parts.append(child.strip())
-                else:
-                    process_element(child)
-        elif hasattr(element, 'string') and element.string:
-            text = element.string.strip()
-            if text:
-                text_parts.append(text)
-    
-    # Process all elements
-    for element in soup.children:
-        if isinstance(element, str):
-            if element.strip():
-                text_parts.append(element.strip())
-        else:
-            process_element(element)
-    
-    # Get clean text
-    clean_text = '\n'.join(text_parts)
-    # Clean up HTML entities
-    clean_text = clean_text.replace('&nbsp;', ' ')
-    clean_text = clean_text.replace('&amp;', '&')
-    clean_text = clean_text.replace('&lt;', '<')
-    clean_text = clean_text.replace('&gt;', '>')
-    clean_text = clean_text.replace('&quot;', '"')
-    clean_text = clean_text.replace('&#39;', "'")
-    # Normalize whitespace but preserve line breaks
-    clean_text = re.sub(r'[ \t]+', ' ', clean_text)  # Multiple spaces to single space
-    clean_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', clean_text)  # Multiple newlines to double newline
-    
-    return {'text': clean_text, 'images': images}
-
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def export_notes(request):
-    """Export notes to PDF or DOC format"""
+    """
+    Export notes to PDF or DOC format
+
+    Body: {"format": "pdf"|"doc"} plus one of "note_id", "note_ids" (exported
+    in the given order) or "notebook_id" (the notebook's notes as listed in
+    the notebook). The document is streamed back as an attachment.
+    """
     try:
-        note_id = request.data.get('note_id')
         format_type = request.data.get('format', 'pdf')
+        if format_type not in EXPORT_FORMATS:
+            return Response({'error': 'Unsupported format. Use "pdf" or "doc"'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not note_id:
+        notes = Note.objects.filter(user=request.user, is_deleted=False)
+        note_id = request.data.get('note_id')
+        note_ids = request.data.get('note_ids')
+        notebook_id = request.data.get('notebook_id')
+        
+        if notebook_id:
+            try:
+                notebook = Notebook.objects.get(id=notebook_id, user=request.user, is_deleted=False)
+            except (Notebook.DoesNotExist, ValueError):
+                return Response({'error': 'Notebook not found'}, status=status.HTTP_404_NOT_FOUND)
+            # Same notes the notebook shows: archived notebooks list their archived notes
+            notes = notes.filter(notebook=notebook, is_archived=notebook.is_archived)
+            ids = list(notes.values_list('id', flat=True))
+            filename = notebook.name
+        elif note_ids:
+            if not isinstance(note_ids, list):
+                return Response({'error': 'note_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                requested = list(dict.fromkeys(int(i) for i in note_ids))
+            except (TypeError, ValueError):
+                return Response({'error': 'note_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            found = set(notes.filter(id__in=requested).values_list('id', flat=True))
+            ids = [i for i in requested if i in found]
+            filename = 'notes'
+        elif note_id:
+            note = notes.filter(id=note_id).only('id', 'title').first()
+            ids = [note.id] if note else []
+            filename = note.title if note else ''
+        else:
             return Response({'error': 'Note ID is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get the note
-        try:
-            note = Note.objects.get(id=note_id, user=request.user, is_deleted=False)
-        except Note.DoesNotExist:
+        if not ids:
             return Response({'error': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Process HTML content to extract text and images
-        processed = process_html_content_with_images(note.content)
-        clean_content = processed['text']
-        images = processed['images']
-        
-        if format_type == 'pdf':
-            # Create PDF
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            story = []
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            content_style = ParagraphStyle(
-                'CustomContent',
-                parent=styles['Normal'],
-                fontSize=12,
-                spaceAfter=12,
-                alignment=TA_LEFT
+        if len(ids) > MAX_EXPORT_NOTES:
+            return Response(
+                {'error': f'At most {MAX_EXPORT_NOTES} notes can be exported at once'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            
-            # Add title
-            story.append(Paragraph(note.title, title_style))
-            story.append(Spacer(1, 20))
-            
-            # Process content and images
-            content_lines = clean_content.split('\n')
-            image_index = 0
-            
-            for line in content_lines:
-                line = line.strip()
-                if not line:
-                    story.append(Spacer(1, 12))
-                elif line.startswith('[IMAGE_') and line.endswith(']'):
-                    # Insert image
-                    if image_index < len(images):
-                        img_data = images[image_index]
-                        try:
-                            # Create temporary file for image
-                            img_buffer = BytesIO(img_data['data'])
-                            img = PILImage.open(img_buffer)
-                            
-                            # Calculate size (max width 5 inches, maintain aspect ratio)
-                            max_width = 5 * inch
-                            # Convert pixels to points (assuming 72 DPI)
-                            img_width_pt = img.width * (72 / 96)  # Convert from 96 DPI to 72 DPI
-                            img_height_pt = img.height * (72 / 96)
-                            
-                            if img_width_pt > max_width:
-                                aspect_ratio = img_height_pt / img_width_pt
-                                width = max_width
-                                height = width * aspect_ratio
-                            else:
-                                width = img_width_pt
-                                height = img_height_pt
-                            
-                            # Save image to temporary buffer
-                            temp_img_buffer = BytesIO()
-                            img.save(temp_img_buffer, format=img_data['format'].upper())
-                            temp_img_buffer.seek(0)
-                            
-                            # Add image to PDF
-                            pdf_image = ReportLabImage(temp_img_buffer, width=width, height=height)
-                            story.append(pdf_image)
-                            story.append(Spacer(1, 12))
-                            image_index += 1
-                        except Exception as e:
-                            print(f"Error adding image to PDF: {str(e)}")
-                            # Skip image if there's an error
-                            image_index += 1
-                else:
-                    story.append(Paragraph(line, content_style))
-            
-            # Build PDF
-            doc.build(story)
-            buffer.seek(0)
-            
-            # Create response
-            from django.http import HttpResponse
-            response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{note.title}_export.pdf"'
-            return response
-            
-        elif format_type == 'doc':
-            # Create DOCX
-            doc = Document()
-            
-            # Add title
-            doc.add_heading(note.title, 0)
-            
-            # Process content and images
-            content_lines = clean_content.split('\n')
-            image_index = 0
-            
-            for line in content_lines:
-                line = line.strip()
-                if not line:
-                    doc.add_paragraph()  # Empty paragraph for spacing
-                elif line.startswith('[IMAGE_') and line.endswith(']'):
-                    # Insert image
-                    if image_index < len(images):
-                        img_data = images[image_index]
-                        try:
-                            # Create temporary file for image
-                            img_buffer = BytesIO(img_data['data'])
-                            
-                            # Add image to document (max width 5 inches)
-                            paragraph = doc.add_paragraph()
-                            run = paragraph.add_run()
-                            
-                            # Calculate size (max width 5 inches, maintain aspect ratio)
-                            max_width = Inches(5)
-                            # Convert pixels to inches (assuming 96 DPI)
-                            img_width_in = img_data['width'] / 96
-                            img_height_in = img_data['height'] / 96
-                            
-                            if img_width_in > 5:
-                                aspect_ratio = img_height_in / img_width_in
-                                width = max_width
-                            else:
-                                width = Inches(img_width_in)
-                            
-                            # Add picture
-                            run.add_picture(img_buffer, width=width)
-                            image_index += 1
-                        except Exception as e:
-                            print(f"Error adding image to DOCX: {str(e)}")
-                            # Skip image if there's an error
-                            image_index += 1
-                else:
-                    doc.add_paragraph(line)
-            
-            # Save to buffer
-            buffer = io.BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
-            
-            # Create response
-            from django.http import HttpResponse
-            response = HttpResponse(buffer.getvalue(), content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-            response['Content-Disposition'] = f'attachment; filename="{note.title}_export.docx"'
-            return response
-            
-        else:
-            return Response({'error': 'Unsupported format. Use "pdf" or "doc"'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        content_type, extension = EXPORT_FORMATS[format_type]
+        output = export_notes_file(ids, format_type)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'{filename}_export.{extension}',
+            content_type=content_type,
+        )
             
     except Exception as e:
         print(f"Export error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return Response({'error': f'Export failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        return Response({'error': f'Export failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
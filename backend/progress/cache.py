@@ -0,0 +1,116 @@
+"""
+Per-user summary cache for progress endpoints.
+
+Each cached summary declares which data sources it is derived from
+(tasks, xp, quizzes, study). The cache key embeds the user's current version
+stamp for each of those sources, and the model signals replace a stamp when a
+row of that source changes, so a write only invalidates the summaries that
+actually depend on it. Stale entries are never read again and age out.
+
+Hits and misses are counted per summary name in the same cache backend so
+they are shared across worker processes; see get_cache_stats(). The same
+versioned key doubles as an HTTP validator (user_cache_etag), so conditional
+requests can be answered with 304 before anything is computed.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+SOURCES = ('tasks', 'xp', 'quizzes', 'study')
+
+# Summary names reported by get_cache_stats()
+SUMMARY_NAMES = ('stats', 'level', 'streaks', 'chart', 'productivity', 'task_stats', 'study_time', 'calendar')
+
+
+def _version_key(user_id, source):
+    return f'progress:version:{user_id}:{source}'
+
+
+def _counter_key(name, outcome):
+    return f'progress:cache:{name}:{outcome}'
+
+
+def get_user_cache_versions(user_id, sources):
+    """Current version stamps for the user's sources, creating missing ones"""
+    keys = {source: _version_key(user_id, source) for source in sources}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for source, key in keys.items():
+        version = stored.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        versions[source] = version
+    return versions
+
+
+def bump_user_cache_version(user_id, *sources):
+    """Invalidate every cached summary of the user derived from these sources"""
+    now = time.time_ns()
+    cache.set_many({_version_key(user_id, source): now for source in sources or SOURCES}, None)
+
+
+def user_cache_key(user_id, name, *parts, depends=('tasks',)):
+    """Cache key for a per-user summary under the current source versions"""
+    versions = get_user_cache_versions(user_id, depends)
+    stamp = '.'.join(f'{source}{versions[source]}' for source in depends)
+    suffix = ':'.join(str(part) for part in parts)
+    return f'progress:{name}:{user_id}:{stamp}:{suffix}'
+
+
+def user_cache_etag(user_id, name, *parts, depends=('tasks',)):
+    """Strong ETag for a summary; it changes whenever the cache key would"""
+    key = user_cache_key(user_id, name, *parts, depends=depends)
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+def _count(name, outcome):
+    key = _counter_key(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_or_compute(user_id, name, parts, compute, depends=('tasks',), timeout=None):
+    """
+    Return the cached summary for (user, name, parts) or compute and store it.
+
+    Args:
+        parts: values identifying the period/filters of the summary
+        compute: zero-argument callable producing the summary
+        depends: sources whose changes invalidate the summary
+        timeout: seconds to keep the entry (default PROGRESS_CACHE_TIMEOUT)
+    """
+    key = user_cache_key(user_id, name, *parts, depends=depends)
+    data = cache.get(key)
+    if data is not None:
+        _count(name, 'hits')
+        return data
+    _count(name, 'misses')
+    data = compute()
+    if timeout is None:
+        timeout = getattr(settings, 'PROGRESS_CACHE_TIMEOUT', 600)
+    cache.set(key, data, timeout)
+    return data
+
+
+def get_cache_stats():
+    """Hit/miss counters per summary name"""
+    keys = [_counter_key(name, outcome) for name in SUMMARY_NAMES for outcome in ('hits', 'misses')]
+    counters = cache.get_many(keys)
+    stats = {}
+    for name in SUMMARY_NAMES:
+        hits = counters.get(_counter_key(name, 'hits'), 0)
+        misses = counters.get(_counter_key(name, 'misses'), 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0,
+        }
+    return stats
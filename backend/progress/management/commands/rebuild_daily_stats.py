@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from progress.timeseries import rebuild_daily_stats
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user daily stats series behind the progress chart and the daily study rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Specific username to rebuild'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options.get('user'):
+            users = users.filter(username=options['user'])
+
+        total = 0
+        rows = 0
+        for user in users.iterator():
+            rows += rebuild_daily_stats(user.id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt daily stats for {total} users ({rows} daily rows)"
+        ))
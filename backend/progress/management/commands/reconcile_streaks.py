@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from progress.models import UserStreak
+from progress.streaks import recompute_streak
+
+class Command(BaseCommand):
+    help = 'Recompute persisted streak state for all users to fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Specific username to reconcile'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options.get('user'):
+            users = users.filter(username=options['user'])
+
+        fixed = 0
+        total = 0
+        for user in users.iterator():
+            before = UserStreak.objects.filter(user=user).values_list(
+                'current_streak', 'last_qualifying_day', 'longest_streak'
+            ).first()
+            state = recompute_streak(user)
+            after = (state.current_streak, state.last_qualifying_day, state.longest_streak)
+            if before != after:
+                fixed += 1
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Reconciled streaks for {total} users ({fixed} corrected)"
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from progress.models import UserXP
+from progress.xp import recompute_xp
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized XP totals for all users to fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Specific username to reconcile'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options.get('user'):
+            users = users.filter(username=options['user'])
+
+        fixed = 0
+        total = 0
+        for user in users.iterator():
+            before = UserXP.objects.filter(user=user).values_list('total_xp', flat=True).first()
+            state = recompute_xp(user.id)
+            if before != state.total_xp:
+                fixed += 1
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Reconciled XP totals for {total} users ({fixed} corrected)"
+        ))
@@ -0,0 +1,91 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+# Frozen copies of tasks.productivity.COUNTED_TASKS / COMPLETED_TASKS and
+# progress.xp.XP_PER_QUIZ as of this migration
+COUNTED_TASKS = Q(is_deleted=False) | Q(is_deleted=True, was_completed_on_delete=True)
+COMPLETED_TASKS = Q(is_deleted=False, completed=True) | Q(is_deleted=True, was_completed_on_delete=True)
+XP_PER_QUIZ = 20
+
+SERIES_FIELDS = ('tasks_completed', 'tasks_due', 'study_seconds', 'quizzes', 'xp')
+BATCH_SIZE = 1000
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """
+    Fill UserDailyStats and StudyDailyRollup for every existing user, as
+    rebuild_daily_stats does, with one grouped query per source table.
+    """
+    Task = apps.get_model('tasks', 'Task')
+    XPLog = apps.get_model('tasks', 'XPLog')
+    StudyTimerSession = apps.get_model('tasks', 'StudyTimerSession')
+    QuizSession = apps.get_model('decks', 'QuizSession')
+    UserDailyStats = apps.get_model('progress', 'UserDailyStats')
+    StudyDailyRollup = apps.get_model('progress', 'StudyDailyRollup')
+
+    # The unfiltered manager: soft-deleted tasks completed before deletion count
+    tasks = Task._base_manager.all()
+    values_by_key = {}
+
+    def row(user_id, day):
+        return values_by_key.setdefault((user_id, day), {field: 0 for field in SERIES_FIELDS})
+
+    for user_id, day, count in (
+        tasks.filter(COUNTED_TASKS)
+        .order_by().values_list('user_id', 'due_date').annotate(count=Count('id'))
+    ):
+        row(user_id, day)['tasks_due'] = count
+    for user_id, day, count in (
+        tasks.filter(COMPLETED_TASKS, completed_at__isnull=False)
+        .annotate(day=TruncDate('completed_at'))
+        .order_by().values_list('user_id', 'day').annotate(count=Count('id'))
+    ):
+        row(user_id, day)['tasks_completed'] = count
+    study_rollups = []
+    for user_id, day, session_type, seconds, sessions in (
+        StudyTimerSession.objects
+        .annotate(day=TruncDate('start_time'))
+        .order_by().values_list('user_id', 'day', 'session_type')
+        .annotate(seconds=Sum('duration'), sessions=Count('id'))
+    ):
+        seconds = max(0, seconds or 0)
+        study_rollups.append(StudyDailyRollup(
+            user_id=user_id, day=day, session_type=session_type, seconds=seconds, sessions=sessions
+        ))
+        if session_type == 'Study':
+            row(user_id, day)['study_seconds'] = seconds
+    for user_id, day, count in (
+        QuizSession.objects
+        .annotate(day=TruncDate('completed_at'))
+        .order_by().values_list('user_id', 'day').annotate(count=Count('id'))
+    ):
+        row(user_id, day)['quizzes'] = count
+        row(user_id, day)['xp'] += count * XP_PER_QUIZ
+    for user_id, day, xp in (
+        XPLog.objects
+        .annotate(day=TruncDate('awarded_at'))
+        .order_by().values_list('user_id', 'day').annotate(total=Sum('xp'))
+    ):
+        row(user_id, day)['xp'] += xp or 0
+
+    UserDailyStats.objects.all().delete()
+    UserDailyStats.objects.bulk_create(
+        [UserDailyStats(user_id=user_id, day=day, **values) for (user_id, day), values in values_by_key.items()],
+        batch_size=BATCH_SIZE,
+    )
+    StudyDailyRollup.objects.all().delete()
+    StudyDailyRollup.objects.bulk_create(study_rollups, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0006_studydailyrollup'),
+        ('tasks', '0020_productivitylog_dirty_version'),
+        ('decks', '0006_flashcard_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
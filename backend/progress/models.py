@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from .supabase_sync import sync_productivity_scale_history_to_supabase, update_productivity_scale_history_in_supabase
 
 # Create your models here.
@@ -22,6 +23,203 @@ class ProductivityScaleHistory(models.Model):
         return f"{self.user.username} - {self.period_type} - {self.status}"
 
 
+class UserStreak(models.Model):
+    """Persisted streak state so reads don't have to walk back day by day.
+
+    A qualifying day is a day with at least one completed (non-deleted) task
+    due on it. current_streak is the length of the run of consecutive
+    qualifying days ending at last_qualifying_day.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='streak')
+    current_streak = models.PositiveIntegerField(default=0)
+    last_qualifying_day = models.DateField(null=True, blank=True)
+    longest_streak = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.current_streak} day streak"
+
+    def streak_on(self, day):
+        """Streak length as seen on the given day (0 if the run doesn't reach it)"""
+        if self.last_qualifying_day == day:
+            return self.current_streak
+        return 0
+
+
+class UserXP(models.Model):
+    """Denormalized XP total so level reads don't have to scan the XP tables.
+
+    total_xp is the sum of the user's XPLog rows plus a fixed amount per
+    completed QuizSession, kept current by the signals below.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='xp_total')
+    total_xp = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_xp} XP"
+
+
+class UserDailyStats(models.Model):
+    """Pre-aggregated per-user daily activity series backing the progress chart.
+
+    Task and study columns hold absolute counts recomputed for the days a write
+    touched; quiz and XP columns are adjusted with deltas as rows are created.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    tasks_completed = models.PositiveIntegerField(default=0)
+    tasks_due = models.PositiveIntegerField(default=0)
+    study_seconds = models.PositiveIntegerField(default=0)
+    quizzes = models.IntegerField(default=0)
+    xp = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day')
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.day}"
+
+
+class StudyDailyRollup(models.Model):
+    """Per-user daily study timer totals by session type.
+
+    Recomputed for the days a session write touched (single saves, deletes and
+    batch ingests alike), so dashboards read study time without scanning
+    StudyTimerSession rows.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='study_rollups')
+    day = models.DateField()
+    session_type = models.CharField(max_length=20)
+    seconds = models.PositiveIntegerField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day', 'session_type')
+        ordering = ['day', 'session_type']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.day} - {self.session_type}"
+
+
+# =============================================
+# DJANGO SIGNALS FOR XP TOTALS
+# =============================================
+
+@receiver(post_save, sender='tasks.XPLog')
+def add_task_xp_on_create(sender, instance, created, **kwargs):
+    """Add awarded task XP to the user's running total"""
+    if created:
+        from .xp import add_xp
+        add_xp(instance.user_id, instance.xp)
+
+@receiver(post_delete, sender='tasks.XPLog')
+def remove_task_xp_on_delete(sender, instance, **kwargs):
+    from .xp import add_xp
+    add_xp(instance.user_id, -instance.xp, seed=False)
+
+@receiver(post_save, sender='decks.QuizSession')
+def add_quiz_xp_on_create(sender, instance, created, **kwargs):
+    """Add the per-quiz XP to the user's running total"""
+    if created:
+        from .xp import add_xp, XP_PER_QUIZ
+        add_xp(instance.user_id, XP_PER_QUIZ)
+
+@receiver(post_delete, sender='decks.QuizSession')
+def remove_quiz_xp_on_delete(sender, instance, **kwargs):
+    from .xp import add_xp, XP_PER_QUIZ
+    add_xp(instance.user_id, -XP_PER_QUIZ, seed=False)
+
+
+# =============================================
+# DJANGO SIGNALS FOR SUMMARY CACHE INVALIDATION
+# =============================================
+
+# Which cached summary sources each model feeds
+CACHE_SOURCES_BY_SENDER = {
+    'Task': ('tasks',),
+    'XPLog': ('xp',),
+    'QuizSession': ('xp', 'quizzes'),
+    'StudyTimerSession': ('study',),
+}
+
+@receiver(post_save, sender='tasks.Task')
+@receiver(post_delete, sender='tasks.Task')
+@receiver(post_save, sender='tasks.XPLog')
+@receiver(post_delete, sender='tasks.XPLog')
+@receiver(post_save, sender='decks.QuizSession')
+@receiver(post_delete, sender='decks.QuizSession')
+@receiver(post_save, sender='tasks.StudyTimerSession')
+@receiver(post_delete, sender='tasks.StudyTimerSession')
+def invalidate_summary_cache(sender, instance, **kwargs):
+    """Drop the user's cached summaries derived from the changed model"""
+    from django.db import transaction
+    from .cache import bump_user_cache_version
+    if sender.__name__ == 'Task' and sender.is_activity_save(kwargs.get('update_fields')):
+        # Timer ticks and activity notes don't feed any summary
+        return
+    sources = CACHE_SOURCES_BY_SENDER[sender.__name__]
+    transaction.on_commit(lambda: bump_user_cache_version(instance.user_id, *sources))
+
+
+# =============================================
+# DJANGO SIGNALS FOR THE DAILY STATS SERIES
+# =============================================
+
+@receiver(pre_save, sender='tasks.Task')
+@receiver(pre_save, sender='tasks.StudyTimerSession')
+def remember_daily_stats_days(sender, instance, **kwargs):
+    """Remember which days the row counted toward before this save"""
+    from .timeseries import stats_days_for
+    if sender.__name__ == 'Task' and sender.is_activity_save(kwargs.get('update_fields')):
+        return
+    previous = None
+    if instance.pk:
+        previous = sender._base_manager.filter(pk=instance.pk).first()
+    instance._previous_stats_days = stats_days_for(previous) if previous else set()
+
+@receiver(post_save, sender='tasks.Task')
+@receiver(post_delete, sender='tasks.Task')
+def refresh_daily_task_stats(sender, instance, **kwargs):
+    from .timeseries import stats_days_for, refresh_task_stats
+    if sender.is_activity_save(kwargs.get('update_fields')):
+        return
+    days = stats_days_for(instance) | getattr(instance, '_previous_stats_days', set())
+    refresh_task_stats(instance.user_id, days)
+
+@receiver(post_save, sender='tasks.StudyTimerSession')
+@receiver(post_delete, sender='tasks.StudyTimerSession')
+def refresh_daily_study_stats(sender, instance, **kwargs):
+    from .timeseries import stats_days_for, refresh_study_stats
+    days = stats_days_for(instance) | getattr(instance, '_previous_stats_days', set())
+    refresh_study_stats(instance.user_id, days)
+
+@receiver(post_save, sender='tasks.XPLog')
+def add_daily_xp_on_create(sender, instance, created, **kwargs):
+    if created:
+        from .timeseries import bump_daily_stats
+        bump_daily_stats(instance.user_id, timezone.localtime(instance.awarded_at).date(), xp=instance.xp)
+
+@receiver(post_delete, sender='tasks.XPLog')
+def remove_daily_xp_on_delete(sender, instance, **kwargs):
+    from .timeseries import bump_daily_stats
+    bump_daily_stats(instance.user_id, timezone.localtime(instance.awarded_at).date(), xp=-instance.xp)
+
+@receiver(post_save, sender='decks.QuizSession')
+def add_daily_quiz_on_create(sender, instance, created, **kwargs):
+    if created:
+        from .timeseries import bump_daily_stats
+        from .xp import XP_PER_QUIZ
+        bump_daily_stats(instance.user_id, timezone.localtime(instance.completed_at).date(), quizzes=1, xp=XP_PER_QUIZ)
+
+@receiver(post_delete, sender='decks.QuizSession')
+def remove_daily_quiz_on_delete(sender, instance, **kwargs):
+    from .timeseries import bump_daily_stats
+    from .xp import XP_PER_QUIZ
+    bump_daily_stats(instance.user_id, timezone.localtime(instance.completed_at).date(), quizzes=-1, xp=-XP_PER_QUIZ)
+
+
 # =============================================
 # DJANGO SIGNALS FOR REAL-TIME SYNC
 # =============================================
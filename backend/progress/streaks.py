@@ -0,0 +1,137 @@
+"""
+Incremental streak maintenance.
+
+The streak state in UserStreak is updated from the task write paths whenever a
+day's qualification may have changed, and fully recomputed by the nightly
+reconcile_streaks command to fix any drift (for example tasks completed ahead
+of their due date, which only start counting once that day arrives).
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.models import Task
+from .models import UserStreak
+from .cache import bump_user_cache_version
+
+
+def day_qualifies(user, day):
+    """A day qualifies if at least one non-deleted task due that day is completed"""
+    return Task.objects.filter(user=user, due_date=day, completed=True).exists()
+
+
+def get_current_streak(user):
+    """Current streak length for the user, read in constant time"""
+    state = UserStreak.objects.filter(user=user).first()
+    if state is None:
+        state = recompute_streak(user)
+    return state.streak_on(timezone.localdate())
+
+
+def update_streak_for_dates(user, days):
+    """Apply streak changes for every day whose tasks changed"""
+    for day in sorted(set(d for d in days if d is not None)):
+        update_streak_for_day(user, day)
+
+
+def update_streak_for_day(user, day):
+    """
+    Incrementally update the user's streak after tasks due on `day` changed.
+
+    Extending or shortening the current run is O(1); changes that could merge
+    older runs fall back to a full recompute.
+    """
+    today = timezone.localdate()
+    if day > today:
+        return
+
+    qualifies = day_qualifies(user, day)
+
+    with transaction.atomic():
+        state, created = UserStreak.objects.select_for_update().get_or_create(user=user)
+        if created:
+            # No state yet (e.g. existing users): seed it from their history
+            return _recompute_locked(user, state)
+        last_day = state.last_qualifying_day
+
+        if last_day is None:
+            if qualifies:
+                state.current_streak = 1
+                state.last_qualifying_day = day
+            else:
+                return
+        else:
+            run_start = last_day - timedelta(days=state.current_streak - 1)
+            in_run = run_start <= day <= last_day
+
+            if qualifies:
+                if in_run:
+                    return
+                if day == last_day + timedelta(days=1):
+                    state.current_streak += 1
+                    state.last_qualifying_day = day
+                elif day > last_day:
+                    # Days in between don't qualify, so a new run starts here
+                    state.current_streak = 1
+                    state.last_qualifying_day = day
+                else:
+                    # An earlier day may join older runs together
+                    return _recompute_locked(user, state)
+            else:
+                if not in_run:
+                    return
+                if day == last_day:
+                    if state.current_streak == 1:
+                        # The run is gone; find the previous one
+                        return _recompute_locked(user, state)
+                    state.current_streak -= 1
+                    state.last_qualifying_day = day - timedelta(days=1)
+                else:
+                    # The run splits; keep the part after the day that stopped qualifying
+                    state.current_streak = (last_day - day).days
+
+        state.longest_streak = max(state.longest_streak, state.current_streak)
+        state.save()
+    return state
+
+
+def recompute_streak(user):
+    """Rebuild the user's streak state from their tasks"""
+    with transaction.atomic():
+        state, created = UserStreak.objects.select_for_update().get_or_create(user=user)
+        previous = (state.current_streak, state.last_qualifying_day, state.longest_streak)
+        state = _recompute_locked(user, state)
+    if not created and previous != (state.current_streak, state.last_qualifying_day, state.longest_streak):
+        # Corrected drift: drop summaries computed from the old streak
+        transaction.on_commit(lambda: bump_user_cache_version(user.id, 'tasks'))
+    return state
+
+
+def _recompute_locked(user, state):
+    today = timezone.localdate()
+    qualifying_days = (
+        Task.objects
+        .filter(user=user, completed=True, due_date__lte=today)
+        .order_by('due_date')
+        .values_list('due_date', flat=True)
+        .distinct()
+    )
+
+    current = 0
+    longest = 0
+    last_day = None
+    for day in qualifying_days:
+        if last_day is not None and day == last_day + timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        last_day = day
+
+    state.current_streak = current
+    state.last_qualifying_day = last_day
+    state.longest_streak = longest
+    state.save()
+    return state
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import io
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import OfflineTestCase
+from progress.cache import get_cache_stats, get_or_compute
+from progress.models import UserDailyStats, UserStreak, UserXP
+from progress.streaks import get_current_streak, recompute_streak, update_streak_for_dates
+from progress.timeseries import SERIES_FIELDS, rebuild_daily_stats
+from progress.xp import XP_PER_OVERDUE_TASK, XP_PER_TASK, award_xp_bulk, get_total_xp, level_for_xp, xp_for_level
+from tasks.models import ProductivityLog, StudyTimerSession, Task, XPLog
+from tasks.productivity import compute_rollups, mark_rollups_dirty
+
+
+class StreakTests(OfflineTestCase):
+
+    def complete(self, day, completed=True):
+        # Queryset updates skip the task signals, so only the call below moves the streak
+        Task.objects.filter(user=self.user, due_date=day).update(completed=completed)
+        update_streak_for_dates(self.user, [day])
+        state = UserStreak.objects.get(user=self.user)
+        return state.current_streak, state.last_qualifying_day, state.longest_streak
+
+    def test_incremental_updates_match_recompute(self):
+        days = [self.today - timedelta(days=offset) for offset in (3, 2, 1, 0)]
+        for day in days:
+            Task.objects.create(user=self.user, title=f'Due {day}', due_date=day)
+        recompute_streak(self.user)
+
+        for length, day in enumerate(days, start=1):
+            self.assertEqual(self.complete(day), (length, day, length))
+        self.assertEqual(get_current_streak(self.user), 4)
+
+        # Un-completing a day inside the run keeps only the part after it
+        self.assertEqual(self.complete(days[1], completed=False), (2, self.today, 4))
+
+        # Completing it again merges the runs back together
+        incremental = self.complete(days[1])
+        recomputed = recompute_streak(self.user)
+        self.assertEqual(incremental, (recomputed.current_streak, recomputed.last_qualifying_day, recomputed.longest_streak))
+        self.assertEqual(incremental, (4, self.today, 4))
+
+    def test_task_created_completed_starts_the_streak(self):
+        recompute_streak(self.user)
+        response = self.client.post('/api/tasks/', {
+            'title': 'Done already', 'due_date': self.today.isoformat(), 'completed': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(get_current_streak(self.user), 1)
+
+
+class StreakHeatmapTests(OfflineTestCase):
+
+    def test_heatmap_days_and_columns(self):
+        yesterday = self.today - timedelta(days=1)
+        tomorrow = self.today + timedelta(days=1)
+        Task.all_objects.bulk_create([
+            Task(user=self.user, title='Done', due_date=yesterday, completed=True),
+            Task(user=self.user, title='Open', due_date=yesterday),
+            Task(user=self.user, title='Deleted after completing', due_date=self.today,
+                 completed=True, is_deleted=True, was_completed_on_delete=True),
+            Task(user=self.user, title='Deleted', due_date=self.today, is_deleted=True),
+            Task(user=self.user, title='Done early', due_date=tomorrow, completed=True),
+        ])
+
+        default_window = self.client.get(reverse('user_streaks')).data
+        self.assertEqual(len(default_window), 366)
+        self.assertEqual(default_window[-1]['date'], self.today.isoformat())
+
+        response = self.client.get(reverse('user_streaks'), {
+            'start': yesterday.isoformat(), 'end': tomorrow.isoformat(), 'columnar': '1',
+        })
+        self.assertEqual(response.status_code, 200)
+        days = response.data['days']
+        self.assertEqual(
+            [(day['streak'], day['productivity'], day['total_tasks'], day['completed_tasks']) for day in days],
+            [(True, 50.0, 2, 1), (True, 100.0, 1, 1), (False, 0, 1, 1)],
+        )
+        # Future days never count toward the streak
+        self.assertEqual(response.data['columns'], {
+            'streak': [1, 1, 0],
+            'productivity': [50.0, 100.0, 0.0],
+            'total_tasks': [2, 1, 1],
+            'completed_tasks': [1, 1, 1],
+        })
+
+    def test_invalid_window_is_rejected(self):
+        for params in (
+            {'start': 'yesterday'},
+            {'start': self.today.isoformat(), 'end': (self.today - timedelta(days=1)).isoformat()},
+            {'start': (self.today - timedelta(days=5000)).isoformat()},
+        ):
+            self.assertEqual(self.client.get(reverse('user_streaks'), params).status_code, 400)
+
+
+class ProductivityRollupTests(OfflineTestCase):
+    WEEK = (date(2025, 6, 2), date(2025, 6, 8))
+    MONTH = (date(2025, 6, 1), date(2025, 6, 30))
+
+    def setUp(self):
+        super().setUp()
+        ProductivityLog.objects.bulk_create([
+            ProductivityLog(
+                user=self.user, period_type=period_type, period_start=start, period_end=end,
+                completion_rate=0, total_tasks=0, completed_tasks=0, status='No Tasks',
+            )
+            for period_type, (start, end) in (('weekly', self.WEEK), ('monthly', self.MONTH))
+        ])
+        Task.objects.create(user=self.user, title='Task', due_date=date(2025, 6, 4), completed=True)
+
+    def stored(self, period_type):
+        return ProductivityLog.objects.get(user=self.user, period_type=period_type)
+
+    def test_reads_compute_dirty_rollups_without_writing(self):
+        self.assertTrue(self.stored('weekly').is_dirty)
+        stored_before = list(ProductivityLog.objects.order_by('id').values())
+
+        response = self.client.get(reverse('productivity_log_list'), {'view': 'weekly', 'date': '2025-06-04'})
+        self.assertEqual(response.status_code, 200)
+        week = next(week for week in response.data if week['week_start'] == '2025-06-02')
+        self.assertEqual((week['log']['total_tasks'], week['log']['completed_tasks']), (1, 1))
+
+        self.assertEqual(list(ProductivityLog.objects.order_by('id').values()), stored_before)
+
+    def test_refresh_keeps_rows_dirtied_during_the_run(self):
+        def compute_then_change(user, periods):
+            rollups = compute_rollups(user, periods)
+            # A task due later in the month changes before the flags are cleared
+            mark_rollups_dirty(user.id, [date(2025, 6, 20)])
+            return rollups
+
+        with mock.patch(
+            'core.management.commands.refresh_productivity_rollups.compute_rollups', side_effect=compute_then_change
+        ):
+            call_command('refresh_productivity_rollups', stdout=io.StringIO())
+
+        week, month = self.stored('weekly'), self.stored('monthly')
+        self.assertEqual((week.total_tasks, week.completed_tasks, week.is_dirty), (1, 1, False))
+        self.assertEqual(month.total_tasks, 1)
+        self.assertTrue(month.is_dirty)
+
+        call_command('refresh_productivity_rollups', stdout=io.StringIO())
+        self.assertFalse(self.stored('monthly').is_dirty)
+
+
+
+class LevelMathTests(SimpleTestCase):
+
+    def level_by_loop(self, total_xp):
+        # The iterative calculation level_for_xp replaced
+        level, xp_needed, xp_remaining = 1, 100, total_xp
+        while xp_remaining >= xp_needed:
+            xp_remaining -= xp_needed
+            level += 1
+            xp_needed += 100
+        return {'currentLevel': level, 'currentXP': xp_remaining, 'xpToNextLevel': xp_needed}
+
+    def test_closed_form_matches_loop_at_level_boundaries(self):
+        for level in range(1, 500):
+            boundary = xp_for_level(level)
+            for total_xp in (boundary - 1, boundary, boundary + 1):
+                if total_xp >= 0:
+                    self.assertEqual(level_for_xp(total_xp), self.level_by_loop(total_xp), total_xp)
+
+    def test_boundaries(self):
+        self.assertEqual(level_for_xp(0), {'currentLevel': 1, 'currentXP': 0, 'xpToNextLevel': 100})
+        self.assertEqual(level_for_xp(99)['currentLevel'], 1)
+        self.assertEqual(level_for_xp(100), {'currentLevel': 2, 'currentXP': 0, 'xpToNextLevel': 200})
+        self.assertEqual(level_for_xp(299)['currentLevel'], 2)
+        self.assertEqual(level_for_xp(300)['currentLevel'], 3)
+        self.assertEqual(level_for_xp(-50), level_for_xp(0))
+        self.assertEqual(level_for_xp(10 ** 12), self.level_by_loop(10 ** 12))
+
+
+class UserLevelTests(OfflineTestCase):
+
+    def test_level_follows_awarded_xp(self):
+        self.assertEqual(self.client.get(reverse('user_level')).data['currentXP'], 0)
+
+        tasks = Task.all_objects.bulk_create([
+            Task(user=self.user, title=f'Task {i}', due_date=self.today) for i in range(11)
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            award_xp_bulk(self.user.id, {task.id: XP_PER_TASK for task in tasks})
+
+        self.assertEqual(
+            self.client.get(reverse('user_level')).data,
+            {'currentLevel': 2, 'currentXP': 10, 'xpToNextLevel': 200},
+        )
+
+
+class DailyStatsTests(OfflineTestCase):
+
+    def at(self, day, hour=12):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def series(self):
+        rows = UserDailyStats.objects.filter(user=self.user).order_by('day').values_list('day', *SERIES_FIELDS)
+        return [row for row in rows if any(row[1:])]
+
+    def test_write_paths_keep_the_series_equal_to_a_rebuild(self):
+        monday = self.today - timedelta(days=self.today.weekday() + 7)
+        tuesday, wednesday = monday + timedelta(days=1), monday + timedelta(days=2)
+
+        done_late = Task.objects.create(user=self.user, title='Done late', due_date=monday)
+        done_late.completed = True
+        done_late.completed_at = self.at(tuesday)
+        done_late.save()
+        moved = Task.objects.create(user=self.user, title='Moved', due_date=tuesday)
+        moved.due_date = wednesday
+        moved.save()
+        deleted = Task.objects.create(
+            user=self.user, title='Deleted', due_date=monday, completed=True, completed_at=self.at(monday)
+        )
+        deleted.is_deleted = True
+        deleted.was_completed_on_delete = True
+        deleted.save()
+        for session_type, hour, seconds in (('Study', 9, 1500), ('Break', 10, 300), ('Study', 11, 600)):
+            StudyTimerSession.objects.create(
+                user=self.user, session_type=session_type, start_time=self.at(wednesday, hour),
+                end_time=self.at(wednesday, hour) + timedelta(seconds=seconds), duration=seconds,
+            )
+        award_xp_bulk(self.user.id, {done_late.id: XP_PER_TASK})
+
+        incremental = self.series()
+        rebuild_daily_stats(self.user.id)
+        self.assertEqual(incremental, self.series())
+
+        response = self.client.get(reverse('user_chart'), {'view': 'weekly', 'date': tuesday.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        points = response.data['points']
+        self.assertEqual(len(points), 7)
+        self.assertEqual(
+            [(point['tasksDue'], point['tasksCompleted'], point['studySeconds']) for point in points[:3]],
+            [(2, 1, 0), (0, 1, 0), (1, 0, 2100)],
+        )
+
+    def test_monthly_chart_buckets_weeks_inside_the_month(self):
+        response = self.client.get(reverse('user_chart'), {'view': 'monthly', 'date': '2025-06-15'})
+        self.assertEqual(
+            [(point['start'], point['end']) for point in response.data['points']],
+            [('2025-06-01', '2025-06-01'), ('2025-06-02', '2025-06-08'), ('2025-06-09', '2025-06-15'),
+             ('2025-06-16', '2025-06-22'), ('2025-06-23', '2025-06-29'), ('2025-06-30', '2025-06-30')],
+        )
+        self.assertEqual(self.client.get(reverse('user_chart'), {'view': 'daily'}).status_code, 400)
+
+
+class ProductivityLockTests(OfflineTestCase):
+
+    def test_reads_write_nothing_until_the_period_is_locked(self):
+        Task.objects.create(user=self.user, title='Open', due_date=self.today)
+        Task.objects.create(
+            user=self.user, title='Done', due_date=self.today, completed=True, completed_at=timezone.now()
+        )
+
+        for view in ('daily', 'weekly', 'monthly'):
+            response = self.client.get(reverse('user_productivity'), {'view': view})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('productivity_log_list')).status_code, 200)
+        self.assertFalse(ProductivityLog.objects.exists())
+
+        response = self.client.post(
+            reverse('lock_productivity'), {'view': 'daily', 'date': self.today.isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        log = ProductivityLog.objects.get(user=self.user, period_type='daily')
+        self.assertEqual((log.period_start, log.total_tasks, log.completed_tasks), (self.today, 2, 1))
+        self.assertEqual(response.data['period_start'], self.today.isoformat())
+
+    def test_malformed_requests_are_rejected(self):
+        for body in ([], 'daily', {'view': 'daily', 'date': 'tomorrow'}):
+            response = self.client.post(reverse('lock_productivity'), body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        response = self.client.get(reverse('productivity_log_list'), {'date': '2025-13-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProductivityLog.objects.exists())
+
+
+class SummaryCacheTests(OfflineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.computed = []
+
+    def summary(self, user, name, depends):
+        def compute():
+            self.computed.append((user.username, name))
+            return len(self.computed)
+        return get_or_compute(user.id, name, ('2025-06-01',), compute, depends=depends)
+
+    def test_writes_invalidate_only_summaries_derived_from_them(self):
+        other = User.objects.create_user(username='cache-other')
+        first = [
+            self.summary(self.user, 'stats', ('tasks', 'xp')),
+            self.summary(self.user, 'level', ('xp',)),
+            self.summary(other, 'stats', ('tasks', 'xp')),
+        ]
+        self.assertEqual(first, [1, 2, 3])
+
+        # The version bump runs once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, title='Task', due_date=self.today)
+
+        self.assertEqual(self.summary(self.user, 'stats', ('tasks', 'xp')), 4)
+        self.assertEqual(self.summary(self.user, 'level', ('xp',)), 2)
+        self.assertEqual(self.summary(other, 'stats', ('tasks', 'xp')), 3)
+        self.assertEqual(get_cache_stats()['level'], {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+
+class XPAwardTests(OfflineTestCase):
+
+    def test_award_is_idempotent_per_task(self):
+        task = Task.objects.create(user=self.user, title='Task', due_date=self.today)
+        before = get_total_xp(self.user.id)
+
+        self.assertEqual(award_xp_bulk(self.user.id, {task.id: XP_PER_TASK}), {task.id: XP_PER_TASK})
+        self.assertEqual(award_xp_bulk(self.user.id, {task.id: XP_PER_TASK}), {})
+
+        self.assertEqual(UserXP.objects.get(user=self.user).total_xp, before + XP_PER_TASK)
+
+    def test_toggling_completion_awards_xp_once(self):
+        overdue = Task.objects.create(user=self.user, title='Overdue', due_date=self.today - timedelta(days=2))
+        url = f'/api/tasks/{overdue.id}/'
+        for completed in (True, False, True):
+            self.assertEqual(self.client.patch(url, {'completed': completed}, format='json').status_code, 200)
+
+        awards = XPLog.objects.filter(user=self.user).values_list('task_id', 'xp')
+        self.assertEqual(list(awards), [(overdue.id, XP_PER_OVERDUE_TASK)])
+        self.assertEqual(get_total_xp(self.user.id), XP_PER_OVERDUE_TASK)
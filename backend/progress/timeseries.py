@@ -0,0 +1,254 @@
+"""
+Per-user daily activity series behind the progress chart.
+
+UserDailyStats holds one compact row per user and active day. Writes keep it
+current: task and study columns are recomputed for just the days a save
+touched, quiz and XP columns are adjusted with F() deltas. The chart endpoint
+reads a single contiguous slice of the series and downsamples it in memory,
+so it never scans raw Task rows. Study timer time is also rolled up per day
+and session type in StudyDailyRollup.
+"""
+
+from array import array
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from tasks.models import Task, StudyTimerSession, XPLog
+from tasks.productivity import COUNTED_TASKS, COMPLETED_TASKS
+from decks.models import QuizSession
+from .models import UserDailyStats, StudyDailyRollup
+
+
+SERIES_FIELDS = ('tasks_completed', 'tasks_due', 'study_seconds', 'quizzes', 'xp')
+
+
+def stats_days_for(instance):
+    """Days a Task or StudyTimerSession row counts toward in the series"""
+    if isinstance(instance, StudyTimerSession):
+        return {timezone.localtime(instance.start_time).date()} if instance.start_time else set()
+    days = {instance.due_date} if instance.due_date else set()
+    if instance.completed_at:
+        days.add(timezone.localtime(instance.completed_at).date())
+    return days
+
+
+def _upsert_columns(user_id, values_by_day, fields):
+    """Write absolute column values for the given days in one statement"""
+    if not values_by_day:
+        return
+    UserDailyStats.objects.bulk_create(
+        [UserDailyStats(user_id=user_id, day=day, **values) for day, values in values_by_day.items()],
+        update_conflicts=True,
+        unique_fields=['user', 'day'],
+        update_fields=list(fields),
+    )
+
+
+def refresh_task_stats(user_id, days):
+    """Recompute tasks_due/tasks_completed for the given days"""
+    days = set(d for d in days if d is not None)
+    if not days:
+        return
+    values_by_day = {day: {'tasks_due': 0, 'tasks_completed': 0} for day in days}
+    due_rows = (
+        Task.all_objects
+        .filter(COUNTED_TASKS, user_id=user_id, due_date__in=days)
+        .order_by()
+        .values_list('due_date')
+        .annotate(count=Count('id'))
+    )
+    for day, count in due_rows:
+        values_by_day[day]['tasks_due'] = count
+    completed_rows = (
+        Task.all_objects
+        .filter(COMPLETED_TASKS, user_id=user_id, completed_at__date__in=days)
+        .annotate(day=TruncDate('completed_at'))
+        .order_by()
+        .values_list('day')
+        .annotate(count=Count('id'))
+    )
+    for day, count in completed_rows:
+        values_by_day[day]['tasks_completed'] = count
+    _upsert_columns(user_id, values_by_day, ('tasks_due', 'tasks_completed'))
+
+
+def _study_rollup_rows(user_id, days=None):
+    """Study timer seconds and session counts grouped by (day, session_type)"""
+    sessions = StudyTimerSession.objects.filter(user_id=user_id)
+    if days is not None:
+        sessions = sessions.filter(start_time__date__in=days)
+    return (
+        sessions
+        .annotate(day=TruncDate('start_time'))
+        .order_by()
+        .values_list('day', 'session_type')
+        .annotate(seconds=Sum('duration'), sessions=Count('id'))
+    )
+
+
+def refresh_study_stats(user_id, days):
+    """
+    Recompute the study rollups for the given days: StudyDailyRollup rows per
+    session type and UserDailyStats.study_seconds (Study sessions only).
+    """
+    days = set(d for d in days if d is not None)
+    if not days:
+        return
+    rollups = []
+    values_by_day = {day: {'study_seconds': 0} for day in days}
+    for day, session_type, seconds, sessions in _study_rollup_rows(user_id, days):
+        seconds = max(0, seconds or 0)
+        rollups.append(StudyDailyRollup(
+            user_id=user_id, day=day, session_type=session_type, seconds=seconds, sessions=sessions
+        ))
+        if session_type == 'Study':
+            values_by_day[day]['study_seconds'] = seconds
+
+    current = {(rollup.day, rollup.session_type) for rollup in rollups}
+    with transaction.atomic():
+        # Session types that no longer have sessions on a day lose their row
+        stale_ids = [
+            rollup_id for rollup_id, day, session_type in
+            StudyDailyRollup.objects.filter(user_id=user_id, day__in=days).values_list('id', 'day', 'session_type')
+            if (day, session_type) not in current
+        ]
+        if stale_ids:
+            StudyDailyRollup.objects.filter(id__in=stale_ids).delete()
+        if rollups:
+            StudyDailyRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=['user', 'day', 'session_type'],
+                update_fields=['seconds', 'sessions'],
+            )
+        _upsert_columns(user_id, values_by_day, ('study_seconds',))
+
+
+def get_study_totals(user_id, start=None, end=None):
+    """
+    Study timer totals by session type from the daily rollup.
+
+    Returns:
+        dict: {session_type: {'seconds': int, 'sessions': int}}
+    """
+    rollups = StudyDailyRollup.objects.filter(user_id=user_id)
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+    rows = (
+        rollups.order_by()
+        .values_list('session_type')
+        .annotate(seconds=Sum('seconds'), sessions=Sum('sessions'))
+    )
+    return {session_type: {'seconds': seconds or 0, 'sessions': sessions or 0} for session_type, seconds, sessions in rows}
+
+
+def bump_daily_stats(user_id, day, **deltas):
+    """Atomically add deltas (e.g. quizzes=1, xp=20) to a day's row"""
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserDailyStats.objects.filter(user_id=user_id, day=day).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            UserDailyStats.objects.create(user_id=user_id, day=day, **deltas)
+    except IntegrityError:
+        # Created concurrently; apply the deltas to that row instead
+        UserDailyStats.objects.filter(user_id=user_id, day=day).update(**updates)
+
+
+def rebuild_daily_stats(user_id):
+    """
+    Rebuild a user's whole series from the source tables.
+
+    Returns:
+        int: number of daily rows written
+    """
+    from .xp import XP_PER_QUIZ
+
+    values_by_day = {}
+
+    def row(day):
+        return values_by_day.setdefault(day, {field: 0 for field in SERIES_FIELDS})
+
+    for day, count in (
+        Task.all_objects.filter(COUNTED_TASKS, user_id=user_id)
+        .order_by().values_list('due_date').annotate(count=Count('id'))
+    ):
+        row(day)['tasks_due'] = count
+    for day, count in (
+        Task.all_objects.filter(COMPLETED_TASKS, user_id=user_id, completed_at__isnull=False)
+        .annotate(day=TruncDate('completed_at'))
+        .order_by().values_list('day').annotate(count=Count('id'))
+    ):
+        row(day)['tasks_completed'] = count
+    study_rollups = []
+    for day, session_type, seconds, sessions in _study_rollup_rows(user_id):
+        seconds = max(0, seconds or 0)
+        study_rollups.append(StudyDailyRollup(
+            user_id=user_id, day=day, session_type=session_type, seconds=seconds, sessions=sessions
+        ))
+        if session_type == 'Study':
+            row(day)['study_seconds'] = seconds
+    for day, count in (
+        QuizSession.objects.filter(user_id=user_id)
+        .annotate(day=TruncDate('completed_at'))
+        .order_by().values_list('day').annotate(count=Count('id'))
+    ):
+        row(day)['quizzes'] = count
+        row(day)['xp'] += count * XP_PER_QUIZ
+    for day, xp in (
+        XPLog.objects.filter(user_id=user_id)
+        .annotate(day=TruncDate('awarded_at'))
+        .order_by().values_list('day').annotate(total=Sum('xp'))
+    ):
+        row(day)['xp'] += xp or 0
+
+    with transaction.atomic():
+        UserDailyStats.objects.filter(user_id=user_id).delete()
+        UserDailyStats.objects.bulk_create(
+            [UserDailyStats(user_id=user_id, day=day, **values) for day, values in values_by_day.items()],
+            batch_size=1000,
+        )
+        StudyDailyRollup.objects.filter(user_id=user_id).delete()
+        StudyDailyRollup.objects.bulk_create(study_rollups, batch_size=1000)
+    return len(values_by_day)
+
+
+def get_daily_series(user_id, start, end):
+    """
+    Dense daily series for a date range, read with one query.
+
+    Returns:
+        dict: {field: array('i')} where index i is ``start + i days``
+    """
+    num_days = (end - start).days + 1
+    series = {field: array('i', [0]) * num_days for field in SERIES_FIELDS}
+    rows = UserDailyStats.objects.filter(user_id=user_id, day__range=(start, end)).values_list('day', *SERIES_FIELDS)
+    for day, *values in rows:
+        index = (day - start).days
+        for field, value in zip(SERIES_FIELDS, values):
+            series[field][index] = value
+    return series
+
+
+def downsample(series, start, buckets):
+    """
+    Sum a dense daily series into buckets.
+
+    Args:
+        series: output of get_daily_series for a range beginning at start
+        buckets: list of (bucket_start, bucket_end) dates inside that range
+
+    Returns:
+        list: one {field: total} dict per bucket
+    """
+    totals = []
+    for bucket_start, bucket_end in buckets:
+        first = (bucket_start - start).days
+        last = (bucket_end - start).days + 1
+        totals.append({field: sum(values[first:last]) for field, values in series.items()})
+    return totals
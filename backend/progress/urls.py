@@ -11,7 +11,9 @@ def progress_root(request):
             '/api/progress/level/',
             '/api/progress/streaks/',
             '/api/progress/chart/',
+            '/api/progress/study_time/',
             '/api/progress/productivity/',
+            '/api/progress/productivity/lock/',
             '/api/progress/productivity_logs/',
         ]
     })
@@ -22,7 +24,10 @@ urlpatterns = [
     path('level/', views.user_level, name='user_level'),
     path('streaks/', views.user_streaks, name='user_streaks'),
     path('chart/', views.user_chart, name='user_chart'),
+    path('study_time/', views.user_study_time, name='user_study_time'),
     path('productivity/', views.user_productivity, name='user_productivity'),
+    path('productivity/lock/', views.lock_productivity, name='lock_productivity'),
+    path('cache_stats/', views.summary_cache_stats, name='summary_cache_stats'),
     path('debug_today_tasks/', views.debug_today_tasks, name='debug_today_tasks'),
     path('productivity_logs/', views.productivity_log_list, name='productivity_log_list'),
 ] 
\ No newline at end of file
@@ -2,158 +2,226 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes
-from tasks.models import Task, XPLog, ProductivityLog
+from tasks.models import Task, ProductivityLog
+from tasks.productivity import (
+    iter_days, get_due_date_arrays, get_due_date_counts, get_work_date_counts, get_productivity_status,
+    summarize_period, compute_rollups, bulk_upsert_productivity_logs,
+)
 from decks.models import QuizSession
+from .streaks import get_current_streak
+from .xp import get_user_level
+from .timeseries import get_daily_series, downsample, get_study_totals
+from .cache import get_or_compute, get_cache_stats
 from django.utils import timezone
-from datetime import timedelta
-from django.db import models
+from datetime import datetime, timedelta
 from calendar import monthrange
+from array import array
 
 # Create your views here.
 
+# Longest window user_streaks will serve in one request (about three years)
+MAX_STREAK_WINDOW_DAYS = 366 * 3
+
+
+def _parse_date_param(value, default):
+    """Parse a YYYY-MM-DD query parameter, falling back to default when absent"""
+    if not value:
+        return default
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_stats(request):
     user = request.user
+    today = timezone.localdate()
+    data = get_or_compute(
+        user.id, 'stats', (today,), lambda: _compute_user_stats(user), depends=('tasks', 'quizzes', 'study')
+    )
+    return Response(data)
+
+def _compute_user_stats(user):
     tasks = Task.all_objects.filter(user=user, is_deleted=False)
     completed_tasks = tasks.filter(completed=True)
     total_tasks_completed = completed_tasks.count()
-    total_study_time = completed_tasks.filter(category='study').count()  # Proxy: 1 study task = 1 unit time
+    # Minutes of Study timer sessions, read from the daily rollup
+    total_study_time = round(get_study_totals(user.id).get('Study', {}).get('seconds', 0) / 60)
     total_tasks = tasks.count()
     average_productivity = int((total_tasks_completed / total_tasks) * 100) if total_tasks > 0 else 0
 
-    # Calculate streak: consecutive days with tasks and at least one completed task
-    streak = 0
-    today = timezone.localdate()
-    day = today
-    while True:
-        # Only count past and current dates, not future dates
-        if day > today:
-            day -= timedelta(days=1)
-            continue
-            
-        # Check if there were tasks on this day AND at least one was completed
-        daily_tasks = tasks.filter(due_date=day)
-        daily_completed = completed_tasks.filter(due_date=day)
-        
-        if daily_tasks.exists() and daily_completed.exists():
-            streak += 1
-            day -= timedelta(days=1)
-        else:
-            break
+    # Streak: consecutive days (ending today) with at least one completed task,
+    # maintained incrementally in UserStreak
+    streak = get_current_streak(user)
 
     # Add XP from completed QuizSessions
     quiz_sessions = QuizSession.objects.filter(user=user)
     total_quizzes_completed = quiz_sessions.count()
 
-    data = {
+    return {
         'totalTasksCompleted': total_tasks_completed,
         'totalStudyTime': total_study_time,
         'averageProductivity': average_productivity,
         'streak': streak,
         'totalQuizzesCompleted': total_quizzes_completed
     }
-    return Response(data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_level(request):
-    user = request.user
-    # Sum XP from XPLog
-    xp_from_tasks = XPLog.objects.filter(user=user).aggregate(total=models.Sum('xp'))['total'] or 0
-    # Add XP from completed QuizSessions
-    quiz_sessions = QuizSession.objects.filter(user=user)
-    xp_from_quizzes = quiz_sessions.count() * 20
-    total_xp = xp_from_tasks + xp_from_quizzes
-    # Leveling: each level requires 100 more XP than the previous
-    level = 1
-    xp_needed = 100
-    xp_remaining = total_xp
-    while xp_remaining >= xp_needed:
-        xp_remaining -= xp_needed
-        level += 1
-        xp_needed += 100
-    current_level = level
-    current_xp = xp_remaining
-    xp_to_next_level = xp_needed
-    data = {
-        'currentLevel': current_level,
-        'currentXP': current_xp,
-        'xpToNextLevel': xp_to_next_level
-    }
+    # XP total is denormalized in UserXP and the level info kept in the
+    # summary cache, so polling this endpoint doesn't touch the XP tables
+    data = get_user_level(request.user.id)
     return Response(data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_streaks(request):
     user = request.user
-    
-    # Get the last 365 days of productivity data
-    from datetime import datetime, timedelta
-    from tasks.models import Task
-    
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=365)
-    
-    streak_data = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Check if user had productive day (completed tasks)
-        daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-        daily_non_deleted = daily_tasks.filter(is_deleted=False)
-        daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-        
-        daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-        daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-        
-        # Consider it a streak day if there were tasks and at least one was completed
-        # But only for past and current dates, not future dates
-        today = timezone.now().date()
-        is_future_date = current_date > today
-        
-        if is_future_date:
-            has_streak = False
-            productivity_rate = 0
-        else:
-            has_streak = daily_total > 0 and daily_completed > 0
-            productivity_rate = (daily_completed / daily_total * 100) if daily_total > 0 else 0
-        
-        streak_data.append({
-            'date': current_date.isoformat(),
-            'streak': has_streak,
-            'productivity': round(productivity_rate, 2) if has_streak else 0,
-            'total_tasks': daily_total,
-            'completed_tasks': daily_completed
-        })
-        
-        current_date += timedelta(days=1)
-    
-    return Response(streak_data)
+    today = timezone.now().date()
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def user_chart(request):
-    view = request.GET.get('view', 'weekly')
-    # TODO: Implement real chart data based on 'view'
-    data = {}
+    # Default window is the last 365 days; ?start=&end= (YYYY-MM-DD) narrows it
+    try:
+        end_date = _parse_date_param(request.GET.get('end'), today)
+        start_date = _parse_date_param(request.GET.get('start'), end_date - timedelta(days=365))
+    except ValueError:
+        return Response({'error': 'start and end must be dates in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+    if start_date > end_date:
+        return Response({'error': 'start must be on or before end'}, status=status.HTTP_400_BAD_REQUEST)
+    if (end_date - start_date).days > MAX_STREAK_WINDOW_DAYS:
+        return Response({'error': f'Window cannot exceed {MAX_STREAK_WINDOW_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+
+    columnar = request.GET.get('columnar') == '1'
+    data = get_or_compute(
+        user.id, 'streaks', (start_date, end_date, today, columnar),
+        lambda: _build_streaks(user, start_date, end_date, today, columnar),
+    )
     return Response(data)
 
+def _build_streaks(user, start_date, end_date, today, columnar):
+    # Fetch per-day counts for the whole window in one grouped query
+    totals, completed = get_due_date_arrays(user, start_date, end_date)
+
+    # One pass over the dense arrays computes streak flags and productivity rates.
+    # A streak day has tasks and at least one completed, and only past and
+    # current dates can count.
+    num_days = len(totals)
+    last_countable = min((today - start_date).days, num_days - 1)
+    streaks = array('B', [0]) * num_days
+    productivity = array('d', [0.0]) * num_days
+    for i in range(last_countable + 1):
+        if totals[i] and completed[i]:
+            streaks[i] = 1
+            productivity[i] = round(completed[i] / totals[i] * 100, 2)
+
+    streak_data = [
+        {
+            'date': (start_date + timedelta(days=i)).isoformat(),
+            'streak': bool(streaks[i]),
+            'productivity': productivity[i] if streaks[i] else 0,
+            'total_tasks': totals[i],
+            'completed_tasks': completed[i]
+        }
+        for i in range(num_days)
+    ]
+
+    # ?columnar=1 adds a compact column-per-field form (day i is start + i days)
+    if columnar:
+        return {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'days': streak_data,
+            'columns': {
+                'streak': streaks.tolist(),
+                'productivity': productivity.tolist(),
+                'total_tasks': totals.tolist(),
+                'completed_tasks': completed.tolist(),
+            }
+        }
+
+    return streak_data
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def user_productivity(request):
-    from tasks.models import Task, ProductivityLog
-    from django.utils import timezone
-    from datetime import timedelta, datetime as dt
-    from django.db import transaction
+def user_chart(request):
+    """
+    Chart series for the week, month or year containing ?date (default today).
 
-    user = request.user
+    Served from the pre-aggregated UserDailyStats series with one query:
+    weekly returns one point per day, monthly one per week (clipped to the
+    month) and yearly one per month.
+    """
     view = request.GET.get('view', 'weekly').lower()
-    date_str = request.GET.get('date')
-    lock = request.GET.get('lock') == '1'
-    
+    try:
+        base_date = _parse_date_param(request.GET.get('date'), timezone.localdate())
+    except ValueError:
+        return Response({'error': 'date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if view == 'weekly':
+        start = base_date - timedelta(days=base_date.weekday())
+        end = start + timedelta(days=6)
+        buckets = [(day, day, day.strftime('%a')) for day in iter_days(start, end)]
+    elif view == 'monthly':
+        start = base_date.replace(day=1)
+        end = base_date.replace(day=monthrange(base_date.year, base_date.month)[1])
+        buckets = []
+        week_start = start
+        while week_start <= end:
+            week_end = min(week_start + timedelta(days=6 - week_start.weekday()), end)
+            buckets.append((week_start, week_end, f"Week {len(buckets) + 1}"))
+            week_start = week_end + timedelta(days=1)
+    elif view == 'yearly':
+        start = base_date.replace(month=1, day=1)
+        end = base_date.replace(month=12, day=31)
+        buckets = [
+            (start.replace(month=month), start.replace(month=month, day=monthrange(start.year, month)[1]),
+             start.replace(month=month).strftime('%b'))
+            for month in range(1, 13)
+        ]
+    else:
+        return Response({'error': 'view must be weekly, monthly or yearly'}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = get_or_compute(
+        request.user.id, 'chart', (view, start),
+        lambda: _build_chart(request.user.id, view, start, end, buckets),
+        depends=('tasks', 'xp', 'quizzes', 'study'),
+    )
+    return Response(data)
+
+def _build_chart(user_id, view, start, end, buckets):
+    series = get_daily_series(user_id, start, end)
+    totals = downsample(series, start, [(bucket_start, bucket_end) for bucket_start, bucket_end, _ in buckets])
+    points = []
+    for (bucket_start, bucket_end, label), bucket in zip(buckets, totals):
+        points.append({
+            'label': label,
+            'start': bucket_start.isoformat(),
+            'end': bucket_end.isoformat(),
+            'tasksCompleted': bucket['tasks_completed'],
+            'tasksDue': bucket['tasks_due'],
+            'studySeconds': bucket['study_seconds'],
+            'quizzes': bucket['quizzes'],
+            'xp': bucket['xp'],
+        })
+
+    return {
+        'view': view,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'points': points,
+    }
+
+def _compute_productivity(user, view, date_str=None):
+    """
+    Live productivity for the current week/month or a given day.
+
+    Pure computation: nothing is written.
+
+    Returns:
+        tuple: (view, start, end, data)
+    """
     # Use local time (system timezone) to match task creation logic
     today = timezone.now().date()
 
@@ -161,7 +229,7 @@ def user_productivity(request):
     if view == 'daily':
         if date_str:
             try:
-                target_date = dt.strptime(date_str, '%Y-%m-%d').date()
+                target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             except Exception:
                 target_date = today
         else:
@@ -170,552 +238,262 @@ def user_productivity(request):
         end = target_date
     elif view == 'monthly':
         start = today.replace(day=1)
-        if today.month == 12:
-            end = today.replace(year=today.year+1, month=1, day=1) - timedelta(days=1)
-        else:
-            end = today.replace(month=today.month+1, day=1) - timedelta(days=1)
+        end = today.replace(day=monthrange(today.year, today.month)[1])
     else:  # weekly (default)
+        view = 'weekly'
         start = today - timedelta(days=today.weekday())
         end = start + timedelta(days=6)
 
-    # If the period is in the past, use or create a log
-    is_current_period = (view == 'daily' and start == today) or \
-                       (view == 'weekly' and start <= today <= end) or \
-                       (view == 'monthly' and start.month == today.month and start.year == today.year)
-
-    # Always calculate current data (live calculation)
     if view == 'daily':
-        # NEW LOGIC: Count tasks by when they were actually worked on
+        # Count tasks by when they were actually worked on
         # - Completed tasks: count by completed_at date (when work was done)
         # - Pending tasks: count by due_date (when they're scheduled)
-        
-        # Get completed tasks that were completed on this day (regardless of due date)
-        completed_on_this_day = Task.all_objects.filter(
-            user=user,
-            completed=True,
-            is_deleted=False,
-            completed_at__date=start  # Match completion date
-        )
-        
-        # Get tasks that are due today but not yet completed (to show in total)
-        pending_due_today = Task.all_objects.filter(
-            user=user,
-            due_date=start,
-            completed=False,
-            is_deleted=False
-        )
-        
-        # Get deleted tasks that were completed on this day
-        deleted_completed_on_this_day = Task.all_objects.filter(
-            user=user,
-            is_deleted=True,
-            was_completed_on_delete=True,
-            completed_at__date=start
-        )
-        
-        total_tasks = completed_on_this_day.count() + pending_due_today.count() + deleted_completed_on_this_day.count()
-        completed_tasks = completed_on_this_day.count() + deleted_completed_on_this_day.count()
-        
-        # DEBUG: Print calculation values
-        print(f"[DEBUG] Daily calculation for {start} to {end}:")
-        print(f"[DEBUG] Total tasks: {total_tasks}")
-        print(f"[DEBUG] Completed tasks: {completed_tasks}")
-        print(f"[DEBUG] Non-deleted count: {non_deleted.count()}")
-        print(f"[DEBUG] Deleted completed count: {deleted_completed.count()}")
-        print(f"[DEBUG] Non-deleted completed: {non_deleted.filter(completed=True).count()}")
+        day_counts = get_work_date_counts(user, start, end)[start]
+        total_tasks = day_counts['total']
+        completed_tasks = day_counts['completed']
+        completion_rate = completed_tasks / total_tasks * 100 if total_tasks > 0 else 0
     else:
-        # For weekly and monthly views, aggregate daily productivity data
-        # This gives a more accurate picture by using daily completion rates
-        if view == 'weekly':
-            # Calculate weekly percentage as average of daily percentages
-            daily_percentages = []
-            current_date = start
-            while current_date <= end:
-                daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                
-                daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-                daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                
-                if daily_total > 0:
-                    daily_percentage = (daily_completed / daily_total) * 100
-                else:
-                    daily_percentage = 0  # No tasks = 0% productivity
-                
-                daily_percentages.append(daily_percentage)
-                current_date += timedelta(days=1)
-            
-            # Calculate average of daily percentages
-            if daily_percentages:
-                completion_rate = sum(daily_percentages) / len(daily_percentages)
-                # For display purposes, we'll show the average percentage
-                # but we need to calculate total tasks for the response
-                total_tasks = 0
-                completed_tasks = 0
-                current_date = start
-                while current_date <= end:
-                    daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                    daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                    daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                    
-                    total_tasks += daily_non_deleted.count() + daily_deleted_completed.count()
-                    completed_tasks += daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                    current_date += timedelta(days=1)
-            else:
-                completion_rate = 0
-                total_tasks = 0
-                completed_tasks = 0
-        
-        elif view == 'monthly':
-            # Calculate monthly percentage as average of daily percentages
-            daily_percentages = []
-            current_date = start
-            while current_date <= end:
-                daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                
-                daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-                daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                
-                if daily_total > 0:
-                    daily_percentage = (daily_completed / daily_total) * 100
-                else:
-                    daily_percentage = 0  # No tasks = 0% productivity
-                
-                daily_percentages.append(daily_percentage)
-                current_date += timedelta(days=1)
-            
-            # Calculate average of daily percentages
-            if daily_percentages:
-                completion_rate = sum(daily_percentages) / len(daily_percentages)
-                # For display purposes, we'll show the average percentage
-                # but we need to calculate total tasks for the response
-                total_tasks = 0
-                completed_tasks = 0
-                current_date = start
-                while current_date <= end:
-                    daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                    daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                    daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                    
-                    total_tasks += daily_non_deleted.count() + daily_deleted_completed.count()
-                    completed_tasks += daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                    current_date += timedelta(days=1)
-            else:
-                completion_rate = 0
-                total_tasks = 0
-                completed_tasks = 0
-    
-    print(f"[DEBUG] Productivity endpoint - Today (local): {today}")
-    print(f"[DEBUG] Productivity endpoint - Start: {start}, End: {end}")
-    print(f"[DEBUG] Productivity endpoint - View: {view}")
-    print(f"[DEBUG] Productivity endpoint - Total tasks found: {total_tasks}")
-    print(f"[DEBUG] Productivity endpoint - Completed tasks: {completed_tasks}")
-    print(f"[DEBUG] Productivity endpoint - Is current period: {is_current_period}")
-    
+        # For weekly and monthly views, the completion rate is the average of
+        # daily percentages, computed from one grouped query over the period
+        summary = summarize_period(get_due_date_counts(user, start, end), start, end)
+        completion_rate = summary['completion_rate']
+        total_tasks = summary['total_tasks']
+        completed_tasks = summary['completed_tasks']
+
     if total_tasks == 0:
         completion_rate = 0
-        status = 'No Tasks'
-    else:
-        # For weekly and monthly views, use the average of daily percentages
-        # For daily view, use the traditional calculation
-        if view in ['weekly', 'monthly']:
-            # completion_rate is already calculated as average of daily percentages above
-            pass
-        else:
-            # For daily view, use traditional calculation
-            completion_rate = completed_tasks / total_tasks * 100
-            print(f"[DEBUG] Daily completion rate calculation: {completed_tasks} / {total_tasks} * 100 = {completion_rate:.2f}%")
-        
-        if completion_rate >= 90:
-            status = 'Highly Productive'
-        elif completion_rate >= 70:
-            status = 'Productive'
-        elif completion_rate >= 40:
-            status = 'Moderately Productive'
-        else:
-            status = 'Low Productive'
-    
+
     data = {
-        'status': status,
+        'status': get_productivity_status(completion_rate, total_tasks),
         'completion_rate': round(completion_rate, 2),
         'total_tasks': total_tasks,
         'completed_tasks': completed_tasks
     }
-    
-    print(f"[DEBUG] Calculated data: {data}")
-    
-    # For past periods OR if lock is requested, save to log
-    # For current periods, also save to log so it appears in history
-    if not is_current_period or lock or True:  # Always save for now
-        with transaction.atomic():
-            log, created = ProductivityLog.objects.get_or_create(
-                user=user,
-                period_type=view,
-                period_start=start,
-                period_end=end,
-                defaults={
-                    'completion_rate': data['completion_rate'],
-                    'total_tasks': data['total_tasks'],
-                    'completed_tasks': data['completed_tasks'],
-                    'status': data['status']
-                }
-            )
-            # If log exists but data changed, update it (for current periods)
-            if not created:
-                log.completion_rate = data['completion_rate']
-                log.total_tasks = data['total_tasks']
-                log.completed_tasks = data['completed_tasks']
-                log.status = data['status']
-                log.save()
-                print(f"[DEBUG] Updated existing log for {start} to {end}")
-            else:
-                print(f"[DEBUG] Created new log for {start} to {end}")
-    
+    return view, start, end, data
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_productivity(request):
+    """
+    Current productivity for ?view=daily|weekly|monthly.
+
+    Read-only and cached per user until their tasks change. Persisting a
+    period's log is done by POST productivity/lock/ or the scheduled
+    update_current_productivity job.
+    """
+    user = request.user
+    view = request.GET.get('view', 'weekly').lower()
+    date_str = request.GET.get('date')
+
+    data = get_or_compute(
+        user.id, 'productivity', (view, date_str or timezone.now().date()),
+        lambda: _compute_productivity(user, view, date_str)[3],
+    )
     return Response(data)
 
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def lock_productivity(request):
+    """Compute a period's productivity and persist it as a ProductivityLog"""
+    user = request.user
+    if not isinstance(request.data, dict):
+        return Response({'error': 'Request body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    view = (request.data.get('view') or request.GET.get('view') or 'weekly').lower()
+    date_str = request.data.get('date') or request.GET.get('date')
+    # A bad date must not silently lock today instead
+    try:
+        _parse_date_param(date_str, None)
+    except (TypeError, ValueError):
+        return Response({'error': 'date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+
+    view, start, end, data = _compute_productivity(user, view, date_str)
+    bulk_upsert_productivity_logs([
+        ProductivityLog(
+            user=user,
+            period_type=view,
+            period_start=start,
+            period_end=end,
+            **data
+        )
+    ])
+
+    return Response({
+        **data,
+        'period_type': view,
+        'period_start': start.isoformat(),
+        'period_end': end.isoformat(),
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def productivity_log_list(request):
-    from tasks.models import ProductivityLog, Task
+    """
+    List daily, weekly or monthly productivity logs.
+
+    This is a pure read: stored logs are returned as-is, while missing days
+    and missing or dirty weekly/monthly rollups are computed live from one
+    grouped query. Rollups are persisted by refresh_productivity_rollups.
+    """
+    from tasks.models import ProductivityLog
     from django.utils import timezone
-    from datetime import datetime, timedelta, date
+    from datetime import timedelta, date
     user = request.user
     view = request.GET.get('view', 'daily').lower()
     date_str = request.GET.get('date')
     today = timezone.localdate()
-    
-    # DEBUG: Print request parameters
-    print(f"[DEBUG] productivity_log_list called with:")
-    print(f"  user: {user}")
-    print(f"  view: {view}")
-    print(f"  date_str: {date_str}")
-    print(f"  today: {today}")
-    
-    # Parse base date
-    if date_str:
-        try:
-            base_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            print(f"[DEBUG] Parsed base_date: {base_date}")
-        except Exception as e:
-            print(f"[DEBUG] Error parsing date: {e}")
-            base_date = today
-    else:
-        base_date = today
-        print(f"[DEBUG] Using today as base_date: {base_date}")
-    
-    # MANUAL CLEANUP: Force delete ALL weekly logs to recalculate from daily logs
-    if view == 'weekly':
-        deleted_count = ProductivityLog.objects.filter(
-            user=user,
-            period_type='weekly'
-        ).delete()[0]
-        print(f"[DEBUG] MANUALLY DELETED ALL {deleted_count} weekly logs for user {user.username}")
-        print(f"[DEBUG] All weekly logs will be recalculated from daily logs")
-    
-    # MANUAL CLEANUP: Force delete ALL monthly logs to recalculate from daily logs
-    if view == 'monthly':
-        deleted_count = ProductivityLog.objects.filter(
-            user=user,
-            period_type='monthly'
-        ).delete()[0]
-        print(f"[DEBUG] MANUALLY DELETED ALL {deleted_count} monthly logs for user {user.username}")
-        print(f"[DEBUG] All monthly logs will be recalculated from daily logs")
-    
+
+    try:
+        base_date = _parse_date_param(date_str, today)
+    except ValueError:
+        return Response({'error': 'date must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+
     data = []
     if view == 'daily':
         # List all days in the month
         year = base_date.year
         month = base_date.month
         num_days = monthrange(year, month)[1]
+        month_start = date(year, month, 1)
+        month_end = date(year, month, num_days)
+
+        logs_by_day = {
+            log.period_start: log
+            for log in ProductivityLog.objects.filter(
+                user=user, period_type='daily', period_start__range=(month_start, month_end)
+            )
+        }
+
+        # Count by work date (completed_at) for days that have no log yet
+        work_counts = None
         for day in range(num_days, 0, -1):
-            d = datetime(year, month, day).date()
-            log = ProductivityLog.objects.filter(user=user, period_type='daily', period_start=d, period_end=d).first()
-            
-            # If no log exists for this day, create one
-            if not log:
-                # NEW LOGIC: Count by work date (completed_at) not just due_date
-                completed_on_this_day = Task.all_objects.filter(
-                    user=user,
-                    completed=True,
-                    is_deleted=False,
-                    completed_at__date=d
-                )
-                pending_due_today = Task.all_objects.filter(
-                    user=user,
-                    due_date=d,
-                    completed=False,
-                    is_deleted=False
-                )
-                deleted_completed_on_this_day = Task.all_objects.filter(
-                    user=user,
-                    is_deleted=True,
-                    was_completed_on_delete=True,
-                    completed_at__date=d
-                )
-                
-                total_tasks = completed_on_this_day.count() + pending_due_today.count() + deleted_completed_on_this_day.count()
-                completed_tasks = completed_on_this_day.count() + deleted_completed_on_this_day.count()
-                
-                if total_tasks == 0:
-                    completion_rate = 0
-                    status = 'No Tasks'
-                else:
-                    completion_rate = completed_tasks / total_tasks * 100
-                    if completion_rate >= 90:
-                        status = 'Highly Productive'
-                    elif completion_rate >= 70:
-                        status = 'Productive'
-                    elif completion_rate >= 40:
-                        status = 'Moderately Productive'
-                    else:
-                        status = 'Low Productive'
-                
-                log = ProductivityLog.objects.create(
-                    user=user,
-                    period_type='daily',
-                    period_start=d,
-                    period_end=d,
-                    completion_rate=completion_rate,
-                    total_tasks=total_tasks,
-                    completed_tasks=completed_tasks,
-                    status=status
-                )
-            
+            d = date(year, month, day)
+            log = logs_by_day.get(d)
+
+            if log:
+                values = _log_values(log)
+            else:
+                if work_counts is None:
+                    work_counts = get_work_date_counts(user, month_start, month_end)
+                total_tasks = work_counts[d]['total']
+                completed_tasks = work_counts[d]['completed']
+                completion_rate = completed_tasks / total_tasks * 100 if total_tasks > 0 else 0
+                values = {
+                    'status': get_productivity_status(completion_rate, total_tasks),
+                    'completion_rate': completion_rate,
+                    'total_tasks': total_tasks,
+                    'completed_tasks': completed_tasks
+                }
+
             data.append({
                 'date': d.strftime('%Y-%m-%d'),
-                'log': {
-                    'status': log.status,
-                    'completion_rate': log.completion_rate,
-                    'total_tasks': log.total_tasks,
-                    'completed_tasks': log.completed_tasks
-                }
+                'log': values
             })
     elif view == 'weekly':
-        # List all weeks in the year
+        # List all weeks (Monday to Sunday) that start in the year
         year = base_date.year
-        today = timezone.localdate()
-        
-        # Calculate all weeks in the year
-        from datetime import timedelta
-        
-        # Get the first day of the year
-        first_day = datetime(year, 1, 1).date()
-        # Get the last day of the year
-        last_day = datetime(year, 12, 31).date()
-        
-        # Generate all weeks in the year
-        current_date = first_day
-        while current_date <= last_day:
-            # Calculate week start (Monday) and week end (Sunday)
-            days_since_monday = current_date.weekday()
-            week_start = current_date - timedelta(days=days_since_monday)
-            week_end = week_start + timedelta(days=6)
-            
-            # Check if we already have a log for this week
-            log = ProductivityLog.objects.filter(
-                user=user, 
-                period_type='weekly', 
-                period_start=week_start, 
-                period_end=week_end
-            ).first()
-            
-            # If no log exists for this week, create one using average of daily percentages
-            if not log:
-                # Calculate weekly percentage as average of daily percentages
-                daily_percentages = []
-                total_tasks = 0
-                completed_tasks = 0
-                current_date = week_start
-                
-                while current_date <= week_end:
-                    daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                    daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                    daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                    
-                    daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-                    daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                    
-                    if daily_total > 0:
-                        daily_percentage = (daily_completed / daily_total) * 100
-                    else:
-                        daily_percentage = 0  # No tasks = 0% productivity
-                    
-                    daily_percentages.append(daily_percentage)
-                    total_tasks += daily_total
-                    completed_tasks += daily_completed
-                    current_date += timedelta(days=1)
-                
-                # Calculate average of daily percentages
-                if daily_percentages:
-                    completion_rate = sum(daily_percentages) / len(daily_percentages)
-                else:
-                    completion_rate = 0
-                
-                if completion_rate >= 90:
-                    status = 'Highly Productive'
-                elif completion_rate >= 70:
-                    status = 'Productive'
-                elif completion_rate >= 40:
-                    status = 'Moderately Productive'
-                else:
-                    status = 'Low Productive'
-                
-                # Create the weekly log
-                log = ProductivityLog.objects.create(
-                    user=user,
-                    period_type='weekly',
-                    period_start=week_start,
-                    period_end=week_end,
-                    completion_rate=completion_rate,
-                    total_tasks=total_tasks,
-                    completed_tasks=completed_tasks,
-                    status=status
-                )
-                print(f"[DEBUG] Created weekly log for {week_start} to {week_end}: {completion_rate:.2f}% (average of daily percentages)")
-            
-            # Move to next week
-            current_date = week_end + timedelta(days=1)
-        
-        # Get all weekly logs for this year (including newly created ones)
-        all_logs = ProductivityLog.objects.filter(
-            user=user,
-            period_type='weekly',
-            period_start__year=year
-        ).order_by('-period_start')  # Most recent first
-        
-        # Process all logs for the response
-        for log in all_logs:
-            week_start = log.period_start
-            week_end = log.period_end
-            
-            # Debug: Log all weeks and their data
-            print(f"Week {week_start} to {week_end}: {log.total_tasks} tasks, status: {log.status}")
-            
-            # Only include weeks that have tasks, are recent, or are in the user's expected date ranges
-            today = timezone.localdate()
+        first_day = date(year, 1, 1)
+        week_start = first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+        periods = []
+        while week_start.year == year:
+            periods.append((week_start, week_start + timedelta(days=6)))
+            week_start += timedelta(days=7)
+
+        for (week_start, week_end), values in reversed(_rollup_values(user, 'weekly', periods)):
+            # Only include weeks that have tasks or are recent
             is_recent = (today - week_end).days <= 28  # Within last 4 weeks
-            has_tasks = log.total_tasks > 0
-            
+            has_tasks = values['total_tasks'] > 0
+
             if has_tasks or is_recent:
                 data.append({
                     'week_start': week_start.strftime('%Y-%m-%d'),
                     'week_end': week_end.strftime('%Y-%m-%d'),
-                    'log': {
-                        'status': log.status,
-                        'completion_rate': log.completion_rate,
-                        'total_tasks': log.total_tasks,
-                        'completed_tasks': log.completed_tasks
-                    }
+                    'log': values
                 })
     elif view == 'monthly':
         # List all months in the year
         year = base_date.year
-        
-        # Generate all months in the year
-        for month in range(1, 13):  # January to December
-            # Calculate month start and end dates
-            month_start = datetime(year, month, 1).date()
-            if month == 12:
-                month_end = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                month_end = datetime(year, month + 1, 1).date() - timedelta(days=1)
-            
-            # Check if we already have a log for this month
-            log = ProductivityLog.objects.filter(
-                user=user, 
-                period_type='monthly', 
-                period_start=month_start, 
-                period_end=month_end
-            ).first()
-            
-            # If no log exists for this month, create one using average of daily percentages
-            if not log:
-                # Calculate monthly percentage as average of daily percentages
-                daily_percentages = []
-                total_tasks = 0
-                completed_tasks = 0
-                current_date = month_start
-                
-                while current_date <= month_end:
-                    daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-                    daily_non_deleted = daily_tasks.filter(is_deleted=False)
-                    daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-                    
-                    daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-                    daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-                    
-                    if daily_total > 0:
-                        daily_percentage = (daily_completed / daily_total) * 100
-                    else:
-                        daily_percentage = 0  # No tasks = 0% productivity
-                    
-                    daily_percentages.append(daily_percentage)
-                    total_tasks += daily_total
-                    completed_tasks += daily_completed
-                    current_date += timedelta(days=1)
-                
-                # Calculate average of daily percentages
-                if daily_percentages:
-                    completion_rate = sum(daily_percentages) / len(daily_percentages)
-                else:
-                    completion_rate = 0
-                
-                if completion_rate >= 90:
-                    status = 'Highly Productive'
-                elif completion_rate >= 70:
-                    status = 'Productive'
-                elif completion_rate >= 40:
-                    status = 'Moderately Productive'
-                else:
-                    status = 'Low Productive'
-                
-                # Create the monthly log
-                log = ProductivityLog.objects.create(
-                    user=user,
-                    period_type='monthly',
-                    period_start=month_start,
-                    period_end=month_end,
-                    completion_rate=completion_rate,
-                    total_tasks=total_tasks,
-                    completed_tasks=completed_tasks,
-                    status=status
-                )
-                print(f"[DEBUG] Created monthly log for {month_start.strftime('%B %Y')}: {completion_rate:.2f}% (average of daily percentages)")
-        
-        # Get all monthly logs for this year (including newly created ones)
-        all_logs = ProductivityLog.objects.filter(
-            user=user,
-            period_type='monthly',
-            period_start__year=year
-        ).order_by('-period_start')  # Most recent first
-        
-        # Process all logs for the response
-        for log in all_logs:
-            month = log.period_start.month
-            
-            # Debug: Log all months and their data
-            print(f"Month {month}: {log.total_tasks} tasks, status: {log.status}")
-            
+        periods = [
+            (date(year, month, 1), date(year, month, monthrange(year, month)[1]))
+            for month in range(1, 13)  # January to December
+        ]
+
+        for (month_start, month_end), values in reversed(_rollup_values(user, 'monthly', periods)):
             # Only include months that have tasks or are recent
-            today = timezone.localdate()
-            is_recent = (today - log.period_end).days <= 90  # Within last 3 months
-            has_tasks = log.total_tasks > 0
-            
+            is_recent = (today - month_end).days <= 90  # Within last 3 months
+            has_tasks = values['total_tasks'] > 0
+
             if has_tasks or is_recent:
                 data.append({
-                    'month': month,
-                    'log': {
-                        'status': log.status,
-                        'completion_rate': log.completion_rate,
-                        'total_tasks': log.total_tasks,
-                        'completed_tasks': log.completed_tasks
-                    }
+                    'month': month_start.month,
+                    'log': values
                 })
     return Response(data)
 
+
+def _log_values(log):
+    return {
+        'status': log.status,
+        'completion_rate': log.completion_rate,
+        'total_tasks': log.total_tasks,
+        'completed_tasks': log.completed_tasks
+    }
+
+
+def _rollup_values(user, period_type, periods):
+    """
+    Values for each (period_start, period_end), oldest first.
+
+    Clean stored rollups are used directly; missing or dirty ones are computed
+    live (without writing) from one grouped query over their range.
+    """
+    stored = {
+        (log.period_start, log.period_end): log
+        for log in ProductivityLog.objects.filter(
+            user=user,
+            period_type=period_type,
+            period_start__range=(periods[0][0], periods[-1][0]),
+            is_dirty=False
+        )
+    }
+    live = compute_rollups(user, [period for period in periods if period not in stored])
+    return [
+        (period, _log_values(stored[period]) if period in stored else live[period])
+        for period in periods
+    ]
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_study_time(request):
+    """
+    Study timer totals by session type for ?start..?end (YYYY-MM-DD, both
+    optional; all time by default), read from the daily study rollup.
+    """
+    try:
+        start = _parse_date_param(request.GET.get('start'), None)
+        end = _parse_date_param(request.GET.get('end'), None)
+    except ValueError:
+        return Response({'error': 'start and end must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def compute():
+        totals = get_study_totals(request.user.id, start, end)
+        return {
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'totalStudySeconds': totals.get('Study', {}).get('seconds', 0),
+            'byType': totals,
+        }
+
+    data = get_or_compute(request.user.id, 'study_time', (start, end), compute, depends=('study',))
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def summary_cache_stats(request):
+    """Hit/miss counters of the per-user summary cache, per endpoint"""
+    return Response(get_cache_stats())
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def debug_today_tasks(request):
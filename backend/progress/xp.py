@@ -0,0 +1,152 @@
+"""
+Denormalized XP totals and level math.
+
+Each user's XP total lives in UserXP and is adjusted with atomic F()
+updates whenever XP is awarded or removed, so level reads never aggregate
+the XPLog or QuizSession tables. Level info is additionally served from the
+per-user summary cache, which XP writes invalidate.
+
+Task completion XP goes through award_xp_bulk: XPLog is unique per
+(user, task), so awarding is idempotent, and the ledger insert and the
+running total update commit together.
+"""
+
+from math import isqrt
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from tasks.models import XPLog
+from decks.models import QuizSession
+from .models import UserXP
+from .cache import get_or_compute, bump_user_cache_version
+
+
+# XP awarded for every completed quiz session
+XP_PER_QUIZ = 20
+
+# XP for completing a task on time, and for completing it after its due date
+XP_PER_TASK = 10
+XP_PER_OVERDUE_TASK = 5
+
+# Level L takes XP_PER_LEVEL * L XP to complete
+XP_PER_LEVEL = 100
+
+def xp_for_level(level):
+    """Cumulative XP needed to reach the start of a level (triangular numbers)"""
+    return XP_PER_LEVEL * level * (level - 1) // 2
+
+
+def level_for_xp(total_xp):
+    """
+    Closed-form level calculation.
+
+    Reaching level L needs 100 * L(L-1)/2 XP in total, so L is the largest
+    integer with (2L - 1)^2 <= 1 + 8 * xp / 100.
+
+    Returns:
+        dict: {'currentLevel', 'currentXP', 'xpToNextLevel'}
+    """
+    total_xp = max(0, total_xp)
+    level = (isqrt((XP_PER_LEVEL + 8 * total_xp) // XP_PER_LEVEL) + 1) // 2
+    return {
+        'currentLevel': level,
+        'currentXP': total_xp - xp_for_level(level),
+        'xpToNextLevel': XP_PER_LEVEL * level,
+    }
+
+
+def compute_total_xp(user_id):
+    """Full XP total from the source tables"""
+    task_xp = XPLog.objects.filter(user_id=user_id).aggregate(total=Sum('xp'))['total'] or 0
+    quiz_xp = QuizSession.objects.filter(user_id=user_id).count() * XP_PER_QUIZ
+    return task_xp + quiz_xp
+
+
+def recompute_xp(user_id):
+    """Rebuild the user's stored XP total from the source tables"""
+    with transaction.atomic():
+        state, created = UserXP.objects.select_for_update().get_or_create(user_id=user_id)
+        previous = state.total_xp
+        state.total_xp = compute_total_xp(user_id)
+        state.save()
+    if not created and state.total_xp != previous:
+        # Corrected drift: drop summaries computed from the old total
+        transaction.on_commit(lambda: bump_user_cache_version(user_id, 'xp'))
+    return state
+
+
+def add_xp(user_id, amount, seed=True):
+    """
+    Atomically adjust the user's stored XP total.
+
+    Users without a stored total yet are seeded from the source tables
+    (which already include the row being written) unless seed is False.
+    """
+    updated = UserXP.objects.filter(user_id=user_id).update(total_xp=F('total_xp') + amount)
+    if not updated and seed:
+        recompute_xp(user_id)
+
+
+def task_completion_xp(task, today):
+    """XP a task earns on completion: full on time, half once overdue"""
+    return XP_PER_OVERDUE_TASK if task.due_date < today else XP_PER_TASK
+
+
+def award_xp_bulk(user_id, awards, day=None):
+    """
+    Idempotently award task completion XP.
+
+    Tasks that already hold an award are skipped. The XPLog rows, the running
+    UserXP total and the day's XP in the daily series are written in one
+    transaction, so a burst of completions costs a handful of queries no
+    matter how many tasks it covers.
+
+    Args:
+        awards: {task_id: xp}
+        day: day the XP counts toward in the daily series (default today)
+
+    Returns:
+        dict: {task_id: xp} for the awards actually made
+    """
+    from .timeseries import bump_daily_stats
+
+    if not awards:
+        return {}
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        # Lock the running total first so concurrent awards for the user
+        # queue here and the check below sees every committed award
+        state = UserXP.objects.select_for_update().filter(user_id=user_id).first()
+        if state is None:
+            state = recompute_xp(user_id)
+        already_awarded = set(
+            XPLog.objects.filter(user_id=user_id, task_id__in=awards).values_list('task_id', flat=True)
+        )
+        new_awards = {task_id: xp for task_id, xp in awards.items() if task_id not in already_awarded}
+        # The (user, task) constraint backs up the check for writers outside this path
+        XPLog.objects.bulk_create(
+            [XPLog(user_id=user_id, task_id=task_id, xp=xp) for task_id, xp in new_awards.items()],
+            ignore_conflicts=True,
+        )
+        total = sum(new_awards.values())
+        if total:
+            # bulk_create skips the XP signals; apply their effects once
+            UserXP.objects.filter(pk=state.pk).update(total_xp=F('total_xp') + total, updated_at=timezone.now())
+            bump_daily_stats(user_id, day, xp=total)
+            transaction.on_commit(lambda: bump_user_cache_version(user_id, 'xp'))
+    return new_awards
+
+
+def get_total_xp(user_id):
+    """Stored XP total for the user, seeding it on first use"""
+    total_xp = UserXP.objects.filter(user_id=user_id).values_list('total_xp', flat=True).first()
+    if total_xp is None:
+        total_xp = recompute_xp(user_id).total_xp
+    return total_xp
+
+
+def get_user_level(user_id):
+    """Level info for the user, served from the summary cache when possible"""
+    return get_or_compute(user_id, 'level', (), lambda: level_for_xp(get_total_xp(user_id)), depends=('xp',))
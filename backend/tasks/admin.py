@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task, ProductivityLog, Subtask
+from .models import Task, ProductivityLog, Subtask, TaskActivity
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -20,4 +20,10 @@ class ProductivityLogAdmin(admin.ModelAdmin):
 class SubtaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'task', 'completed', 'created_at')
     list_filter = ('completed', 'created_at')
-    search_fields = ('title', 'task__title', 'task__user__username')
\ No newline at end of file
+    search_fields = ('title', 'task__title', 'task__user__username')
+
+@admin.register(TaskActivity)
+class TaskActivityAdmin(admin.ModelAdmin):
+    list_display = ('task', 'user', 'kind', 'minutes', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('note', 'task__title', 'user__username')
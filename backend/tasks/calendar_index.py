@@ -0,0 +1,48 @@
+"""
+Per-day task index for calendar views.
+
+Month and week views only need to know how many tasks fall on each day and
+which ones, not every task row with its subtasks. get_task_calendar answers
+that with one grouped query over the (user, due_date) index.
+"""
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, Q
+
+from .models import Task
+
+# Longest window one calendar request may cover
+MAX_CALENDAR_DAYS = 366
+
+
+def get_task_calendar(user_id, start, end, today):
+    """
+    Live tasks per due date between start and end (inclusive).
+
+    Returns:
+        list: one {'date', 'due', 'completed', 'overdue', 'task_ids'} dict per
+        day that has tasks, in date order; overdue counts the day's
+        unfinished tasks once the day is in the past
+    """
+    rows = (
+        Task.objects
+        .filter(user_id=user_id, due_date__range=(start, end))
+        .order_by()
+        .values('due_date')
+        .annotate(
+            due_count=Count('id'),
+            completed_count=Count('id', filter=Q(completed=True)),
+            task_ids=ArrayAgg('id', order_by=('id',)),
+        )
+        .order_by('due_date')
+    )
+    return [
+        {
+            'date': row['due_date'].isoformat(),
+            'due': row['due_count'],
+            'completed': row['completed_count'],
+            'overdue': row['due_count'] - row['completed_count'] if row['due_date'] < today else 0,
+            'task_ids': row['task_ids'],
+        }
+        for row in rows
+    ]
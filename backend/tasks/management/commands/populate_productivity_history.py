@@ -1,12 +1,102 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.contrib.auth.models import User
-from tasks.models import Task, ProductivityLog
-from datetime import datetime, timedelta
+from django.db import connections
+from tasks.models import ProductivityLog
+from tasks.productivity import (
+    get_due_date_counts, get_productivity_status, summarize_period, bulk_upsert_productivity_logs,
+)
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
 from calendar import monthrange
-import logging
+import json
+import os
+import time
+
+
+def _init_worker():
+    """Give each worker process its own Django setup and DB connections"""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _history_periods(today, days_back):
+    """The daily, weekly and monthly periods covered by a backfill of days_back days"""
+    periods = []
+
+    # Daily logs
+    for i in range(days_back):
+        day = today - timedelta(days=i)
+        periods.append(('daily', day, day))
+
+    # Weekly logs for the past weeks (Monday to Sunday)
+    current_week_start = today - timedelta(days=today.weekday())
+    for i in range(max(1, days_back // 7)):
+        week_start = current_week_start - timedelta(days=i * 7)
+        periods.append(('weekly', week_start, week_start + timedelta(days=6)))
+
+    # Monthly logs for the past months
+    year, month = today.year, today.month
+    for i in range(max(1, days_back // 30)):
+        periods.append(('monthly', date(year, month, 1), date(year, month, monthrange(year, month)[1])))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+
+    return periods
+
+
+def populate_users(user_ids, periods, overwrite=False, sync=True):
+    """
+    Build and upsert productivity history for a chunk of users.
+
+    Each user costs one grouped aggregation query over the whole range; the
+    chunk's logs are written with batched upserts.
+
+    Returns:
+        int: number of logs written
+    """
+    range_start = min(start for _, start, _ in periods)
+    range_end = max(end for _, _, end in periods)
+
+    existing = set()
+    if not overwrite:
+        existing = set(
+            ProductivityLog.objects.filter(
+                user_id__in=user_ids, period_start__gte=range_start, period_end__lte=range_end
+            ).values_list('user_id', 'period_type', 'period_start', 'period_end')
+        )
+
+    logs = []
+    for user in User.objects.filter(id__in=user_ids):
+        missing = [
+            (period_type, start, end) for period_type, start, end in periods
+            if (user.id, period_type, start, end) not in existing
+        ]
+        if not missing:
+            continue
+
+        daily_counts = get_due_date_counts(user, range_start, range_end)
+        for period_type, start, end in missing:
+            # A daily period summarizes to that day's own rate; weeks and months
+            # store the average of daily percentages like every other writer
+            values = summarize_period(daily_counts, start, end)
+            values['status'] = get_productivity_status(values['completion_rate'], values['total_tasks'])
+            logs.append(ProductivityLog(
+                user=user, period_type=period_type, period_start=start, period_end=end, **values
+            ))
+
+    return len(bulk_upsert_productivity_logs(logs, sync=sync))
+
+
+def _populate_chunk(user_ids, periods, overwrite, sync):
+    """Process pool entry point: returns the chunk's user ids with its log count"""
+    try:
+        return user_ids, populate_users(user_ids, periods, overwrite=overwrite, sync=sync)
+    finally:
+        connections.close_all()
 
-logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Populate historical productivity data for all users'
@@ -23,223 +113,124 @@ class Command(BaseCommand):
             type=str,
             help='Specific username to populate data for'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (default: 1, runs in-process)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Users per chunk; each chunk is one unit of work and checkpointing (default: 50)'
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Recompute logs that already exist instead of skipping them'
+        )
+        parser.add_argument(
+            '--no-sync',
+            action='store_true',
+            help='Skip the batched Supabase sync for written logs'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default='populate_productivity_history.checkpoint.json',
+            help='Checkpoint file used to resume an interrupted run'
+        )
+        parser.add_argument(
+            '--reset-checkpoint',
+            action='store_true',
+            help='Ignore any existing checkpoint and start from the beginning'
+        )
 
     def handle(self, *args, **options):
         days_back = options['days_back']
         specific_user = options.get('user')
-        
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+        checkpoint_path = options['checkpoint']
+
         self.stdout.write(f"Starting productivity history population for {days_back} days back...")
-        
+
         # Get users to process
+        users = User.objects.order_by('id')
         if specific_user:
-            try:
-                users = [User.objects.get(username=specific_user)]
-            except User.DoesNotExist:
+            users = users.filter(username=specific_user)
+            if not users.exists():
                 self.stdout.write(self.style.ERROR(f"User '{specific_user}' not found"))
                 return
-        else:
-            users = User.objects.all()
-        
-        total_logs_created = 0
-        
-        for user in users:
-            self.stdout.write(f"Processing user: {user.username}")
-            user_logs_created = self.populate_user_history(user, days_back)
-            total_logs_created += user_logs_created
-            self.stdout.write(f"  Created {user_logs_created} logs for {user.username}")
-        
-        self.stdout.write(
-            self.style.SUCCESS(f"Successfully created {total_logs_created} productivity logs")
-        )
+        user_ids = list(users.values_list('id', flat=True))
 
-    def populate_user_history(self, user, days_back):
         today = timezone.now().date()
-        logs_created = 0
-        
-        # Populate daily logs
-        for i in range(days_back):
-            target_date = today - timedelta(days=i)
-            logs_created += self.create_daily_log(user, target_date)
-        
-        # Populate weekly logs for the past weeks
-        weeks_back = max(1, days_back // 7)
-        for i in range(weeks_back):
-            week_start = today - timedelta(days=today.weekday() + (i * 7))
-            week_end = week_start + timedelta(days=6)
-            logs_created += self.create_weekly_log(user, week_start, week_end)
-        
-        # Populate monthly logs for the past months
-        months_back = max(1, days_back // 30)
-        for i in range(months_back):
-            if today.month - i <= 0:
-                year = today.year - 1
-                month = 12 + (today.month - i)
-            else:
-                year = today.year
-                month = today.month - i
-            
-            month_start = datetime(year, month, 1).date()
-            month_end = datetime(year, month, monthrange(year, month)[1]).date()
-            logs_created += self.create_monthly_log(user, month_start, month_end)
-        
-        return logs_created
-
-    def create_daily_log(self, user, date):
-        # Check if log already exists
-        existing_log = ProductivityLog.objects.filter(
-            user=user,
-            period_type='daily',
-            period_start=date,
-            period_end=date
-        ).first()
-        
-        if existing_log:
-            return 0
-        
-        # Calculate productivity for this day
-        tasks = Task.all_objects.filter(user=user, due_date=date)
-        non_deleted = tasks.filter(is_deleted=False)
-        deleted_completed = tasks.filter(is_deleted=True, was_completed_on_delete=True)
-        
-        total_tasks = non_deleted.count() + deleted_completed.count()
-        completed_tasks = non_deleted.filter(completed=True).count() + deleted_completed.count()
-        
-        if total_tasks == 0:
-            completion_rate = 0
-            status = 'No Tasks'
-        else:
-            completion_rate = (completed_tasks / total_tasks) * 100
-            if completion_rate >= 90:
-                status = 'Highly Productive'
-            elif completion_rate >= 70:
-                status = 'Productive'
-            elif completion_rate >= 40:
-                status = 'Moderately Productive'
-            else:
-                status = 'Low Productive'
-        
-        # Create the log
-        ProductivityLog.objects.create(
-            user=user,
-            period_type='daily',
-            period_start=date,
-            period_end=date,
-            completion_rate=completion_rate,
-            total_tasks=total_tasks,
-            completed_tasks=completed_tasks,
-            status=status
-        )
-        
-        return 1
-
-    def create_weekly_log(self, user, week_start, week_end):
-        # Check if log already exists
-        existing_log = ProductivityLog.objects.filter(
-            user=user,
-            period_type='weekly',
-            period_start=week_start,
-            period_end=week_end
-        ).first()
-        
-        if existing_log:
-            return 0
-        
-        # Calculate productivity for this week by aggregating daily data
-        total_tasks = 0
-        completed_tasks = 0
-        current_date = week_start
-        while current_date <= week_end:
-            daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-            daily_non_deleted = daily_tasks.filter(is_deleted=False)
-            daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-            
-            daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-            daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-            
-            total_tasks += daily_total
-            completed_tasks += daily_completed
-            current_date += timedelta(days=1)
-        
-        if total_tasks == 0:
-            completion_rate = 0
-            status = 'No Tasks'
-        else:
-            completion_rate = (completed_tasks / total_tasks) * 100
-            if completion_rate >= 90:
-                status = 'Highly Productive'
-            elif completion_rate >= 70:
-                status = 'Productive'
-            elif completion_rate >= 40:
-                status = 'Moderately Productive'
-            else:
-                status = 'Low Productive'
-        
-        # Create the log
-        ProductivityLog.objects.create(
-            user=user,
-            period_type='weekly',
-            period_start=week_start,
-            period_end=week_end,
-            completion_rate=completion_rate,
-            total_tasks=total_tasks,
-            completed_tasks=completed_tasks,
-            status=status
-        )
-        
-        return 1
-
-    def create_monthly_log(self, user, month_start, month_end):
-        # Check if log already exists
-        existing_log = ProductivityLog.objects.filter(
-            user=user,
-            period_type='monthly',
-            period_start=month_start,
-            period_end=month_end
-        ).first()
-        
-        if existing_log:
-            return 0
-        
-        # Calculate productivity for this month by aggregating daily data
-        total_tasks = 0
-        completed_tasks = 0
-        current_date = month_start
-        while current_date <= month_end:
-            daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-            daily_non_deleted = daily_tasks.filter(is_deleted=False)
-            daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-            
-            daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-            daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-            
-            total_tasks += daily_total
-            completed_tasks += daily_completed
-            current_date += timedelta(days=1)
-        
-        if total_tasks == 0:
-            completion_rate = 0
-            status = 'No Tasks'
+        periods = _history_periods(today, days_back)
+
+        # Resume from the checkpoint when it belongs to the same run
+        run_key = {
+            'today': today.isoformat(),
+            'days_back': days_back,
+            'overwrite': options['overwrite'],
+            'user': specific_user,
+        }
+        done_ids = set()
+        if not options['reset_checkpoint'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('run') == run_key:
+                done_ids = set(checkpoint.get('done_user_ids', []))
+                self.stdout.write(f"Resuming from checkpoint: {len(done_ids)} users already done")
+
+        pending_ids = [user_id for user_id in user_ids if user_id not in done_ids]
+        chunks = [pending_ids[i:i + chunk_size] for i in range(0, len(pending_ids), chunk_size)]
+        self.stdout.write(f"Processing {len(pending_ids)} users in {len(chunks)} chunks with {workers} worker(s)")
+
+        started = time.monotonic()
+        total_logs_written = 0
+        users_done = 0
+
+        def record(chunk_ids, logs_written):
+            nonlocal total_logs_written, users_done
+            total_logs_written += logs_written
+            users_done += len(chunk_ids)
+            done_ids.update(chunk_ids)
+            self._write_checkpoint(checkpoint_path, run_key, done_ids)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"  [{users_done}/{len(pending_ids)} users] {total_logs_written} logs written, "
+                f"{users_done / elapsed:.1f} users/s, {total_logs_written / elapsed:.0f} logs/s"
+            )
+
+        if workers == 1:
+            for chunk_ids in chunks:
+                record(chunk_ids, populate_users(chunk_ids, periods, options['overwrite'], not options['no_sync']))
         else:
-            completion_rate = (completed_tasks / total_tasks) * 100
-            if completion_rate >= 90:
-                status = 'Highly Productive'
-            elif completion_rate >= 70:
-                status = 'Productive'
-            elif completion_rate >= 40:
-                status = 'Moderately Productive'
-            else:
-                status = 'Low Productive'
-        
-        # Create the log
-        ProductivityLog.objects.create(
-            user=user,
-            period_type='monthly',
-            period_start=month_start,
-            period_end=month_end,
-            completion_rate=completion_rate,
-            total_tasks=total_tasks,
-            completed_tasks=completed_tasks,
-            status=status
+            # Forked workers must not share the parent's DB connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                futures = [
+                    executor.submit(_populate_chunk, chunk_ids, periods, options['overwrite'], not options['no_sync'])
+                    for chunk_ids in chunks
+                ]
+                for future in as_completed(futures):
+                    record(*future.result())
+
+        # A finished run doesn't need resuming
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully wrote {total_logs_written} productivity logs for {users_done} users in {elapsed:.1f}s"
+            )
         )
-        
-        return 1 
\ No newline at end of file
+
+    def _write_checkpoint(self, path, run_key, done_ids):
+        """Atomically persist progress so an interrupted run can resume"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'run': run_key, 'done_user_ids': sorted(done_ids)}, f)
+        os.replace(tmp_path, path)
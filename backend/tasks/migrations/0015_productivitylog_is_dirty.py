@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_studytimersession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productivitylog',
+            name='is_dirty',
+            field=models.BooleanField(default=False, help_text='Weekly/monthly rollup needs recomputing because a day in its range changed'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def remove_duplicate_task_awards(apps, schema_editor):
+    """Keep only the earliest XP award per (user, task) and take the extras off the XP totals"""
+    XPLog = apps.get_model('tasks', 'XPLog')
+    UserXP = apps.get_model('progress', 'UserXP')
+
+    duplicated = (
+        XPLog.objects.filter(task__isnull=False)
+        .values('user_id', 'task_id')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for group in duplicated:
+        awards = list(
+            XPLog.objects.filter(user_id=group['user_id'], task_id=group['task_id']).order_by('awarded_at', 'id')
+        )
+        extras = awards[1:]
+        XPLog.objects.filter(id__in=[award.id for award in extras]).delete()
+        UserXP.objects.filter(user_id=group['user_id']).update(
+            total_xp=F('total_xp') - sum(award.xp for award in extras)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0018_task_search'),
+        ('progress', '0004_userxp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_task_awards, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='xplog',
+            constraint=models.UniqueConstraint(condition=models.Q(('task__isnull', False)), fields=('user', 'task'), name='xplog_one_award_per_task'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0019_xplog_one_award_per_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productivitylog',
+            name='dirty_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped every time the rollup is marked dirty'),
+        ),
+    ]
@@ -1,11 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils import timezone
+from django.db.models.functions import TruncDate, Upper
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .supabase_sync import sync_subtask_to_supabase, update_subtask_in_supabase, sync_productivity_log_to_supabase, update_productivity_log_in_supabase, sync_task_to_supabase, update_task_in_supabase, delete_task_from_supabase, sync_study_timer_session_to_supabase, update_study_timer_session_in_supabase
 
-class TaskManager(models.Manager):
+class AllTasksManager(models.Manager):
+    def get_queryset(self):
+        # The search vector is only used in WHERE clauses; don't load it with every row
+        return super().get_queryset().defer('search_vector')
+
+class TaskManager(AllTasksManager):
     def get_queryset(self):
         return super().get_queryset().filter(is_deleted=False)
 
@@ -53,15 +61,49 @@ class Task(models.Model):
     deleted_at = models.DateTimeField(null=True, blank=True)
     was_completed_on_delete = models.BooleanField(default=False)
 
+    # Full-text search document, maintained by Postgres (title weighted above description)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('title', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
     objects = TaskManager()  # Default manager filters out deleted
-    all_objects = models.Manager()  # To access all tasks including deleted
+    all_objects = AllTasksManager()  # To access all tasks including deleted
 
     class Meta:
         ordering = ['due_date', 'priority']
+        indexes = [
+            # Per-day aggregates over all rows (incl. soft-deleted completions)
+            models.Index(fields=['user', 'due_date'], name='task_user_due_idx'),
+            # Task list and keyset pagination over live tasks
+            models.Index(fields=['user', 'due_date', 'priority', 'id'], name='task_live_list_idx',
+                         condition=models.Q(is_deleted=False)),
+            # Completed/pending filters and counts over live tasks
+            models.Index(fields=['user', 'completed'], name='task_live_completed_idx',
+                         condition=models.Q(is_deleted=False)),
+            # Buckets by completion day (completed_at::date)
+            models.Index(models.F('user'), TruncDate('completed_at'), name='task_user_completed_day_idx'),
+            # Delta sync (?updated_since=)
+            models.Index(fields=['user', 'updated_at', 'id'], name='task_user_updated_idx'),
+            # Full-text ?search=
+            GinIndex(fields=['search_vector'], name='task_search_vector_idx'),
+            # ?task_category= substring matches (task_category__icontains)
+            GinIndex(OpClass(Upper('task_category'), name='gin_trgm_ops'), name='task_category_trgm_idx'),
+        ]
         
     def __str__(self):
         return self.title 
 
+    # Columns touched by the activity endpoints (timer ticks, activity notes)
+    ACTIVITY_FIELDS = frozenset({'time_spent_minutes', 'activity_notes', 'has_activity', 'last_activity_at', 'updated_at'})
+
+    @classmethod
+    def is_activity_save(cls, update_fields):
+        """Whether a save only touched activity columns (no due date/completion change)"""
+        return bool(update_fields) and set(update_fields) <= cls.ACTIVITY_FIELDS
+
     def can_be_completed(self):
         """Check if the task can be marked as complete based on productivity criteria"""
         # For now, allow completion without evidence to test the system
@@ -96,6 +138,11 @@ class Task(models.Model):
         self.deleted_at = timezone.now()
         self.save()
 
+        # A completed task leaving its day can break the user's streak
+        if self.completed:
+            from progress.streaks import update_streak_for_day
+            update_streak_for_day(self.user, self.due_date)
+
     @staticmethod
     def get_weekly_productivity_status(user):
         from django.utils import timezone
@@ -105,21 +152,11 @@ class Task(models.Model):
         start_of_week = today - timedelta(days=today.weekday())  # Monday
         end_of_week = start_of_week + timedelta(days=6)          # Sunday
 
-        # Calculate productivity for this week by aggregating daily data
-        total_tasks = 0
-        completed_tasks = 0
-        current_date = start_of_week
-        while current_date <= end_of_week:
-            daily_tasks = Task.all_objects.filter(user=user, due_date=current_date)
-            daily_non_deleted = daily_tasks.filter(is_deleted=False)
-            daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
-            
-            daily_total = daily_non_deleted.count() + daily_deleted_completed.count()
-            daily_completed = daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count()
-            
-            total_tasks += daily_total
-            completed_tasks += daily_completed
-            current_date += timedelta(days=1)
+        # Calculate productivity for this week from one grouped query
+        from .productivity import get_due_date_counts, get_productivity_status
+        daily_counts = get_due_date_counts(user, start_of_week, end_of_week)
+        total_tasks = sum(day['total'] for day in daily_counts.values())
+        completed_tasks = sum(day['completed'] for day in daily_counts.values())
 
         if total_tasks == 0:
             return {
@@ -132,15 +169,8 @@ class Task(models.Model):
         # Calculate completion rate based on actual task completion
         completion_rate = completed_tasks / total_tasks
         completion_pct = completion_rate * 100
-        if completion_pct >= 90:
-            status = 'Highly Productive'
-        elif completion_pct >= 70:
-            status = 'Productive'
-        elif completion_pct >= 40:
-            status = 'Moderately Productive'
-        else:
-            status = 'Low Productive'
-            
+        status = get_productivity_status(completion_pct)
+
         return {
             'status': status,
             'completion_rate': round(completion_pct, 2),
@@ -161,6 +191,28 @@ class Subtask(models.Model):
     def __str__(self):
         return f"{self.title} (Subtask of {self.task_id})"
 
+class TaskActivity(models.Model):
+    """Append-only log of work done on a task (time entries and activity notes)"""
+    KIND_CHOICES = [
+        ('time', 'Time'),
+        ('note', 'Note'),
+    ]
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='activities')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_activities')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    minutes = models.IntegerField(default=0)
+    note = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['task', 'created_at'], name='taskactivity_task_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} on task {self.task_id} at {self.created_at}"
+
 class XPLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='xp_logs')
     task = models.ForeignKey('Task', on_delete=models.SET_NULL, null=True, blank=True, related_name='xp_logs')
@@ -169,6 +221,11 @@ class XPLog(models.Model):
 
     class Meta:
         ordering = ['-awarded_at'] 
+        constraints = [
+            # A task earns completion XP once (see progress.xp.award_xp_bulk)
+            models.UniqueConstraint(fields=['user', 'task'], condition=models.Q(task__isnull=False),
+                                    name='xplog_one_award_per_task'),
+        ]
 
 class ProductivityLog(models.Model):
     PERIOD_CHOICES = [
@@ -185,6 +242,8 @@ class ProductivityLog(models.Model):
     completed_tasks = models.IntegerField()
     status = models.CharField(max_length=32)
     logged_at = models.DateTimeField(auto_now_add=True)
+    is_dirty = models.BooleanField(default=False, help_text="Weekly/monthly rollup needs recomputing because a day in its range changed")
+    dirty_version = models.PositiveIntegerField(default=0, help_text="Bumped every time the rollup is marked dirty")
 
     class Meta:
         unique_together = ('user', 'period_type', 'period_start', 'period_end')
@@ -233,6 +292,12 @@ def sync_subtask_on_save(sender, instance, created, **kwargs):
     except Exception as e:
         print(f"❌ Error in subtask sync signal: {e}")
 
+@receiver(post_save, sender=Subtask)
+@receiver(post_delete, sender=Subtask)
+def touch_task_on_subtask_change(sender, instance, **kwargs):
+    """Subtasks are part of the task payload, so bump the task's updated_at for delta sync"""
+    Task.all_objects.filter(pk=instance.task_id).update(updated_at=timezone.now())
+
 @receiver(post_delete, sender=Subtask)
 def delete_subtask_from_supabase(sender, instance, **kwargs):
     """Delete subtask from Supabase when deleted from Django"""
@@ -274,6 +339,13 @@ def sync_productivity_log_on_save(sender, instance, created, **kwargs):
     except Exception as e:
         print(f"❌ Error in productivity log sync signal: {e}")
 
+@receiver(post_save, sender=ProductivityLog)
+def mark_rollups_dirty_on_daily_log_save(sender, instance, **kwargs):
+    """A changed daily log invalidates the weekly/monthly rollups covering it"""
+    if instance.period_type == 'daily':
+        from .productivity import mark_rollups_dirty
+        mark_rollups_dirty(instance.user_id, [instance.period_start])
+
 @receiver(post_delete, sender=ProductivityLog)
 def delete_productivity_log_from_supabase(sender, instance, **kwargs):
     """Delete productivity log from Supabase when deleted from Django"""
@@ -311,10 +383,20 @@ def sync_task_on_save(sender, instance, created, **kwargs):
         if created:
             sync_task_to_supabase(instance)
         else:
-            update_task_in_supabase(instance)
+            # Partial saves only PATCH the columns they wrote
+            update_task_in_supabase(instance, fields=kwargs.get('update_fields'))
     except Exception as e:
         print(f"Error in task sync signal: {e}")
 
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def mark_rollups_dirty_on_task_change(sender, instance, **kwargs):
+    """Task changes invalidate the weekly/monthly rollups covering its due date"""
+    if Task.is_activity_save(kwargs.get('update_fields')):
+        return
+    from .productivity import mark_rollups_dirty
+    mark_rollups_dirty(instance.user_id, [instance.due_date])
+
 @receiver(post_delete, sender=Task)
 def delete_task_from_supabase_signal(sender, instance, **kwargs):
     """Delete task from Supabase when deleted from Django"""
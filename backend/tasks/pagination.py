@@ -0,0 +1,175 @@
+"""
+Keyset (cursor) and time-window pagination for task app listings.
+
+Pages are addressed by the sort key of the last row served (or by a time
+window) rather than by an offset, so fetching any page is a single indexed
+range scan and rows inserted or removed between requests never shift later
+pages.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset pagination over the view's ``keyset_fields``.
+
+    Requests without ?cursor or ?page_size get the full, unpaginated list
+    (so existing clients keep working) unless the view's
+    ``force_pagination(request)`` says otherwise. Paginated responses look like
+    ``{"next": <url or null>, "results": [...]}``; follow ``next`` until it is
+    null.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+
+    def get_keyset_fields(self, view):
+        return list(getattr(view, 'keyset_fields', ['id']))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be an integer.'})
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor, model, fields):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, values)]
+        except Exception:
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+    def after(self, fields, values):
+        """Rows strictly after the given key: (a > x) or (a = x and b > y) or ..."""
+        condition = Q()
+        for i, name in enumerate(fields):
+            term = Q(**{f'{name}__gt': values[i]})
+            for prior_name, prior_value in zip(fields[:i], values[:i]):
+                term &= Q(**{prior_name: prior_value})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        force = getattr(view, 'force_pagination', lambda request: False)(request)
+        if not force and self.cursor_query_param not in request.query_params \
+                and self.page_size_query_param not in request.query_params:
+            return None
+
+        self.request = request
+        fields = self.get_keyset_fields(view)
+        queryset = queryset.order_by(*fields)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(fields, self.decode_cursor(cursor, queryset.model, fields)))
+
+        page_size = self.get_page_size(request)
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        page = rows[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor([getattr(last, name) for name in fields])
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class TimeWindowPagination(BasePagination):
+    """
+    Opt-in pagination over fixed time windows of ``time_field``, newest first.
+
+    A page holds every row with ``before - window_days <= time < before``
+    (``before`` defaults to now). Requests without ?before or ?window_days get
+    the full list, as before. Paginated responses look like
+    ``{"window_start", "window_end", "next": <url or null>, "results": [...]}``;
+    ``next`` moves one window back and is null once no older rows exist.
+    """
+    before_query_param = 'before'
+    window_query_param = 'window_days'
+    window_days = 30
+    max_window_days = 366
+
+    def get_time_field(self, view):
+        return getattr(view, 'time_window_field', 'created_at')
+
+    def get_window_days(self, request):
+        try:
+            days = int(request.query_params.get(self.window_query_param, self.window_days))
+        except ValueError:
+            raise ValidationError({self.window_query_param: 'Must be an integer.'})
+        return max(1, min(days, self.max_window_days))
+
+    def get_before(self, request):
+        value = request.query_params.get(self.before_query_param)
+        if not value:
+            return timezone.now()
+        before = parse_datetime(value)
+        if before is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValidationError({self.before_query_param: 'Must be an ISO 8601 date or datetime.'})
+            before = datetime.combine(day, time.min)
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before)
+        return before
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.before_query_param not in request.query_params \
+                and self.window_query_param not in request.query_params:
+            return None
+
+        self.request = request
+        field = self.get_time_field(view)
+        self.window_end = self.get_before(request)
+        self.window_start = self.window_end - timedelta(days=self.get_window_days(request))
+
+        page = list(queryset.filter(**{f'{field}__gte': self.window_start, f'{field}__lt': self.window_end}))
+        self.has_next = queryset.filter(**{f'{field}__lt': self.window_start}).exists()
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.before_query_param, self.window_start.isoformat()
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('window_start', self.window_start.isoformat()),
+            ('window_end', self.window_end.isoformat()),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,351 @@
+"""
+Shared productivity aggregation for progress endpoints and commands.
+
+Every per-day figure used by the progress views is derived from two grouped
+queries over ``Task.all_objects`` instead of several ``count()`` queries per
+day, so a weekly, monthly or yearly range costs a constant number of queries.
+"""
+
+from array import array
+from datetime import timedelta
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+
+from .models import Task, ProductivityLog
+
+
+ROLLUP_PERIOD_TYPES = ('weekly', 'monthly')
+
+# Rows that still count toward productivity: live tasks plus tasks that were
+# completed before being soft-deleted.
+COUNTED_TASKS = Q(is_deleted=False) | Q(is_deleted=True, was_completed_on_delete=True)
+COMPLETED_TASKS = Q(is_deleted=False, completed=True) | Q(is_deleted=True, was_completed_on_delete=True)
+
+
+def iter_days(start, end):
+    """Yield every date from start to end (inclusive)"""
+    current = start
+    while current <= end:
+        yield current
+        current += timedelta(days=1)
+
+
+def get_productivity_status(completion_rate, total_tasks=None):
+    """Map a completion percentage to its productivity status label"""
+    if total_tasks == 0:
+        return 'No Tasks'
+    if completion_rate >= 90:
+        return 'Highly Productive'
+    if completion_rate >= 70:
+        return 'Productive'
+    if completion_rate >= 40:
+        return 'Moderately Productive'
+    return 'Low Productive'
+
+
+def get_due_date_counts(user, start, end):
+    """
+    Per-day task totals bucketed by due_date, in one grouped query.
+
+    Returns:
+        dict: {date: {'total': int, 'completed': int, 'pending': int}} for every
+        day in the range (days without tasks are zero-filled).
+    """
+    counts = {day: {'total': 0, 'completed': 0, 'pending': 0} for day in iter_days(start, end)}
+    rows = (
+        Task.all_objects
+        .filter(COUNTED_TASKS, user=user, due_date__range=(start, end))
+        .order_by()
+        .values('due_date')
+        .annotate(
+            total_count=Count('id'),
+            completed_count=Count('id', filter=COMPLETED_TASKS),
+            pending_count=Count('id', filter=Q(is_deleted=False, completed=False)),
+        )
+    )
+    for row in rows:
+        counts[row['due_date']] = {
+            'total': row['total_count'],
+            'completed': row['completed_count'],
+            'pending': row['pending_count'],
+        }
+    return counts
+
+
+def get_due_date_arrays(user, start, end):
+    """
+    Dense per-day totals bucketed by due_date, in one grouped query.
+
+    Index i of each array holds the counts for ``start + i days``, which keeps
+    long windows (e.g. a 365-day heatmap) compact and cheap to scan.
+
+    Returns:
+        tuple: (totals, completed) as ``array('I')`` of length (end - start) + 1
+    """
+    num_days = (end - start).days + 1
+    totals = array('I', [0]) * num_days
+    completed = array('I', [0]) * num_days
+    rows = (
+        Task.all_objects
+        .filter(COUNTED_TASKS, user=user, due_date__range=(start, end))
+        .order_by()
+        .values('due_date')
+        .annotate(
+            total_count=Count('id'),
+            completed_count=Count('id', filter=COMPLETED_TASKS),
+        )
+        .values_list('due_date', 'total_count', 'completed_count')
+    )
+    for due_date, total_count, completed_count in rows:
+        index = (due_date - start).days
+        totals[index] = total_count
+        completed[index] = completed_count
+    return totals, completed
+
+
+def get_on_time_counts(user, days):
+    """
+    Per-day totals for tasks due on the given days, counting only on-time completions.
+
+    A completion counts when it happened on or before the due date (or has no
+    timestamp, for legacy rows); late completions don't count toward that
+    day's productivity. Soft-deleted tasks are excluded. One grouped query
+    covers every day.
+
+    Returns:
+        dict: {date: {'total': int, 'completed': int}} for every given day.
+    """
+    days = set(d for d in days if d is not None)
+    counts = {day: {'total': 0, 'completed': 0} for day in days}
+    if not days:
+        return counts
+    completed_on_time = Q(completed=True) & (
+        Q(completed_at__isnull=True) | Q(completed_at__date__lte=F('due_date'))
+    )
+    rows = (
+        Task.objects
+        .filter(user=user, due_date__in=days)
+        .order_by()
+        .values_list('due_date')
+        .annotate(
+            total_count=Count('id'),
+            completed_count=Count('id', filter=completed_on_time),
+        )
+    )
+    for due_date, total_count, completed_count in rows:
+        counts[due_date] = {'total': total_count, 'completed': completed_count}
+    return counts
+
+
+def update_daily_productivity(user, days, sync=True):
+    """
+    Recompute and persist the daily logs for many days at once.
+
+    Counts come from get_on_time_counts (one query) and every log is written
+    with a single batched upsert.
+
+    Returns:
+        list: the written ProductivityLog instances
+    """
+    logs = []
+    for day, day_counts in sorted(get_on_time_counts(user, days).items()):
+        total_tasks = day_counts['total']
+        completed_tasks = day_counts['completed']
+        completion_rate = completed_tasks / total_tasks * 100 if total_tasks > 0 else 0
+        logs.append(ProductivityLog(
+            user=user,
+            period_type='daily',
+            period_start=day,
+            period_end=day,
+            completion_rate=completion_rate,
+            total_tasks=total_tasks,
+            completed_tasks=completed_tasks,
+            status=get_productivity_status(completion_rate, total_tasks),
+        ))
+    return bulk_upsert_productivity_logs(logs, sync=sync)
+
+
+def get_completion_date_counts(user, start, end):
+    """
+    Per-day completed-task counts bucketed by completed_at date, in one grouped query.
+
+    Returns:
+        dict: {date: int} for every day in the range (zero-filled).
+    """
+    counts = {day: 0 for day in iter_days(start, end)}
+    rows = (
+        Task.all_objects
+        .filter(COMPLETED_TASKS, user=user, completed_at__date__range=(start, end))
+        .annotate(day=TruncDate('completed_at'))
+        .order_by()
+        .values('day')
+        .annotate(completed_count=Count('id'))
+    )
+    for row in rows:
+        counts[row['day']] = row['completed_count']
+    return counts
+
+
+def get_work_date_counts(user, start, end):
+    """
+    Per-day totals by when work actually happened (used by the daily view).
+
+    Completed tasks are counted on the day they were completed and pending
+    tasks on the day they are due.
+
+    Returns:
+        dict: {date: {'total': int, 'completed': int}} for every day in the range.
+    """
+    due_counts = get_due_date_counts(user, start, end)
+    completion_counts = get_completion_date_counts(user, start, end)
+    return {
+        day: {
+            'total': completion_counts[day] + due_counts[day]['pending'],
+            'completed': completion_counts[day],
+        }
+        for day in iter_days(start, end)
+    }
+
+
+def summarize_period(daily_counts, start, end):
+    """
+    Aggregate per-day counts into a single period summary.
+
+    The period completion rate is the average of daily percentages (days
+    without tasks count as 0%), matching the weekly/monthly progress views.
+
+    Returns:
+        dict: {'completion_rate', 'total_tasks', 'completed_tasks'}
+    """
+    daily_percentages = []
+    total_tasks = 0
+    completed_tasks = 0
+    for day in iter_days(start, end):
+        day_counts = daily_counts[day]
+        if day_counts['total'] > 0:
+            daily_percentages.append(day_counts['completed'] / day_counts['total'] * 100)
+        else:
+            daily_percentages.append(0)
+        total_tasks += day_counts['total']
+        completed_tasks += day_counts['completed']
+
+    completion_rate = sum(daily_percentages) / len(daily_percentages) if daily_percentages else 0
+    return {
+        'completion_rate': completion_rate,
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+    }
+
+
+def mark_rollups_dirty(user_id, days, exclude_ids=()):
+    """
+    Flag the user's weekly/monthly logs whose range covers any of the days.
+
+    Uses a single UPDATE (no per-row saves, so no Supabase sync); dirty rows
+    are recomputed live on read and persisted by refresh_productivity_rollups.
+    dirty_version is bumped even on rows that are already dirty, so a refresh
+    can tell whether a row changed again after it read it.
+    Consecutive days are collapsed into ranges to keep the WHERE clause small.
+    """
+    covering = Q()
+    range_start = range_end = None
+    for day in sorted(set(d for d in days if d is not None)):
+        if range_end is not None and day == range_end + timedelta(days=1):
+            range_end = day
+            continue
+        if range_start is not None:
+            covering |= Q(period_start__lte=range_end, period_end__gte=range_start)
+        range_start = range_end = day
+    if range_start is None:
+        return 0
+    covering |= Q(period_start__lte=range_end, period_end__gte=range_start)
+
+    return ProductivityLog.objects.filter(
+        covering, user_id=user_id, period_type__in=ROLLUP_PERIOD_TYPES
+    ).exclude(id__in=exclude_ids).update(is_dirty=True, dirty_version=F('dirty_version') + 1)
+
+
+def compute_rollups(user, periods):
+    """
+    Compute weekly/monthly rollup values for a list of (period_start, period_end).
+
+    All periods are served from one grouped query spanning their combined range.
+
+    Returns:
+        dict: {(period_start, period_end): {'completion_rate', 'total_tasks',
+        'completed_tasks', 'status'}}
+    """
+    if not periods:
+        return {}
+    range_start = min(start for start, _ in periods)
+    range_end = max(end for _, end in periods)
+    daily_counts = get_due_date_counts(user, range_start, range_end)
+    rollups = {}
+    for start, end in periods:
+        summary = summarize_period(daily_counts, start, end)
+        summary['status'] = get_productivity_status(summary['completion_rate'], summary['total_tasks'])
+        rollups[(start, end)] = summary
+    return rollups
+
+
+PRODUCTIVITY_LOG_KEY_FIELDS = ['user', 'period_type', 'period_start', 'period_end']
+PRODUCTIVITY_LOG_VALUE_FIELDS = ['completion_rate', 'total_tasks', 'completed_tasks', 'status', 'is_dirty']
+
+
+def bulk_upsert_productivity_logs(logs, batch_size=500, sync=True, clear_dirty=True):
+    """
+    Insert or update many ProductivityLogs with one statement per batch.
+
+    Rows are matched on the (user, period_type, period_start, period_end)
+    unique_together key; existing rows get their values overwritten and
+    keep their original logged_at. Because bulk_create skips the post_save
+    signals, Supabase is synced with one batched upsert and weekly/monthly
+    rollups covering written daily rows are marked dirty here.
+
+    Args:
+        logs: unsaved ProductivityLog instances
+        batch_size: rows per INSERT ... ON CONFLICT statement
+        sync: whether to push the written rows to Supabase
+        clear_dirty: whether written rollups are marked clean; callers that
+            must not lose a concurrent dirty mark clear it themselves
+
+    Returns:
+        list: the written ProductivityLog instances (with ids)
+    """
+    from .supabase_sync import bulk_upsert_productivity_logs_in_supabase
+
+    # The last write for a key wins, as it would with sequential saves
+    unique_logs = {}
+    for log in logs:
+        if clear_dirty and log.period_type in ROLLUP_PERIOD_TYPES:
+            log.is_dirty = False
+        unique_logs[(log.user_id, log.period_type, log.period_start, log.period_end)] = log
+    logs = list(unique_logs.values())
+    if not logs:
+        return []
+
+    written = ProductivityLog.objects.bulk_create(
+        logs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=PRODUCTIVITY_LOG_KEY_FIELDS,
+        update_fields=PRODUCTIVITY_LOG_VALUE_FIELDS if clear_dirty else [
+            field for field in PRODUCTIVITY_LOG_VALUE_FIELDS if field != 'is_dirty'
+        ],
+    )
+
+    # Rollups written in this same call are already current
+    daily_days_by_user = {}
+    rollup_ids_by_user = {}
+    for log in written:
+        if log.period_type == 'daily':
+            daily_days_by_user.setdefault(log.user_id, []).append(log.period_start)
+        else:
+            rollup_ids_by_user.setdefault(log.user_id, []).append(log.id)
+    for user_id, days in daily_days_by_user.items():
+        mark_rollups_dirty(user_id, days, exclude_ids=rollup_ids_by_user.get(user_id, ()))
+
+    if sync:
+        bulk_upsert_productivity_logs_in_supabase(written, batch_size=batch_size)
+    return written
@@ -0,0 +1,31 @@
+"""
+Full-text search over tasks.
+
+Task.search_vector is a generated tsvector column (title weighted above
+description) with a GIN index, so ?search= is an indexed ``@@`` match instead
+of a leading-wildcard ILIKE scan over the user's tasks.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery
+
+SEARCH_CONFIG = 'english'
+
+
+def task_search_query(text):
+    """
+    tsquery matching tasks that contain every word of the search text.
+
+    The last word is treated as a prefix so results keep up while the user is
+    still typing it; punctuation is dropped so user input can't produce
+    invalid tsquery syntax.
+
+    Returns:
+        SearchQuery or None when the text has no searchable words
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    terms[-1] += ':*'
+    return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
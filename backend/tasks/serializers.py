@@ -1,5 +1,16 @@
 from rest_framework import serializers
-from .models import Task, Subtask, StudyTimerSession
+from .models import Task, TaskActivity, Subtask, StudyTimerSession
+
+
+def get_requested_fields(request):
+    """Field names from an opt-in ?fields=a,b sparse fieldset on GET requests (None if absent)"""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
 
 class TaskSerializer(serializers.ModelSerializer):
     subtasks = serializers.SerializerMethodField()
@@ -14,7 +25,19 @@ class TaskSerializer(serializers.ModelSerializer):
                  'is_deleted', 'was_completed_on_delete', 'can_be_completed']
         read_only_fields = ['created_at', 'updated_at'] 
 
+    # Large text columns that list views can leave out with ?fields=
+    HEAVY_FIELDS = ['description', 'activity_notes', 'evidence_description']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldset: keep only the requested fields (id is always included)
+        requested = get_requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested - {'id'}:
+                self.fields.pop(name)
+
     def get_subtasks(self, obj):
+        # Uses the subtasks prefetched by TaskViewSet instead of a query per task
         return SubtaskSerializer(obj.subtasks.all(), many=True).data
 
     def get_can_be_completed(self, obj):
@@ -28,6 +51,13 @@ class SubtaskSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class TaskActivitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskActivity
+        fields = ['id', 'task', 'kind', 'minutes', 'note', 'created_at']
+        read_only_fields = fields
+
+
 class StudyTimerSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudyTimerSession
@@ -4,7 +4,6 @@ Supabase sync functions for subtasks and productivity logs
 """
 
 import requests
-from datetime import datetime
 from django.conf import settings
 
 # Supabase configuration
@@ -188,12 +187,14 @@ def sync_task_to_supabase(task):
         print(f"Error syncing task '{task.title}' to Supabase: {e}")
         return False
 
-def update_task_in_supabase(task):
+def update_task_in_supabase(task, fields=None):
     """
     Update an existing task in Supabase
     
     Args:
         task: Django Task instance
+        fields: optional model field names written by a partial save; only
+            those columns (plus updated_at) are sent
     
     Returns:
         bool: True if successful, False otherwise
@@ -201,15 +202,14 @@ def update_task_in_supabase(task):
     try:
         print(f"[update_task_in_supabase] STARTING - Task: {task.title} (ID: {task.id})")
         
-        # Get Supabase user ID
-        supabase_user_id = get_user_supabase_id(task.user)
-        if not supabase_user_id:
-            print(f"Cannot update task - user '{task.user.username}' not found in Supabase")
-            return False
+        if fields:
+            # F() increments are resolved in SQL; read back the stored values
+            expressions = [name for name in fields if hasattr(getattr(task, name, None), 'resolve_expression')]
+            if expressions:
+                task.refresh_from_db(fields=expressions)
         
         # Prepare data for Supabase
         data = {
-            'user_id': supabase_user_id,
             'title': task.title,
             'description': task.description or '',
             'due_date': task.due_date.isoformat() if hasattr(task.due_date, 'isoformat') else str(task.due_date),
@@ -222,6 +222,17 @@ def update_task_in_supabase(task):
             'updated_at': task.updated_at.isoformat() if hasattr(task.updated_at, 'isoformat') else str(task.updated_at)
         }
         
+        if fields:
+            # Partial save: send only the columns it wrote
+            data = {key: value for key, value in data.items() if key in fields or key == 'updated_at'}
+        else:
+            # Get Supabase user ID
+            supabase_user_id = get_user_supabase_id(task.user)
+            if not supabase_user_id:
+                print(f"Cannot update task - user '{task.user.username}' not found in Supabase")
+                return False
+            data['user_id'] = supabase_user_id
+        
         print(f"[update_task_in_supabase] Sending data to Supabase: {data}")
         
         # Update in Supabase
@@ -285,6 +296,82 @@ def delete_task_from_supabase(task):
         print(f"Error deleting task '{task.title}' from Supabase: {e}")
         return False
 
+def _bulk_upsert(table, instances, build_row, batch_size=500):
+    """
+    Upsert many rows into a Supabase table with one request per batch
+
+    Used by bulk writes, which bypass the per-row post_save sync signals.
+    
+    Args:
+        table: Supabase table name
+        instances: saved Django instances with a user
+        build_row: returns the Supabase row for an instance, without user_id
+        batch_size: rows per request
+    
+    Returns:
+        bool: True if every batch succeeded, False otherwise
+    """
+    label = table.replace('_', ' ')
+    try:
+        # Resolve each user's Supabase ID once per call, not once per row
+        supabase_user_ids = {}
+        rows = []
+        for instance in instances:
+            if instance.user_id not in supabase_user_ids:
+                supabase_user_ids[instance.user_id] = get_user_supabase_id(instance.user)
+            supabase_user_id = supabase_user_ids[instance.user_id]
+            if not supabase_user_id:
+                continue
+            rows.append({**build_row(instance), 'user_id': supabase_user_id})
+        
+        skipped_users = [user_id for user_id, supabase_id in supabase_user_ids.items() if not supabase_id]
+        if skipped_users:
+            print(f"⚠️  Skipping {label} for users not found in Supabase: {skipped_users}")
+        
+        headers = get_supabase_headers()
+        headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+        
+        success = True
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            response = requests.post(
+                f"{SUPABASE_URL}/rest/v1/{table}",
+                headers=headers,
+                json=batch
+            )
+            if response.status_code in (200, 201, 204):
+                print(f"✅ Upserted {len(batch)} {label} in Supabase")
+            else:
+                print(f"❌ Failed to upsert {len(batch)} {label} in Supabase: {response.status_code} - {response.text}")
+                success = False
+        return success
+            
+    except Exception as e:
+        print(f"❌ Error bulk upserting {label} in Supabase: {e}")
+        return False
+
+
+def _task_row(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description or '',
+        'due_date': task.due_date.isoformat(),
+        'priority': task.priority,
+        'task_category': task.task_category,
+        'completed': task.completed,
+        'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+        'time_spent_minutes': task.time_spent_minutes or 0,
+        'is_deleted': task.is_deleted,
+        'created_at': task.created_at.isoformat(),
+        'updated_at': task.updated_at.isoformat()
+    }
+
+
+def bulk_upsert_tasks_in_supabase(tasks, batch_size=500):
+    """Upsert many tasks into Supabase; used by bulk task operations"""
+    return _bulk_upsert('tasks', tasks, _task_row, batch_size)
+
 def sync_productivity_log_to_supabase(productivity_log):
     """
     Sync a Django ProductivityLog to Supabase
@@ -390,6 +477,24 @@ def update_productivity_log_in_supabase(productivity_log):
         print(f"❌ Error updating productivity log in Supabase: {e}")
         return False
 
+def _productivity_log_row(productivity_log):
+    return {
+        'id': productivity_log.id,
+        'period_type': productivity_log.period_type,
+        'period_start': productivity_log.period_start.isoformat(),
+        'period_end': productivity_log.period_end.isoformat(),
+        'completion_rate': float(productivity_log.completion_rate),
+        'total_tasks': productivity_log.total_tasks,
+        'completed_tasks': productivity_log.completed_tasks,
+        'status': productivity_log.status,
+        'logged_at': productivity_log.logged_at.isoformat()
+    }
+
+
+def bulk_upsert_productivity_logs_in_supabase(productivity_logs, batch_size=500):
+    """Upsert many ProductivityLogs (saved, with ids) into Supabase; used by bulk writes"""
+    return _bulk_upsert('productivity_logs', productivity_logs, _productivity_log_row, batch_size)
+
 def sync_study_timer_session_to_supabase(session):
     """
     Sync a Django StudyTimerSession to Supabase
@@ -488,4 +593,20 @@ def update_study_timer_session_in_supabase(session):
             
     except Exception as e:
         print(f"❌ Error updating study timer session in Supabase: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def _study_timer_session_row(session):
+    return {
+        'id': session.id,
+        'session_type': session.session_type,
+        'start_time': session.start_time.isoformat(),
+        'end_time': session.end_time.isoformat(),
+        'duration': session.duration,
+        'created_at': session.created_at.isoformat(),
+        'updated_at': session.updated_at.isoformat()
+    }
+
+
+def bulk_upsert_study_timer_sessions_in_supabase(sessions, batch_size=500):
+    """Upsert many study timer sessions into Supabase; used by the batch ingest endpoint"""
+    return _bulk_upsert('study_timer_sessions', sessions, _study_timer_session_row, batch_size)
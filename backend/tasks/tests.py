@@ -0,0 +1,597 @@
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.testing import OfflineTestCase, QueryPlanTestCase
+from progress.xp import XP_PER_TASK
+from tasks.management.commands.populate_productivity_history import populate_users
+from progress.models import StudyDailyRollup
+from tasks.models import ProductivityLog, StudyTimerSession, Subtask, Task
+from tasks.productivity import (
+    bulk_upsert_productivity_logs, get_completion_date_counts, get_due_date_counts, get_work_date_counts, iter_days,
+    update_daily_productivity,
+)
+from tasks.views import TaskViewSet
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked against PostgreSQL')
+class TaskQueryPlanTests(QueryPlanTestCase):
+    TASKS_PER_USER = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        users = cls.create_users()
+        cls.today = date(2025, 6, 15)
+        base_time = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        tasks = []
+        for user in users:
+            for i in range(cls.TASKS_PER_USER):
+                completed = i % 3 == 0
+                tasks.append(Task(
+                    user=user,
+                    title=f'Task {i}',
+                    due_date=cls.today - timedelta(days=i % 365),
+                    priority=('low', 'medium', 'high')[i % 3],
+                    completed=completed,
+                    completed_at=base_time + timedelta(hours=i * 17) if completed else None,
+                    is_deleted=i % 10 == 0,
+                    was_completed_on_delete=i % 30 == 0,
+                ))
+        Task.all_objects.bulk_create(tasks, batch_size=2000)
+        cls.analyze()
+
+    def filtered_tasks(self, **params):
+        return TaskViewSet.filter_tasks(Task.objects.filter(user=self.user), params)
+
+    def test_due_date_counts(self):
+        self.assertNoSequentialScan(
+            lambda: get_due_date_counts(self.user, self.today - timedelta(days=30), self.today), 'tasks_task'
+        )
+
+    def test_completion_date_counts(self):
+        self.assertNoSequentialScan(
+            lambda: get_completion_date_counts(self.user, self.today - timedelta(days=30), self.today), 'tasks_task'
+        )
+
+    def test_task_list_pages(self):
+        first_page = self.get_ok('/api/tasks/?page_size=100')
+        self.assertIsNotNone(first_page.data['next'])
+        self.assertNoSequentialScan(lambda: self.get_ok('/api/tasks/?page_size=100'), 'tasks_task')
+        self.assertNoSequentialScan(lambda: self.get_ok(first_page.data['next']), 'tasks_task')
+
+    def test_task_delta_sync(self):
+        self.assertNoSequentialScan(
+            lambda: self.get_ok('/api/tasks/?page_size=100&updated_since=2025-06-01T00:00:00Z'), 'tasks_task'
+        )
+
+    def test_completed_task_filter(self):
+        self.assertNoSequentialScan(self.filtered_tasks(completed='true'), 'tasks_task')
+
+    def test_task_full_text_search(self):
+        self.assertNoSequentialScan(self.filtered_tasks(search='Task 4'), 'tasks_task')
+
+    def test_task_category_substring(self):
+        self.assertNoSequentialScan(self.filtered_tasks(task_category='math'), 'tasks_task')
+
+
+class ProductivityAggregationTests(OfflineTestCase):
+    """The grouped helpers must agree with the per-day counts they replaced"""
+
+    def setUp(self):
+        super().setUp()
+        self.start = self.today - timedelta(days=6)
+        other = User.objects.create_user(username='aggregation-other')
+        tasks = []
+        for offset in range(7):
+            day = self.start + timedelta(days=offset)
+            # Completed a day or two after the due date, so both bucketings differ
+            completed_at = timezone.make_aware(datetime.combine(day + timedelta(days=offset % 3), time(12)))
+            for i in range(offset):
+                state = i % 4
+                tasks.append(Task(
+                    user=self.user,
+                    title=f'Task {offset}.{i}',
+                    due_date=day,
+                    completed=state in (1, 2),
+                    completed_at=completed_at if state in (1, 2) else None,
+                    is_deleted=state in (2, 3),
+                    was_completed_on_delete=state == 2,
+                ))
+            tasks.append(Task(user=other, title='Not counted', due_date=day, completed=True, completed_at=completed_at))
+        Task.all_objects.bulk_create(tasks)
+
+    def per_day_due_counts(self, day):
+        daily_tasks = Task.all_objects.filter(user=self.user, due_date=day)
+        daily_non_deleted = daily_tasks.filter(is_deleted=False)
+        daily_deleted_completed = daily_tasks.filter(is_deleted=True, was_completed_on_delete=True)
+        return {
+            'total': daily_non_deleted.count() + daily_deleted_completed.count(),
+            'completed': daily_non_deleted.filter(completed=True).count() + daily_deleted_completed.count(),
+            'pending': daily_non_deleted.filter(completed=False).count(),
+        }
+
+    def per_day_work_counts(self, day):
+        tasks = Task.all_objects.filter(user=self.user)
+        completed_on_this_day = tasks.filter(completed=True, is_deleted=False, completed_at__date=day).count()
+        pending_due_today = tasks.filter(due_date=day, completed=False, is_deleted=False).count()
+        deleted_completed_on_this_day = tasks.filter(
+            is_deleted=True, was_completed_on_delete=True, completed_at__date=day
+        ).count()
+        return {
+            'total': completed_on_this_day + pending_due_today + deleted_completed_on_this_day,
+            'completed': completed_on_this_day + deleted_completed_on_this_day,
+        }
+
+    def test_due_date_counts_match_per_day_counts(self):
+        with self.assertNumQueries(1):
+            counts = get_due_date_counts(self.user, self.start, self.today)
+        self.assertEqual(list(counts), list(iter_days(self.start, self.today)))
+        for day in iter_days(self.start, self.today):
+            self.assertEqual(counts[day], self.per_day_due_counts(day), day)
+
+    def test_work_date_counts_match_per_day_counts(self):
+        end = self.today + timedelta(days=2)
+        with self.assertNumQueries(2):
+            counts = get_work_date_counts(self.user, self.start, end)
+        for day in iter_days(self.start, end):
+            self.assertEqual(counts[day], self.per_day_work_counts(day), day)
+
+
+class ProductivityLogUpsertTests(OfflineTestCase):
+
+    def log(self, period_type, start, end, completed, total=4):
+        return ProductivityLog(
+            user=self.user, period_type=period_type, period_start=start, period_end=end,
+            completion_rate=completed / total * 100, total_tasks=total, completed_tasks=completed, status='Productive',
+        )
+
+    def test_upsert_inserts_updates_and_dirties_covering_rollups(self):
+        monday = date(2025, 6, 2)
+        sunday = monday + timedelta(days=6)
+        existing = bulk_upsert_productivity_logs([self.log('daily', monday, monday, 1)], sync=False)[0]
+        ProductivityLog.objects.bulk_create([self.log('monthly', date(2025, 6, 1), date(2025, 6, 30), 0)])
+
+        with self.assertNumQueries(2):
+            written = bulk_upsert_productivity_logs([
+                self.log('daily', monday, monday, 2),
+                self.log('daily', monday, monday, 3),
+                self.log('daily', sunday, sunday, 4),
+                self.log('weekly', monday, sunday, 3),
+            ], sync=False)
+
+        self.assertEqual(len(written), 3)
+        updated = ProductivityLog.objects.get(id=existing.id)
+        # The last write for a key wins and the row keeps its first logged_at
+        self.assertEqual((updated.completed_tasks, updated.logged_at), (3, existing.logged_at))
+        self.assertEqual(ProductivityLog.objects.filter(period_type='daily').count(), 2)
+        # Rollups written in the same call stay clean; others covering the days are dirtied
+        self.assertFalse(ProductivityLog.objects.get(period_type='weekly').is_dirty)
+        self.assertTrue(ProductivityLog.objects.get(period_type='monthly').is_dirty)
+
+    def test_supabase_sync_sends_one_request_per_batch(self):
+        logs = [self.log('daily', date(2025, 6, day), date(2025, 6, day), 1) for day in range(1, 6)]
+        with mock.patch('tasks.supabase_sync.get_user_supabase_id', return_value='supabase-user') as lookup, \
+                mock.patch('tasks.supabase_sync.requests.post', return_value=mock.Mock(status_code=201)) as post:
+            bulk_upsert_productivity_logs(logs, batch_size=2)
+
+        lookup.assert_called_once()
+        self.assertEqual([len(call.kwargs['json']) for call in post.call_args_list], [2, 2, 1])
+        self.assertTrue(all(row['user_id'] == 'supabase-user' for call in post.call_args_list for row in call.kwargs['json']))
+
+
+class ProductivityHistoryTests(OfflineTestCase):
+
+    def test_populate_users_skips_existing_logs_unless_overwriting(self):
+        monday = date(2025, 6, 2)
+        sunday = monday + timedelta(days=6)
+        Task.all_objects.bulk_create([
+            Task(user=self.user, title='Done', due_date=monday, completed=True),
+            Task(user=self.user, title='Open', due_date=monday),
+            Task(user=self.user, title='Done', due_date=monday + timedelta(days=1), completed=True),
+        ])
+        periods = [('daily', monday, monday), ('weekly', monday, sunday)]
+
+        self.assertEqual(populate_users([self.user.id], periods, sync=False), 2)
+        daily = ProductivityLog.objects.get(period_type='daily')
+        weekly = ProductivityLog.objects.get(period_type='weekly')
+        self.assertEqual((daily.total_tasks, daily.completed_tasks, daily.completion_rate), (2, 1, 50))
+        # The average of daily percentages: (50 + 100 + 5 * 0) / 7
+        self.assertEqual((weekly.total_tasks, weekly.completed_tasks), (3, 2))
+        self.assertAlmostEqual(weekly.completion_rate, 150 / 7)
+
+        self.assertEqual(populate_users([self.user.id], periods, sync=False), 0)
+        self.assertEqual(populate_users([self.user.id], periods, overwrite=True, sync=False), 2)
+
+    def test_command_resumes_from_its_checkpoint(self):
+        done_user = User.objects.create_user(username='history-done')
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint.json')
+            run_key = {'today': timezone.now().date().isoformat(), 'days_back': 7, 'overwrite': False, 'user': None}
+            with open(checkpoint, 'w') as f:
+                json.dump({'run': run_key, 'done_user_ids': [done_user.id]}, f)
+
+            call_command(
+                'populate_productivity_history', days_back=7, chunk_size=1, no_sync=True,
+                checkpoint=checkpoint, stdout=io.StringIO(),
+            )
+
+            self.assertFalse(os.path.exists(checkpoint))
+        self.assertFalse(ProductivityLog.objects.filter(user=done_user).exists())
+        # 7 days, one week and one month
+        self.assertEqual(ProductivityLog.objects.filter(user=self.user).count(), 9)
+
+
+class TaskListTests(OfflineTestCase):
+
+    def create_tasks(self, count):
+        tasks = Task.objects.bulk_create([
+            Task(user=self.user, title=f'Task {i}', description='Long text ' * 50, due_date=self.today)
+            for i in range(count)
+        ])
+        Subtask.objects.bulk_create([Subtask(task=task, title=f'Step {j}') for task in tasks for j in range(3)])
+
+    def list_queries(self, url='/api/tasks/'):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(captured.captured_queries)
+
+    def test_subtasks_are_loaded_in_one_query(self):
+        self.create_tasks(2)
+        response, few = self.list_queries()
+        self.assertEqual([len(task['subtasks']) for task in response.data], [3, 3])
+
+        self.create_tasks(20)
+        response, many = self.list_queries()
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(many, few)
+
+    def test_sparse_fieldset_leaves_out_unrequested_fields(self):
+        self.create_tasks(2)
+        response, _ = self.list_queries('/api/tasks/?fields=title,due_date')
+        self.assertEqual(set(response.data[0]), {'id', 'title', 'due_date'})
+
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/api/tasks/?fields=title,subtasks')
+        task_query = next(q['sql'] for q in captured.captured_queries if 'FROM "tasks_task"' in q['sql'])
+        self.assertNotIn('"description"', task_query)
+        self.assertTrue(any('"tasks_subtask"' in q['sql'] for q in captured.captured_queries))
+
+
+class TaskPaginationTests(OfflineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Task.objects.bulk_create([
+            Task(
+                user=self.user, title=f'Task {i}', due_date=self.today + timedelta(days=i % 4),
+                priority=('low', 'medium', 'high')[i % 3],
+            )
+            for i in range(25)
+        ])
+
+    def follow(self, url, params=None):
+        """Every page of a paginated listing, following next until it is null"""
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            if response.data['next'] is None:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages_cover_the_sorted_list_once(self):
+        self.assertIsInstance(self.client.get('/api/tasks/').data, list)
+
+        first = self.client.get('/api/tasks/', {'page_size': 10}).data
+        # Rows added before the cursor position don't shift later pages
+        Task.objects.create(user=self.user, title='Earlier', due_date=self.today - timedelta(days=1))
+        pages = [first] + self.follow(first['next'])
+
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 5])
+        served = [task['id'] for page in pages for task in page['results']]
+        expected = list(
+            Task.objects.filter(user=self.user).exclude(title='Earlier')
+            .order_by('due_date', 'priority', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(served, expected)
+
+        self.assertEqual(self.client.get('/api/tasks/', {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_updated_since_returns_changes_and_tombstones(self):
+        initial = self.follow('/api/tasks/', {'updated_since': '2000-01-01T00:00:00Z', 'page_size': 10})
+        self.assertEqual(sum(len(page['results']) for page in initial), 25)
+        since = initial[0]['server_time']
+
+        changed, deleted = Task.objects.filter(user=self.user).order_by('id')[:2]
+        changed.title = 'Renamed'
+        changed.save()
+        self.assertEqual(self.client.delete(f'/api/tasks/{deleted.id}/').status_code, 204)
+
+        delta = self.follow('/api/tasks/', {'updated_since': since})
+        results = {task['id']: task for page in delta for task in page['results']}
+        self.assertEqual(set(results), {changed.id, deleted.id})
+        self.assertEqual(results[changed.id]['title'], 'Renamed')
+        self.assertTrue(results[deleted.id]['is_deleted'])
+
+        self.assertEqual(self.client.get('/api/tasks/', {'updated_since': 'yesterday'}).status_code, 400)
+
+
+class BulkTaskTests(OfflineTestCase):
+
+    def test_operations_apply_in_order_and_award_xp_once(self):
+        first = Task.objects.create(user=self.user, title='First', due_date=self.today)
+        second = Task.objects.create(user=self.user, title='Second', due_date=self.today)
+        tomorrow = self.today + timedelta(days=1)
+
+        response = self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'complete', 'ids': [first.id, second.id]},
+            {'op': 'move', 'ids': [second.id], 'due_date': tomorrow.isoformat()},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['xp_awarded'], 2 * XP_PER_TASK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(first.completed and second.completed)
+        self.assertIsNotNone(first.completed_at)
+        self.assertEqual(second.due_date, tomorrow)
+
+        # Completing again through an uncomplete/complete cycle earns nothing more
+        response = self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'uncomplete', 'ids': [first.id]},
+            {'op': 'complete', 'ids': [first.id]},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['xp_awarded'], 0)
+
+    def test_invalid_request_changes_nothing(self):
+        task = Task.objects.create(user=self.user, title='Task', due_date=self.today)
+        other = User.objects.create_user(username='bulk-other')
+        foreign = Task.objects.create(user=other, title='Not yours', due_date=self.today)
+
+        for operations in (
+            [{'op': 'complete', 'ids': [task.id]}, {'op': 'delete', 'ids': [foreign.id]}],
+            [{'op': 'complete', 'ids': [True]}],
+            [{'op': 'complete', 'ids': [task.id]}] * (TaskViewSet.MAX_BULK_OPERATIONS + 1),
+        ):
+            response = self.client.post('/api/tasks/bulk/', {'operations': operations}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/tasks/bulk/', [], format='json').status_code, 400)
+
+        task.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertFalse(task.completed)
+        self.assertFalse(foreign.is_deleted)
+
+
+class DailyProductivityUpdateTests(OfflineTestCase):
+
+    def at(self, day):
+        return timezone.make_aware(datetime.combine(day, time(12)))
+
+    def test_counts_only_on_time_completions_for_every_day(self):
+        monday = date(2025, 6, 2)
+        tuesday, wednesday = monday + timedelta(days=1), monday + timedelta(days=2)
+        Task.all_objects.bulk_create([
+            Task(user=self.user, title='On time', due_date=monday, completed=True, completed_at=self.at(monday)),
+            Task(user=self.user, title='Late', due_date=monday, completed=True, completed_at=self.at(tuesday)),
+            Task(user=self.user, title='Legacy, no timestamp', due_date=monday, completed=True),
+            Task(user=self.user, title='Open', due_date=monday),
+            Task(user=self.user, title='Deleted', due_date=monday, completed=True, completed_at=self.at(monday),
+                 is_deleted=True, was_completed_on_delete=True),
+            Task(user=self.user, title='Early', due_date=tuesday, completed=True, completed_at=self.at(monday)),
+        ])
+
+        # One aggregate, one upsert and one UPDATE dirtying covering rollups
+        with self.assertNumQueries(3):
+            logs = update_daily_productivity(self.user, [monday, tuesday, wednesday], sync=False)
+
+        self.assertEqual({log.period_start: (log.total_tasks, log.completed_tasks, log.status) for log in logs}, {
+            monday: (4, 2, 'Moderately Productive'),
+            tuesday: (1, 1, 'Highly Productive'),
+            wednesday: (0, 0, 'No Tasks'),
+        })
+
+    def test_completing_a_task_due_today_updates_its_log(self):
+        task = Task.objects.create(user=self.user, title='Task', due_date=self.today)
+        response = self.client.patch(f'/api/tasks/{task.id}/', {'completed': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        log = ProductivityLog.objects.get(user=self.user, period_type='daily', period_start=self.today)
+        self.assertEqual((log.total_tasks, log.completed_tasks), (1, 1))
+
+
+class TaskActivityTests(OfflineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(user=self.user, title='Task', due_date=self.today)
+        self.url = f'/api/tasks/{self.task.id}'
+
+    def test_time_is_incremented_in_the_database(self):
+        response = self.client.post(f'{self.url}/add_time/', {'minutes': 25}, format='json')
+        self.assertEqual(response.data['total_time_spent'], 25)
+        # Another tab's tick lands between requests
+        Task.objects.filter(id=self.task.id).update(time_spent_minutes=F('time_spent_minutes') + 5)
+        response = self.client.post(f'{self.url}/add_time/', {'minutes': 10}, format='json')
+        self.assertEqual(response.data['total_time_spent'], 40)
+
+        for minutes in (0, -5, 'ten'):
+            response = self.client.post(f'{self.url}/add_time/', {'minutes': minutes}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.get(id=self.task.id).time_spent_minutes, 40)
+
+    def test_notes_are_appended_and_logged(self):
+        for notes in ('Outlined the essay', 'Wrote the intro'):
+            response = self.client.post(f'{self.url}/add_notes/', {'notes': notes}, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.client.post(f'{self.url}/add_time/', {'minutes': 15}, format='json')
+
+        entries = Task.objects.get(id=self.task.id).activity_notes.split('\n\n')
+        self.assertEqual([entry.split(': ', 1)[1] for entry in entries], ['Outlined the essay', 'Wrote the intro'])
+
+        activities = self.client.get(f'{self.url}/activities/').data
+        self.assertEqual([(a['kind'], a['note'], a['minutes']) for a in activities], [
+            ('note', 'Outlined the essay', 0), ('note', 'Wrote the intro', 0), ('time', '', 15),
+        ])
+        self.assertEqual(len(self.client.get(f'{self.url}/activities/', {'kind': 'time'}).data), 1)
+
+    def test_activity_saves_leave_rollups_clean(self):
+        ProductivityLog.objects.bulk_create([ProductivityLog(
+            user=self.user, period_type='monthly', period_start=self.today.replace(day=1),
+            period_end=self.today.replace(day=1) + timedelta(days=27), completion_rate=0,
+            total_tasks=1, completed_tasks=0, status='Low Productive',
+        )])
+        self.client.post(f'{self.url}/add_time/', {'minutes': 5}, format='json')
+        self.client.post(f'{self.url}/add_notes/', {'notes': 'Progress'}, format='json')
+        self.assertFalse(ProductivityLog.objects.get(user=self.user).is_dirty)
+
+
+class StudySessionBatchTests(OfflineTestCase):
+    url = '/api/tasks/study-timer-sessions/'
+
+    def session(self, day, hour, session_type='Study', seconds=1500):
+        start = datetime.combine(day, time(hour), tzinfo=dt_timezone.utc)
+        return {
+            'session_type': session_type,
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(seconds=seconds)).isoformat(),
+            'duration': seconds,
+        }
+
+    def test_batch_writes_sessions_rollups_and_one_sync_request(self):
+        monday, tuesday = date(2025, 6, 2), date(2025, 6, 3)
+        sessions = [
+            self.session(monday, 9), self.session(monday, 10, 'Break', 300),
+            self.session(monday, 11, seconds=600), self.session(tuesday, 9),
+        ]
+        with mock.patch('tasks.supabase_sync.get_user_supabase_id', return_value='supabase-user'), \
+                mock.patch('tasks.supabase_sync.requests.post', return_value=mock.Mock(status_code=201)) as post:
+            response = self.client.post(f'{self.url}batch/', {'sessions': sessions}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 4)
+        self.assertEqual([len(call.kwargs['json']) for call in post.call_args_list], [4])
+        self.assertEqual(
+            sorted(StudyDailyRollup.objects.filter(user=self.user).values_list('day', 'session_type', 'seconds', 'sessions')),
+            [(monday, 'Break', 300, 1), (monday, 'Study', 2100, 2), (tuesday, 'Study', 1500, 1)],
+        )
+        response = self.client.get('/api/progress/study_time/', {'start': '2025-06-02', 'end': '2025-06-02'})
+        self.assertEqual(response.data['totalStudySeconds'], 2100)
+
+    def test_invalid_batch_writes_nothing(self):
+        valid = self.session(date(2025, 6, 2), 9)
+        for body in ([], {'sessions': [valid, {**valid, 'session_type': 'Nap'}]}, {'sessions': 'all of them'}):
+            response = self.client.post(f'{self.url}batch/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(StudyTimerSession.objects.exists())
+
+    def test_time_window_listing(self):
+        self.client.post(f'{self.url}batch/', [
+            self.session(date(2025, 6, day), 9) for day in (1, 10, 20)
+        ], format='json')
+
+        windows = []
+        response = self.client.get(self.url, {'before': '2025-06-21', 'window_days': 7})
+        while True:
+            windows.append([session['start_time'][:10] for session in response.data['results']])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        # Each page moves one window back and the last is the oldest with sessions
+        self.assertEqual(windows, [['2025-06-20'], ['2025-06-10'], ['2025-06-01']])
+        self.assertEqual(len(self.client.get(self.url).data), 3)
+
+
+class TaskFilterTests(OfflineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Task.objects.bulk_create([
+            Task(user=self.user, title='Write capstone essays', task_category='CAPSTONE', due_date=self.today,
+                 priority='high'),
+            Task(user=self.user, title='Review math notes', task_category='Math', due_date=self.today,
+                 completed=True),
+            Task(user=self.user, title='Math homework', task_category='Discrete math', due_date=self.today,
+                 priority='high'),
+            Task(user=self.user, title='Deleted math', task_category='Math', due_date=self.today, is_deleted=True),
+        ])
+
+    def titles(self, **params):
+        return sorted(task['title'] for task in self.client.get('/api/tasks/', params).data)
+
+    def test_list_filters(self):
+        self.assertEqual(self.titles(task_category='MATH'), ['Math homework', 'Review math notes'])
+        self.assertEqual(self.titles(task_category='math', completed='false'), ['Math homework'])
+        self.assertEqual(self.titles(priority='high'), ['Math homework', 'Write capstone essays'])
+
+    def test_stats_count_the_filtered_list(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/tasks/stats/', {'task_category': 'math'})
+        self.assertEqual(response.data, {'total_tasks': 2, 'completed_tasks': 1, 'pending_tasks': 1, 'due_today': 1})
+        # Every counter comes from a single aggregate
+        self.assertEqual(len([q for q in captured.captured_queries if '"tasks_task"' in q['sql']]), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_full_text_search_stems_words_and_matches_prefixes(self):
+        self.assertEqual(self.titles(search='essay'), ['Write capstone essays'])
+        self.assertEqual(self.titles(search='math hom'), ['Math homework'])
+        self.assertEqual(self.titles(search='review & (notes'), ['Review math notes'])
+        self.assertEqual(self.titles(search='!!!'), self.titles())
+
+
+class TaskCalendarTests(OfflineTestCase):
+
+    def test_days_list_counts_and_task_ids(self):
+        yesterday = self.today - timedelta(days=1)
+        done, late, _ = Task.objects.bulk_create([
+            Task(user=self.user, title='Done', due_date=yesterday, completed=True),
+            Task(user=self.user, title='Late', due_date=yesterday),
+            Task(user=self.user, title='Deleted', due_date=yesterday, is_deleted=True),
+        ])
+        today_task = Task.objects.create(user=self.user, title='Today', due_date=self.today)
+
+        response = self.client.get('/api/tasks/calendar/', {
+            'from': yesterday.isoformat(), 'to': (self.today + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['days'], [
+            {'date': yesterday.isoformat(), 'due': 2, 'completed': 1, 'overdue': 1, 'task_ids': [done.id, late.id]},
+            {'date': self.today.isoformat(), 'due': 1, 'completed': 0, 'overdue': 0, 'task_ids': [today_task.id]},
+        ])
+
+    def test_invalid_windows_are_rejected(self):
+        for params in (
+            {'from': 'June'},
+            {'from': '2025-06-10', 'to': '2025-06-01'},
+            {'from': '2025-01-01', 'to': '2026-06-01'},
+        ):
+            self.assertEqual(self.client.get('/api/tasks/calendar/', params).status_code, 400, params)
+
+    def test_calendar_revalidates_until_tasks_change(self):
+        Task.objects.create(user=self.user, title='Task', due_date=self.today)
+        response = self.client.get('/api/tasks/calendar/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get('/api/tasks/calendar/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # The cache version is bumped once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, title='Another', due_date=self.today)
+        response = self.client.get('/api/tasks/calendar/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -9,6 +9,7 @@ router.register(r'subtasks', SubtaskViewSet, basename='subtask')
 urlpatterns = [
     # Custom paths for study-timer-sessions (nested route that frontend expects) - MUST come before router.urls
     path('tasks/study-timer-sessions/', StudyTimerSessionViewSet.as_view({'get': 'list', 'post': 'create'}), name='study-timer-sessions-list'),
+    path('tasks/study-timer-sessions/batch/', StudyTimerSessionViewSet.as_view({'post': 'batch'}), name='study-timer-sessions-batch'),
     path('tasks/study-timer-sessions/<int:pk>/', StudyTimerSessionViewSet.as_view({
         'get': 'retrieve', 
         'put': 'update', 
@@ -1,57 +1,131 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.permissions import IsAuthenticated
 # from django_filters.rest_framework import DjangoFilterBackend
-from .models import Task, XPLog, ProductivityLog, Subtask, StudyTimerSession
-from .serializers import TaskSerializer, SubtaskSerializer, StudyTimerSessionSerializer
+from .models import Task, TaskActivity, Subtask, StudyTimerSession
+from .serializers import TaskSerializer, SubtaskSerializer, StudyTimerSessionSerializer, TaskActivitySerializer, get_requested_fields
+from .pagination import KeysetPagination, TimeWindowPagination
+from .search import task_search_query
+from .calendar_index import get_task_calendar, MAX_CALENDAR_DAYS
+from .productivity import mark_rollups_dirty, update_daily_productivity
+from .supabase_sync import bulk_upsert_tasks_in_supabase, bulk_upsert_study_timer_sessions_in_supabase
+from progress.streaks import update_streak_for_dates
+from progress.cache import get_or_compute, bump_user_cache_version, user_cache_etag
+from progress.timeseries import stats_days_for, refresh_task_stats, refresh_study_stats
+from progress.xp import award_xp_bulk, task_completion_xp
 # from .utils import get_user_local_date_from_request
 import logging
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags
 from datetime import timedelta
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Concat
 
 logger = logging.getLogger(__name__)
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    # ?search= is handled in filter_tasks with full-text search
+    filter_backends = [filters.OrderingFilter]
     # filterset_fields = ['completed', 'priority', 'category']  # Temporarily disabled
-    search_fields = ['title', 'description']
     ordering_fields = ['due_date', 'priority', 'title', 'task_category']
     ordering = ['due_date', 'priority']
-    pagination_class = None  # Disable pagination for tasks
+    # Opt-in keyset pagination on (due_date, priority, id): pass ?page_size= or
+    # follow the returned cursor; without either the full list is returned
+    pagination_class = KeysetPagination
+    keyset_fields = ['due_date', 'priority', 'id']
 
-    def get_queryset(self):
-        logger.debug(f"[TaskViewSet] get_queryset called by user: {self.request.user} (auth: {self.request.user.is_authenticated})")
-        queryset = Task.objects.filter(user=self.request.user)
-        
-        # Custom filtering for task_category
-        task_category = self.request.query_params.get('task_category', None)
+    def get_updated_since(self):
+        """Parsed ?updated_since= timestamp for delta sync on list (None if absent)"""
+        if self.action != 'list':
+            return None
+        value = self.request.query_params.get('updated_since')
+        if not value:
+            return None
+        updated_since = parse_datetime(value.replace(' ', '+'))
+        if updated_since is None:
+            raise ValidationError({'updated_since': 'Must be an ISO 8601 timestamp.'})
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since)
+        return updated_since
+
+    @staticmethod
+    def filter_tasks(queryset, params):
+        """Apply the ?search=, ?task_category=, ?completed= and ?priority= list filters"""
+        # Indexed full-text match on the generated search vector
+        search_query = task_search_query(params.get('search'))
+        if search_query is not None:
+            queryset = queryset.filter(search_vector=search_query)
+        
+        # Substring match served by the trigram index on UPPER(task_category)
+        task_category = params.get('task_category', None)
         if task_category:
             queryset = queryset.filter(task_category__icontains=task_category)
         
-        # Custom filtering for completed status
-        completed = self.request.query_params.get('completed', None)
+        completed = params.get('completed', None)
         if completed is not None:
             completed_bool = completed.lower() == 'true'
             queryset = queryset.filter(completed=completed_bool)
         
-        # Custom filtering for priority
-        priority = self.request.query_params.get('priority', None)
+        priority = params.get('priority', None)
         if priority:
             queryset = queryset.filter(priority=priority)
+        return queryset
+
+    def force_pagination(self, request):
+        # Delta responses are always paginated so they carry a cursor
+        return self.get_updated_since() is not None
+
+    def get_queryset(self):
+        logger.debug(f"[TaskViewSet] get_queryset called by user: {self.request.user} (auth: {self.request.user.is_authenticated})")
+        
+        # Delta sync: every task changed since the timestamp, including
+        # soft-deleted ones as tombstones (is_deleted=true), in change order
+        updated_since = self.get_updated_since()
+        if updated_since is not None:
+            self.keyset_fields = ['updated_at', 'id']
+            return Task.all_objects.filter(
+                user=self.request.user, updated_at__gte=updated_since
+            ).prefetch_related('subtasks')
+        
+        queryset = self.filter_tasks(Task.objects.filter(user=self.request.user), self.request.query_params)
+        
+        # Sparse fieldset: don't load heavy text columns the response won't include
+        requested = get_requested_fields(self.request)
+        if requested:
+            deferred = [name for name in TaskSerializer.HEAVY_FIELDS if name not in requested]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        
+        # Load every task's subtasks in one query for the serializer
+        if not requested or 'subtasks' in requested:
+            queryset = queryset.prefetch_related('subtasks')
         
-        logger.debug(f"[TaskViewSet] Final queryset count: {queryset.count()}")
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Taken before querying so the next delta can't miss concurrent writes
+        server_time = timezone.now()
+        response = super().list(request, *args, **kwargs)
+        if self.get_updated_since() is not None:
+            # Clients pass this back as the next ?updated_since=
+            response.data['server_time'] = server_time.isoformat()
+        return response
+
     def perform_create(self, serializer):
         try:
             logger.debug(f"[TaskViewSet] perform_create called by user: {self.request.user} (auth: {self.request.user.is_authenticated})")
             task = serializer.save(user=self.request.user)
             logger.debug(f"[TaskViewSet] Task created successfully. Title: {task.title}, Completed: {task.completed}, Due Date: {task.due_date}")
             
+            # A task created already completed can make its due date qualify
+            if task.completed:
+                update_streak_for_dates(task.user, {task.due_date})
+            
             # Update productivity for today if the new task is due today
             
             # Use local time (system timezone)
@@ -60,15 +134,17 @@ class TaskViewSet(viewsets.ModelViewSet):
             logger.debug(f"[TaskViewSet] Task due_date: {task.due_date}, Today (local): {today}, Equal: {task.due_date == today}")
             
             if task.due_date == today:
-                logger.debug(f"[TaskViewSet] Updating productivity for today's task")
+                logger.debug("[TaskViewSet] Updating productivity for today's task")
                 self._update_productivity_for_date(self.request.user, task.due_date)
             else:
-                logger.debug(f"[TaskViewSet] Task not due today, skipping productivity update")
+                logger.debug("[TaskViewSet] Task not due today, skipping productivity update")
         except Exception as e:
             logger.error(f"[TaskViewSet] Error creating task: {e}")
             raise 
 
     def perform_update(self, serializer):
+        previous_due_date = serializer.instance.due_date
+        previous_completed = serializer.instance.completed
         instance = serializer.save()
         
         # Check if task is being marked as completed
@@ -90,21 +166,13 @@ class TaskViewSet(viewsets.ModelViewSet):
             # Use the new mark_completed method to set completion timestamp
             instance.mark_completed()
             
-            # Award XP if task is completed and not already logged
-            if not XPLog.objects.filter(user=instance.user, task=instance).exists():
-                # Check if task is overdue (completed after due date)
-                from django.utils import timezone
-                today = timezone.now().date()
-                is_overdue = instance.due_date < today
-                
-                # Award half XP (5) for overdue tasks, full XP (10) for on-time tasks
-                xp_amount = 5 if is_overdue else 10
-                XPLog.objects.create(user=instance.user, task=instance, xp=xp_amount)
-            else:
-                # If XP log exists, check if it's overdue
-                from django.utils import timezone
-                today = timezone.now().date()
-                is_overdue = instance.due_date < today
+            # Check if task is overdue (completed after due date)
+            today = timezone.now().date()
+            is_overdue = instance.due_date < today
+            
+            # Award XP unless the task already earned it (idempotent per task);
+            # half XP (5) for overdue tasks, full XP (10) for on-time tasks
+            award_xp_bulk(instance.user_id, {instance.id: task_completion_xp(instance, today)}, day=today)
             
             # IMPORTANT: Only update productivity if task was completed on time
             # Late tasks (completed after due date) should NOT count toward productivity
@@ -118,100 +186,30 @@ class TaskViewSet(viewsets.ModelViewSet):
         elif not instance.completed and instance.completed_at:
             # Task is being marked as incomplete
             instance.mark_incomplete()
+
+        # Keep the persisted streak in step with completion/due date changes
+        if instance.completed != previous_completed or instance.due_date != previous_due_date:
+            update_streak_for_dates(instance.user, {previous_due_date, instance.due_date})
+
+        # The task left its old day, so rollups covering it are stale too
+        if instance.due_date != previous_due_date:
+            mark_rollups_dirty(instance.user_id, [previous_due_date])
         
         return instance
     
     def _update_productivity_for_date(self, user, target_date):
         """Update productivity for a specific date (uses task's due_date)"""
-        
-        print(f"🚀 [_update_productivity_for_date] STARTING - User: {user.id}, Date: {target_date}")
-        logger.debug(f"[_update_productivity_for_date] Using target date: {target_date}")
-        
-        # Get all tasks due on this date
-        tasks = Task.all_objects.filter(user=user, due_date=target_date, is_deleted=False)
-        total_tasks = tasks.count()
-        
-        # Count completed tasks, but ONLY if completed on or before the due date
-        # Late completions (after due date) don't count toward productivity
-        completed_on_time = 0
-        for task in tasks:
-            if task.completed:
-                # Check if task was completed on time
-                if task.completed_at:
-                    completion_date = task.completed_at.date()
-                    if completion_date <= target_date:
-                        completed_on_time += 1
-                        print(f"  ✅ '{task.title}' - Completed on time ({completion_date})")
-                    else:
-                        print(f"  ⏰ '{task.title}' - Completed LATE ({completion_date} > {target_date}) - NOT COUNTED")
-                else:
-                    # No completion timestamp recorded, assume completed on time (legacy data)
-                    completed_on_time += 1
-                    print(f"  ✅ '{task.title}' - No completion date, assuming on time")
-        
-        completed_tasks = completed_on_time
-        
-        print(f"📊 [_update_productivity_for_date] TASK STATS for {target_date} - Total: {total_tasks}, Completed: {completed_tasks}")
-        logger.debug(f"[_update_productivity_for_date] Total tasks: {total_tasks}, Completed: {completed_tasks}")
-        
-        # Log all tasks for debugging
-        print(f"📋 [_update_productivity_for_date] TASK LIST for {target_date}:")
-        for task in tasks:
-            print(f"  - {task.title}: {'✅' if task.completed else '❌'} (ID: {task.id}, Due: {task.due_date})")
-            logger.debug(f"[_update_productivity_for_date] Task: {task.title}, Completed: {task.completed}")
-        
-        if total_tasks == 0:
-            completion_rate = 0
-            status = 'No Tasks'
-            print(f"⚠️ [_update_productivity_for_date] NO TASKS FOUND for date: {target_date}")
-        else:
-            completion_rate = completed_tasks / total_tasks * 100
-            print(f"📈 [_update_productivity_for_date] COMPLETION RATE: {completion_rate:.1f}%")
-            logger.debug(f"[_update_productivity_for_date] Completion rate: {completion_rate}%")
-            
-            if completion_rate >= 90:
-                status = 'Highly Productive'
-            elif completion_rate >= 70:
-                status = 'Productive'
-            elif completion_rate >= 40:
-                status = 'Moderately Productive'
-            else:
-                status = 'Low Productive'
-        
-        print(f"🏆 [_update_productivity_for_date] FINAL STATUS: {status}")
-        logger.debug(f"[_update_productivity_for_date] Final status: {status}")
-        
-        # Update or create productivity log for the target date
-        print(f"💾 [_update_productivity_for_date] CREATING/UPDATING PRODUCTIVITY LOG for {target_date}...")
-        log, created = ProductivityLog.objects.get_or_create(
-            user=user,
-            period_type='daily',
-            period_start=target_date,
-            period_end=target_date,
-            defaults={
-                'completion_rate': completion_rate,
-                'total_tasks': total_tasks,
-                'completed_tasks': completed_tasks,
-                'status': status
-            }
-        )
-        
-        # Always update the log to reflect current state
-        if not created:
-            print(f"🔄 [_update_productivity_for_date] UPDATING existing log (ID: {log.id})")
-            log.completion_rate = completion_rate
-            log.total_tasks = total_tasks
-            log.completed_tasks = completed_tasks
-            log.status = status
-            log.save()
-            print(f"✅ [_update_productivity_for_date] UPDATED log: {completion_rate:.1f}%")
-            logger.debug(f"[_update_productivity_for_date] Updated existing log")
-        else:
-            print(f"🆕 [_update_productivity_for_date] CREATED new log (ID: {log.id}): {completion_rate:.1f}%")
-            logger.debug(f"[_update_productivity_for_date] Created new log")
-        
-        print(f"🎯 [_update_productivity_for_date] FINAL LOG: ID={log.id}, Date={target_date}, Rate={log.completion_rate:.1f}%, Status={log.status}")
-        print(f"🔄 [_update_productivity_for_date] Supabase sync should be triggered...")
+        return self._update_productivity_for_dates(user, [target_date])
+
+    def _update_productivity_for_dates(self, user, target_dates):
+        """
+        Update the daily productivity logs for many dates at once.
+
+        Only tasks completed on or before their due date count as completed;
+        the counts for every date come from one conditional aggregate and the
+        logs are written with one batched upsert.
+        """
+        return update_daily_productivity(user, target_dates)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -230,7 +228,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         # Mark that user has done some work on this task
         task.has_activity = True
         task.last_activity_at = timezone.now()
-        task.save()
+        task.save(update_fields=['has_activity', 'last_activity_at', 'updated_at'])
         
         return Response({'message': 'Activity logged successfully'})
 
@@ -238,15 +236,24 @@ class TaskViewSet(viewsets.ModelViewSet):
     def add_time(self, request, pk=None):
         """Add time spent working on a task"""
         task = self.get_object()
-        minutes = request.data.get('minutes', 0)
+        try:
+            minutes = int(request.data.get('minutes', 0))
+        except (TypeError, ValueError):
+            minutes = 0
         
-        if not minutes or minutes <= 0:
+        if minutes <= 0:
             return Response({'error': 'Please provide a valid number of minutes'}, status=status.HTTP_400_BAD_REQUEST)
         
-        task.time_spent_minutes += minutes
+        # Increment in SQL so concurrent timer ticks from several tabs add up
+        # instead of overwriting each other; only these columns are written
+        task.time_spent_minutes = models.F('time_spent_minutes') + minutes
         task.has_activity = True
         task.last_activity_at = timezone.now()
-        task.save()
+        task.save(update_fields=['time_spent_minutes', 'has_activity', 'last_activity_at', 'updated_at'])
+        TaskActivity.objects.create(task=task, user=request.user, kind='time', minutes=minutes)
+        
+        # Read back the total the increment produced
+        task.refresh_from_db(fields=['time_spent_minutes'])
         
         return Response({
             'message': f'Added {minutes} minutes to task',
@@ -262,18 +269,31 @@ class TaskViewSet(viewsets.ModelViewSet):
         if not notes:
             return Response({'error': 'Please provide activity notes'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Append to existing notes or create new
-        if task.activity_notes:
-            task.activity_notes += f"\n\n{timezone.now().strftime('%Y-%m-%d %H:%M')}: {notes}"
-        else:
-            task.activity_notes = f"{timezone.now().strftime('%Y-%m-%d %H:%M')}: {notes}"
-        
+        now = timezone.now()
+        entry = f"{timezone.localtime(now).strftime('%Y-%m-%d %H:%M')}: {notes}"
+        TaskActivity.objects.create(task=task, user=request.user, kind='note', note=notes)
+        # Append to activity_notes in SQL so notes added concurrently aren't lost
+        task.activity_notes = models.Case(
+            models.When(activity_notes='', then=models.Value(entry)),
+            default=Concat(models.F('activity_notes'), models.Value(f"\n\n{entry}")),
+            output_field=models.TextField(),
+        )
         task.has_activity = True
-        task.last_activity_at = timezone.now()
-        task.save()
+        task.last_activity_at = now
+        task.save(update_fields=['activity_notes', 'has_activity', 'last_activity_at', 'updated_at'])
         
         return Response({'message': 'Activity notes added successfully'})
 
+    @action(detail=True, methods=['get'])
+    def activities(self, request, pk=None):
+        """Time entries and activity notes logged on a task, oldest first"""
+        task = self.get_object()
+        activities = task.activities.all()
+        kind = request.query_params.get('kind')
+        if kind:
+            activities = activities.filter(kind=kind)
+        return Response(TaskActivitySerializer(activities, many=True).data)
+
     @action(detail=True, methods=['post'])
     def upload_evidence(self, request, pk=None):
         """Upload evidence for task completion"""
@@ -319,7 +339,8 @@ class TaskViewSet(viewsets.ModelViewSet):
         return Response({
             'has_activity': task.has_activity,
             'time_spent_minutes': task.time_spent_minutes,
-            'has_activity_notes': bool(task.activity_notes and len(task.activity_notes.strip()) > 10),
+            'has_activity_notes': bool(task.activity_notes and len(task.activity_notes.strip()) > 10)
+                or task.activities.filter(kind='note').exists(),
             'evidence_uploaded': task.evidence_uploaded,
             'has_evidence_file': bool(task.evidence_file),
             'has_evidence_description': bool(task.evidence_description and len(task.evidence_description.strip()) > 20),
@@ -338,41 +359,204 @@ class TaskViewSet(viewsets.ModelViewSet):
         search = request.query_params.get('search', None)
         task_category = request.query_params.get('task_category', None)
         
-        # Build base queryset
-        queryset = Task.objects.filter(user=user)
-        
-        # Apply filters (same logic as get_queryset)
-        if completed is not None:
-            completed_bool = completed.lower() == 'true'
-            queryset = queryset.filter(completed=completed_bool)
-        
-        if priority:
-            queryset = queryset.filter(priority=priority)
-        
-        if search:
-            queryset = queryset.filter(
-                models.Q(title__icontains=search) | 
-                models.Q(description__icontains=search)
-            )
-        
-        if task_category:
-            queryset = queryset.filter(task_category__icontains=task_category)
-        
-        # Get counts based on filtered queryset
-        total_tasks = queryset.count()
-        completed_tasks = queryset.filter(completed=True).count()
-        pending_tasks = total_tasks - completed_tasks
-        
-        # Get tasks due today (only from filtered results)
         from datetime import date
         today = date.today()
-        due_today = queryset.filter(due_date=today, completed=False).count()
+
+        def compute():
+            # Same filters as the task list
+            queryset = self.filter_tasks(Task.objects.filter(user=user), request.query_params)
+            
+            # All four counters for the filtered queryset in one aggregate query
+            return queryset.aggregate(
+                total_tasks=models.Count('id'),
+                completed_tasks=models.Count('id', filter=models.Q(completed=True)),
+                pending_tasks=models.Count('id', filter=models.Q(completed=False)),
+                due_today=models.Count('id', filter=models.Q(due_date=today, completed=False)),
+            )
         
+        # Served from the per-user summary cache until the user's tasks change
+        data = get_or_compute(user.id, 'task_stats', (completed, priority, search, task_category, today), compute)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Per-day task index for ?from=..?to= (YYYY-MM-DD, default this month).
+
+        Returns due/completed/overdue counts and the task IDs for every day
+        with tasks. Responses carry an ETag derived from the user's task
+        version, so an unchanged month is revalidated with a 304 without
+        querying tasks.
+        """
+        user = request.user
+        today = timezone.localdate()
+        from_param = request.query_params.get('from') or ''
+        to_param = request.query_params.get('to') or ''
+        try:
+            # parse_date returns None for text that isn't shaped like a date
+            start = parse_date(from_param) if from_param else today.replace(day=1)
+            end = parse_date(to_param) if to_param else None
+        except ValueError:
+            start = end = None
+        if start is None or (to_param and end is None):
+            return Response({'error': 'from and to must be valid YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+        if end is None:
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        if end < start:
+            return Response({'error': 'to must not be before from'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+            return Response(
+                {'error': f'The window may cover at most {MAX_CALENDAR_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # today is part of the key: overdue counts change at midnight
+        parts = (start, end, today)
+        etag = user_cache_etag(user.id, 'calendar', *parts)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        days = get_or_compute(user.id, 'calendar', parts, lambda: get_task_calendar(user.id, start, end, today))
+        return Response({'from': start.isoformat(), 'to': end.isoformat(), 'days': days}, headers=headers)
+
+    BULK_OPERATIONS = ('complete', 'uncomplete', 'move', 'delete', 'restore')
+    MAX_BULK_OPERATIONS = 50
+    MAX_BULK_TASK_IDS = 500
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply many task operations in one transaction.
+
+        Body: {"operations": [{"op": "complete"|"uncomplete"|"move"|"delete"|"restore",
+                               "ids": [...], "due_date": "YYYY-MM-DD" (move only)}, ...]}
+
+        Operations run in order against the same tasks. Rows are written with
+        batched updates, XP is awarded in one insert, productivity is
+        recomputed once per affected date and Supabase is synced with one
+        batched upsert.
+        """
+        user = request.user
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            raise ValidationError({'operations': 'Provide a non-empty list of operations.'})
+        if len(operations) > self.MAX_BULK_OPERATIONS:
+            raise ValidationError({'operations': f'At most {self.MAX_BULK_OPERATIONS} operations per request.'})
+
+        parsed = []
+        task_ids = set()
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if op not in self.BULK_OPERATIONS:
+                raise ValidationError({'operations': f"Operation {index}: op must be one of {', '.join(self.BULK_OPERATIONS)}."})
+            ids = operation.get('ids')
+            # bool is a subclass of int, so true/false would pass as ids 1/0
+            if not isinstance(ids, list) or not ids or \
+                    not all(isinstance(task_id, int) and not isinstance(task_id, bool) for task_id in ids):
+                raise ValidationError({'operations': f"Operation {index}: ids must be a non-empty list of task ids."})
+            due_date = None
+            if op == 'move':
+                due_date = parse_date(str(operation.get('due_date') or ''))
+                if due_date is None:
+                    raise ValidationError({'operations': f"Operation {index}: move needs a due_date in YYYY-MM-DD format."})
+            parsed.append((op, ids, due_date))
+            task_ids.update(ids)
+            if len(task_ids) > self.MAX_BULK_TASK_IDS:
+                raise ValidationError({'operations': f'At most {self.MAX_BULK_TASK_IDS} tasks per request.'})
+
+        now = timezone.now()
+        today = timezone.localdate()
+        with transaction.atomic():
+            tasks = {
+                task.id: task
+                for task in Task.all_objects.select_for_update().filter(user=user, id__in=task_ids)
+            }
+            missing = sorted(task_ids - set(tasks))
+            if missing:
+                raise ValidationError({'operations': f"Tasks not found: {missing}"})
+
+            # Days each task counted toward before the changes (for derived data)
+            before = {
+                task.id: (task.due_date, task.completed, task.completed_at)
+                for task in tasks.values()
+            }
+
+            changed = set()
+            newly_completed = set()
+            for op, ids, due_date in parsed:
+                for task_id in ids:
+                    task = tasks[task_id]
+                    if op == 'complete' and not task.completed and not task.is_deleted:
+                        # Same gate as completing through perform_update; raising
+                        # here rolls back the whole batch
+                        if not task.can_be_completed():
+                            missing = self._get_missing_requirements(task)
+                            raise ValidationError({'operations': (
+                                f"Task {task_id} cannot be marked as complete. Missing: {', '.join(missing)}. "
+                                "Please log activity and provide evidence first."
+                            )})
+                        task.completed = True
+                        task.completed_at = now
+                        newly_completed.add(task_id)
+                    elif op == 'uncomplete' and (task.completed or task.completed_at):
+                        task.completed = False
+                        task.completed_at = None
+                        newly_completed.discard(task_id)
+                    elif op == 'move' and task.due_date != due_date:
+                        task.due_date = due_date
+                    elif op == 'delete' and not task.is_deleted:
+                        task.was_completed_on_delete = task.completed
+                        task.is_deleted = True
+                        task.deleted_at = now
+                    elif op == 'restore' and task.is_deleted:
+                        task.is_deleted = False
+                        task.deleted_at = None
+                        task.was_completed_on_delete = False
+                    else:
+                        continue
+                    task.updated_at = now
+                    changed.add(task_id)
+
+            changed_tasks = [tasks[task_id] for task_id in sorted(changed)]
+            Task.all_objects.bulk_update(
+                changed_tasks,
+                ['completed', 'completed_at', 'due_date', 'is_deleted', 'deleted_at',
+                 'was_completed_on_delete', 'updated_at'],
+                batch_size=500,
+            )
+
+            awards = award_xp_bulk(user.id, {
+                task_id: task_completion_xp(tasks[task_id], today)
+                for task_id in newly_completed if tasks[task_id].completed
+            }, day=today)
+            xp_awarded = sum(awards.values())
+
+            # bulk_update skips the model signals, so refresh derived data here,
+            # once per affected day
+            due_dates = set()
+            stats_days = set()
+            for task in changed_tasks:
+                previous_due_date, _, previous_completed_at = before[task.id]
+                due_dates.update({previous_due_date, task.due_date})
+                stats_days.update(stats_days_for(task))
+                if previous_completed_at:
+                    stats_days.add(timezone.localtime(previous_completed_at).date())
+            stats_days.update(due_dates)
+
+            self._update_productivity_for_dates(user, due_dates)
+            refresh_task_stats(user.id, stats_days)
+            update_streak_for_dates(user, due_dates)
+            transaction.on_commit(lambda: bump_user_cache_version(user.id, 'tasks', 'xp'))
+
+        # One batched Supabase call for every changed task
+        bulk_upsert_tasks_in_supabase(changed_tasks)
+
+        results = Task.all_objects.filter(user=user, id__in=task_ids).prefetch_related('subtasks')
         return Response({
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'pending_tasks': pending_tasks,
-            'due_today': due_today
+            'updated': len(changed_tasks),
+            'xp_awarded': xp_awarded,
+            'tasks': self.get_serializer(results, many=True).data,
         })
 
     def _get_missing_requirements(self, task):
@@ -418,7 +602,12 @@ class StudyTimerSessionViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['start_time', 'created_at']
     ordering = ['-start_time']
-    pagination_class = None
+    # Opt-in ?before=&window_days= paging; plain requests still get the full list
+    pagination_class = TimeWindowPagination
+    time_window_field = 'start_time'
+
+    # Most sessions accepted by one batch request
+    MAX_BATCH_SESSIONS = 1000
 
     def get_queryset(self):
         """Return sessions for the authenticated user."""
@@ -426,4 +615,47 @@ class StudyTimerSessionViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Automatically set the user when creating a session."""
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Ingest many sessions in one request.
+
+        Body: {"sessions": [{"session_type", "start_time", "end_time", "duration"}, ...]}
+        (a bare list is accepted too). Rows are written with one bulk insert,
+        the daily study rollups are recomputed once per affected day and
+        Supabase is synced with one batched upsert.
+        """
+        user = request.user
+        payload = request.data.get('sessions') if isinstance(request.data, dict) else request.data
+        if not isinstance(payload, list) or not payload:
+            return Response({'error': 'Please provide a non-empty list of sessions'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(payload) > self.MAX_BATCH_SESSIONS:
+            return Response(
+                {'error': f'At most {self.MAX_BATCH_SESSIONS} sessions per request'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = self.get_serializer(data=payload, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            sessions = StudyTimerSession.objects.bulk_create(
+                [StudyTimerSession(user=user, **data) for data in serializer.validated_data],
+                batch_size=500,
+            )
+            # bulk_create skips the post_save signals that keep these current
+            days = set()
+            for session in sessions:
+                days |= stats_days_for(session)
+            refresh_study_stats(user.id, days)
+            transaction.on_commit(lambda: bump_user_cache_version(user.id, 'study'))
+
+        # One batched Supabase call for every new session
+        bulk_upsert_study_timer_sessions_in_supabase(sessions)
+
+        return Response({
+            'created': len(sessions),
+            'sessions': self.get_serializer(sessions, many=True).data,
+        }, status=status.HTTP_201_CREATED)